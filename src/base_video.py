@@ -48,9 +48,6 @@ if args.auto_deps:
 # Import MMV module
 import mmv
 
-# Import a "canvas" class for generating background image video textures
-from mmv.mmvskia.pyskt.pyskt_backend import SkiaNoWindowBackend
-
 # For auto naming files according to when you run MMV
 import datetime
 
@@ -83,6 +80,10 @@ processing.configure_mmv_main(
     # particles and backgrounds is done on CPU as no textures are being moved.
     render_backend = args.render,
 
+    # Seed of every random thing (particles, shakes, random files), the same seed
+    # renders the same video. None picks one and logs it so you can reproduce it later
+    random_seed = None,
+
     # # Video encoding settings
 
     # AFAIK skia-python on Linux and MacOS uses RGBA and on Windows BGRA pixel format.
@@ -90,9 +91,36 @@ processing.configure_mmv_main(
     # colors RED and BLUE will be swapped.
     ffmpeg_pixel_format = "auto",
 
+    # Pixel format we write into FFmpeg's pipe, converting Skia's frames beforehand.
+    # "auto" pipes "yuv420p" when ffmpeg_dumb_player is set (that's what the encoder
+    # would convert to anyways) so FFmpeg skips a full colorspace conversion per frame,
+    # otherwise keeps ffmpeg_pixel_format. Can also be "rgb24" or "yuv420p" manually.
+    ffmpeg_pipe_pixel_format = "auto",
+
     # Try utilizing hardware acceleration? Set to None for ignoting this
     ffmpeg_hwaccel = "auto",
 
+    # Named encoder profile, overrides the x264 settings below when not None:
+    # "fast_preview":        ultrafast x264 with zerolatency tune, light on the CPU
+    # "archive_master":      lossless FFV1 into a .mkv, keeps the RGB(A) untouched
+    # "archive_master_x264": lossless x264 RGB into a .mkv, faster to decode than FFV1
+    # "delivery":            slow x264 with a long lookahead for the final upload
+    # The output video extension is changed to .mkv for the archive profiles.
+    ffmpeg_encoder_profile = None,
+
+    # Encoder threads for the profiles, "auto" gives the encoder a share of the CPUs
+    # based on the profile so the Skia render threads aren't starved
+    ffmpeg_encoder_threads = "auto",
+
+    # Audio codec of the output video. "copy" muxes the input audio file as is, which
+    # is fast but fails for some input formats / containers. Any other codec ("aac",
+    # "libopus", "flac", ..) encodes the audio we already decoded for the visualization,
+    # fed to FFmpeg through a FIFO so it doesn't decode the file a second time.
+    ffmpeg_audio_codec = "copy",
+
+    # Bitrate of the audio encoder like "320k", None uses the encoder default
+    ffmpeg_audio_bitrate = None,
+
     # Quote from FFmpeg H264 encode guide:
     #   "Encoding for dumb players
     #  You may need to use -vf format=yuv420p (or the alias -pix_fmt yuv420p) for
@@ -127,6 +155,15 @@ processing.configure_mmv_main(
     # "grain":      Optimized for old / grainy contents for preserving it
     # "fastdecode": For low compute power devices to have less trouble with
     x264_tune = "film",
+
+    # # Telemetry
+
+    # Structured render / encode throughput records (fps of each side, queue depth,
+    # time blocked writing to FFmpeg, rolling ETA, who's the bottleneck), appended
+    # as JSON lines to this file. pipe_telemetry_callback takes a function receiving
+    # the same dictionaries. A record is emitted every pipe_telemetry_every frames,
+    # once per second of video by default.
+    pipe_telemetry_file = None,
 )
 
 # Ensure we have FFmpeg on Windows, downloads, extracts etc
@@ -189,6 +226,32 @@ processing.quality(
     batch_size = 4096,
 )
 
+# Preview the scene realtime on a ffplay window instead of rendering the video, late
+# frames are dropped so it keeps up with the audio. Pass a flag preview=0.5 (the
+# resolution scale) when calling this script. Must come right after quality()
+if "preview" in args.kflags:
+    processing.realtime_preview(
+        scale = float(args.kflags["preview"]),
+        sink = "ffplay",  # "ffplay", "shm" (shared memory) or "null"
+        play_audio = True,
+    )
+
+# Draft render of a long piece, renders at a fraction of the resolution (upscaled back by
+# FFmpeg) and lowers blur, particle density and FFT batch size whenever it renders slower
+# than target_fps. Pass a flag draft=0.5 (the resolution scale). Must come right after quality()
+if "draft" in args.kflags:
+    processing.adaptive_quality(
+        scale = float(args.kflags["draft"]),
+        target_fps = 30,
+    )
+
+# Long renders can save a snapshot of the scene every some seconds of video and resume
+# from one of them with the flag resume=path/to/step_XXXXXXXX.mmvsnap, keep this script
+# the same between the runs. The resumed video starts at the snapshot time
+# processing.snapshots(directory = THIS_FILE_DIR + "/snapshots", every_seconds = 30)
+if "resume" in args.kflags:
+    processing.resume_from_snapshot(args.kflags["resume"])
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 # We have two main modes "music" and "piano_roll", you can uncomment them
@@ -234,23 +297,9 @@ if MODE == "music":
             # Background we save by default
             GENERATED_BACKGROUND_DIRECTORY = THIS_FILE_DIR + "/assets/generated/background"
 
-            # Delete the directory, reset its file contents
-            # Change "if True:" to "if False:" for keeping files, also
-            # change the number of generated images to something higher :)
-            if True:
-                processing.delete_directory(GENERATED_BACKGROUND_DIRECTORY)
-                processing.make_directory_if_doesnt_exist(GENERATED_BACKGROUND_DIRECTORY)
-
-            # Initialize a canvas we'll generate the backgrounds
-            skia = SkiaNoWindowBackend()
-            skia.init(
-                width = processing.width,
-                height = processing.height,
-            )
-
-            # Get a pygradienter object for generating the images
+            # Images are a function of the seed, with a fixed random_seed the backgrounds of the
+            # previous render are reused. Change n_images to something higher for more variety :)
             pygradienter = processing.pygradienter(
-                skia = skia,
                 width = processing.width,
                 height = processing.height,
                 n_images = 1,
@@ -258,9 +307,8 @@ if MODE == "music":
                 mode = "polygons"
             )
 
-            # Generate random backgrounds and quit canvas
+            # Generate random backgrounds on worker processes (or reuse them)
             pygradienter.run()
-            skia.terminate_glfw()
             
             BACKGROUND_IMAGE = processing.random_file_from_dir(GENERATED_BACKGROUND_DIRECTORY)
 
@@ -311,11 +359,8 @@ elif MODE == "piano_roll":
         # Save the converted audio on the same directory, change .mid to .mp3
         rendered_midi_to_audio_path = INPUT_MIDI.replace(".mid", ".mp3")
 
-        # Remove this file so we render again if you change any setting
-        if os.path.exists(rendered_midi_to_audio_path):
-            os.remove(rendered_midi_to_audio_path)
-
-        # Convert and assign
+        # Convert and assign, renders are cached by the MIDI contents and settings so this only
+        # runs MuseScore again when the MIDI or the bitrate changes
         INPUT_AUDIO = midi.convert_to_audio(
             source_path = INPUT_MIDI,
             save_path = rendered_midi_to_audio_path,
@@ -426,7 +471,6 @@ Y increases downwards
 # Generate random particles
 if PARTICLES:
     PARTICLES_DIRECTORY = THIS_FILE_DIR + "/assets/generated/particles"
-    processing.delete_directory(PARTICLES_DIRECTORY)
     processing.make_directory_if_doesnt_exist(PARTICLES_DIRECTORY)
 
     # Size of the particle image
@@ -434,18 +478,16 @@ if PARTICLES:
     particle_height = 200
     generate_n = 50 # particles
 
-    # Create canvas to draw on
-    skia = SkiaNoWindowBackend()
-    skia.init(width = particle_width, height = particle_height)
-
-    # Get a pygradienter object with particle mode
+    # Get a pygradienter object with particle mode, the particles are split across
+    # workers (one raster canvas each) and only generated again if the seed changed
     pygradienter = processing.pygradienter(
-        skia = skia,
         width = particle_width,
         height = particle_height,
         n_images = generate_n,
         output_dir = PARTICLES_DIRECTORY,
         mode = "particles",
+        # workers = 4,
+        # image_format = "webp",
     )
 
     # Run it
@@ -456,6 +498,9 @@ if PARTICLES:
 # influences the frequencies bars on the visualizer itself
 processing.audio_processing.preset_balanced()
 
+# One bar value per semitone with a constant Q transform instead of the nearest FFT bin
+# processing.audio_processing.constant_q(filter_scale = 1)
+
 # I/O options, input a audio, output a video
 processing.input_audio(INPUT_AUDIO)
 processing.output_video(OUTPUT_VIDEO)
@@ -0,0 +1,93 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Report how long importing each module of MMV (and its dependencies) takes
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+import subprocess
+import argparse
+import sys
+import os
+
+# Run this file to see where the startup time of a short job goes, for example
+#
+#   python import_profile.py
+#   python import_profile.py --module mmv.mmvskia --top 40
+#   python import_profile.py --module mmv.mmvshader --self
+#
+# It imports the module on a fresh interpreter with `python -X importtime` and
+# sorts its report, cumulative time includes the imports each module triggered
+
+
+# Import a module on a new interpreter and return the (self us, cumulative us, name) list
+def profile_import(module: str) -> list:
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd = here, stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True,
+    )
+
+    timings = []
+    for line in process.stderr.split("\n"):
+
+        # Lines are "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((int(self_us), int(cumulative_us), name.rstrip()))
+
+    # Show why it failed after the timings we got, a missing dependency most likely
+    if process.returncode != 0:
+        errors = [line for line in process.stderr.split("\n") if line and not line.startswith("import time:")]
+        print("\n".join(errors[-5:]))
+
+    return timings
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser(description = "Import time per module of MMV")
+    args.add_argument("--module", default = "mmv", help = "Module to import, defaults to [mmv]")
+    args.add_argument("--top", type = int, default = 25, help = "Show only the N slowest modules")
+    args.add_argument("--self", action = "store_true", help = "Sort by the module's own time instead of cumulative")
+    args = args.parse_args()
+
+    timings = profile_import(args.module)
+
+    if not timings:
+        print(f"No import timings for [{args.module}]")
+        sys.exit(1)
+
+    # Total is the cumulative time of the top level imports (no indentation)
+    total = sum(cumulative for _, cumulative, name in timings if not name.startswith("  "))
+
+    timings.sort(key = lambda timing: timing[0] if args.self else timing[1], reverse = True)
+
+    print(f"\nImporting [{args.module}] took [{total / 1e6:.3f}s] over [{len(timings)}] modules\n")
+    print(f"{'self [ms]':>10} {'cumulative [ms]':>16}   module")
+
+    for self_us, cumulative_us, name in timings[:args.top]:
+        print(f"{self_us / 1000:>10.2f} {cumulative_us / 1000:>16.2f}   {name.strip()}")
@@ -27,7 +27,7 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 from mmv.common.cmn_constants import LOG_NEXT_DEPTH, PACKAGE_DEPTH, LOG_NO_DEPTH, LOG_SEPARATOR, STEP_SEPARATOR
-from mmv.common.cmn_download import Download
+from mmv.common.cmn_settings import FrozenSettings
 from mmv.common.cmn_utils import Utils
 import subprocess
 import tempfile
@@ -179,7 +179,7 @@ f"""{depth}{debug_prefix} Show thanks message
 
         # Load the prelude file
         with open(prelude_file, "r") as f:
-            self.prelude = toml.loads(f.read())
+            self.prelude = FrozenSettings.from_dict(toml.loads(f.read()))
         
         print(f"{depth}{debug_prefix} Loaded prelude configuration file, data: [{self.prelude}]")
 
@@ -206,10 +206,10 @@ f"""{depth}{debug_prefix} Show thanks message
             "info": logging.INFO,
             "warn": logging.WARN,
             "notset": logging.NOTSET,
-        }.get(self.prelude["logging"]["log_level"])
+        }.get(self.prelude.logging.log_level)
 
         # If user chose to log to a file, add its handler..
-        if self.prelude["logging"]["log_to_file"]:
+        if self.prelude.logging.log_to_file:
 
             # Hard coded where the log file will be located
             # this is only valid for the last time we run this software
@@ -231,7 +231,7 @@ f"""{depth}{debug_prefix} Show thanks message
             "pretty": "[%(levelname)-8s] (%(relativeCreated)-5d)ms %(message)s",
             "economic": "[%(levelname)s::%(filename)s::%(lineno)d] %(message)s",
             "onlymessage": "%(message)s"
-        }.get(self.prelude["logging"]["log_format"])
+        }.get(self.prelude.logging.log_format)
 
         # Start the logging global class, output to file and stdout
         logging.basicConfig(
@@ -295,8 +295,8 @@ f"""{depth}{debug_prefix} Show thanks message
         logging.info(f"{depth}{debug_prefix} Creating Utils() class")
         self.utils = Utils()
 
-        logging.info(f"{depth}{debug_prefix} Creating Download() class")
-        self.download = Download()
+        # Download() is created on first use, see MMVInterface.download
+        self._download = None
 
         # # Common directories between packages
 
@@ -326,7 +326,7 @@ f"""{depth}{debug_prefix} Show thanks message
         logging.info(f"{depth}{debug_prefix} Last session info file is [{self.last_session_info_file}], resetting it..")
 
         # Code flow management
-        if self.prelude["flow"]["stop_at_initialization"]:
+        if self.prelude.flow.stop_at_initialization:
             logging.critical(f"{depth}{debug_prefix} Exiting as stop_at_initialization key on prelude.toml is True")
             sys.exit(0)
         
@@ -340,6 +340,16 @@ f"""{depth}{debug_prefix} Show thanks message
             self.externals_dir
         ]
 
+    # Download class and its dependencies (requests, wget, pyunpack) are only loaded
+    # when we actually need to get some external
+    @property
+    def download(self):
+        if self._download is None:
+            from mmv.common.cmn_download import Download
+            logging.info(f"[MMVInterface.download] Creating Download() class")
+            self._download = Download()
+        return self._download
+
     # Make sure we have FFmpeg
     def download_check_ffmpeg(self, making_release = False, depth = PACKAGE_DEPTH):
         debug_prefix = "[MMVInterface.download_check_ffmpeg]"
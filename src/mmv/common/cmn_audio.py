@@ -27,55 +27,140 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
+from mmv.common.cmn_audio_modulators import AudioModulators
+from mmv.common.cmn_audio_features import AudioFeatures
 from mmv.common.cmn_functions import Functions
 from mmv.common.cmn_utils import DataUtils
 from mmv.common.cmn_fourier import Fourier
 import mmv.common.cmn_any_logger
-import audio2numpy
 import numpy as np
 import subprocess
-import samplerate
-import soundfile
-import audioread
+import hashlib
 import logging
 import math
 import os
 
 
+# Mono view of a (channels, N) audio array, averages the channels only on the windows
+# asked for so we never keep a full mono copy of long inputs in memory
+class MonoAudio:
+    def __init__(self, stereo_data: np.ndarray) -> None:
+        self.stereo_data = stereo_data
+        self.shape = (stereo_data.shape[1],)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key) -> np.ndarray:
+        return self.stereo_data[:, key].mean(axis = 0)
+
+
 class AudioFile:
 
-    # Read a .wav file from disk and gets the values on a list
-    def read(self, path: str, depth = LOG_NO_DEPTH) -> None:
+    # Decode blocks of this many samples when writing the on disk cache
+    CACHE_BLOCK_SIZE = 2 ** 18
+
+    # Read an audio file from disk as float32 samples. With a cache_directory the file is decoded
+    # once into a raw float32 cache there and memory mapped, so long inputs only keep the pages
+    # we're reading resident, without it the samples are decoded into memory
+    def read(self, path: str, cache_directory: str = None, cache_max_files: int = 4, depth = LOG_NO_DEPTH) -> None:
         debug_prefix = "[AudioFile.read]"
         ndepth = depth + LOG_NEXT_DEPTH
 
-        logging.info(f"{depth}{debug_prefix} Reading stereo audio in path [{path}], trying soundfile")
+        logging.info(f"{depth}{debug_prefix} Reading audio in path [{path}], trying soundfile")
+        import soundfile
         try:
-            self.stereo_data, self.sample_rate = soundfile.read(path)
+            self.sample_rate = soundfile.info(path).samplerate
+
+            if cache_directory is not None:
+                interleaved = self.cached_decode(path, cache_directory, cache_max_files, depth = ndepth)
+            else:
+                interleaved, _ = soundfile.read(path, dtype = "float32", always_2d = True)
+
         except RuntimeError:
             logging.warn(f"{depth}{debug_prefix} Couldn't read file with soundfile, trying audio2numpy..")
-            self.stereo_data, self.sample_rate = audio2numpy.open_audio(path)
+            import audio2numpy
+            interleaved, self.sample_rate = audio2numpy.open_audio(path)
+            interleaved = np.asarray(interleaved, dtype = np.float32)
 
-        # We need to transpose to a (2, -1) array
-        logging.info(f"{depth}{debug_prefix} Transposing audio data")
-        self.stereo_data = self.stereo_data.T
+            if interleaved.ndim == 1:
+                interleaved = interleaved[:, np.newaxis]
 
-        # Calculate the duration and see how much channels this audio file have
+        # We need a (channels, -1) array, transposing is only a view of the (-1, channels) data
+        self.channels = interleaved.shape[1]
+        self.stereo_data = interleaved.T
+
+        # Calculate the duration
         self.duration = self.stereo_data.shape[1] / self.sample_rate
-        self.channels = self.stereo_data.shape[0]
-        
+
+        # Mono files are seen as two equal channels, no copy is made
+        if self.channels == 1:
+            logging.info(f"{depth}{debug_prefix} Mono audio, broadcasting it to two channels")
+            self.mono_data = self.stereo_data[0]
+            self.stereo_data = np.broadcast_to(self.stereo_data, (2, self.stereo_data.shape[1]))
+        else:
+            self.mono_data = MonoAudio(self.stereo_data)
+
         # Log few info on the audio file
         logging.info(f"{depth}{debug_prefix} Duration of the audio file = [{self.duration:.2f}s]")
         logging.info(f"{depth}{debug_prefix} Audio sample rate is         [{self.sample_rate}]")
         logging.info(f"{depth}{debug_prefix} Audio data shape is          [{self.stereo_data.shape}]")
-        logging.info(f"{depth}{debug_prefix} Audio have                   [{self.channels}]")
+        logging.info(f"{depth}{debug_prefix} Audio have                   [{self.channels}] channels")
+
+    # Decode the file into a (-1, channels) float32 .npy on the cache directory block by block,
+    # keyed by its path, size and modification time, and return it memory mapped read only.
+    # Only the cache_max_files most recently used caches are kept
+    def cached_decode(self, path: str, cache_directory: str, cache_max_files: int = 4, depth = LOG_NO_DEPTH) -> np.ndarray:
+        debug_prefix = "[AudioFile.cached_decode]"
+        import soundfile
+
+        os.makedirs(cache_directory, exist_ok = True)
+
+        stat = os.stat(path)
+        key = hashlib.sha1(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime}".encode()).hexdigest()[:20]
+        cache_file = os.path.join(cache_directory, f"{key}.npy")
+
+        if os.path.exists(cache_file):
+            logging.info(f"{depth}{debug_prefix} Using decoded cache [{cache_file}]")
+            os.utime(cache_file)
+            return np.load(cache_file, mmap_mode = "r")
+
+        info = soundfile.info(path)
+        logging.info(f"{depth}{debug_prefix} Decoding [{info.frames}] samples of [{info.channels}] channels into [{cache_file}]")
 
-        # Get the mono data of the audio
-        logging.info(f"{depth}{debug_prefix} Calculating mono audio")
-        self.mono_data = (self.stereo_data[0] + self.stereo_data[1]) / 2
+        # Write to a temporary name first so an interrupted decode is never reused
+        temporary = cache_file + ".part"
+        data = np.lib.format.open_memmap(temporary, mode = "w+", dtype = np.float32, shape = (info.frames, info.channels))
+        position = 0
+
+        for block in soundfile.blocks(path, blocksize = self.CACHE_BLOCK_SIZE, dtype = "float32", always_2d = True):
+            block = block[:info.frames - position]
+            data[position:position + block.shape[0]] = block
+            position += block.shape[0]
+
+        data.flush()
+        del data
+
+        # Some formats report an estimate of the length, don't cache those
+        if not position == info.frames:
+            logging.warning(f"{depth}{debug_prefix} Decoded [{position}] samples instead of the reported [{info.frames}], reading it into memory")
+            os.remove(temporary)
+            interleaved, _ = soundfile.read(path, dtype = "float32", always_2d = True)
+            return interleaved
+
+        os.replace(temporary, cache_file)
+
+        # Forget about the least recently used caches
+        caches = sorted(
+            [os.path.join(cache_directory, name) for name in os.listdir(cache_directory) if name.endswith(".npy")],
+            key = os.path.getmtime, reverse = True,
+        )
+        for old in caches[cache_max_files:]:
+            logging.info(f"{depth}{debug_prefix} Removing old decoded cache [{old}]")
+            os.remove(old)
+
+        return np.load(cache_file, mmap_mode = "r")
 
-        # Just make sure the mono data is right..
-        logging.info(f"{depth}{debug_prefix} Mono data shape:             [{self.mono_data.shape}]")
 
 class AudioProcessing:
     def __init__(self, depth = LOG_NO_DEPTH) -> None:
@@ -83,6 +168,8 @@ class AudioProcessing:
         ndepth = depth + LOG_NEXT_DEPTH
 
         self.fourier = Fourier()
+        self.features = AudioFeatures()
+        self.modulators = AudioModulators(self.features)
         self.datautils = DataUtils()
         self.functions = Functions()
         self.config = None
@@ -128,9 +215,18 @@ class AudioProcessing:
             self.audio_slice = [left_slice, right_slice]
 
         # Calculate average amplitude
-        self.average_value = float(np.mean(np.abs(
-            mono_data[start_cut:end_cut]
-        )))
+        mono_slice = mono_data[start_cut:end_cut]
+        self.average_value = float(np.mean(np.abs(mono_slice)))
+
+        # RMS and brightness of the slice as a single frame, the modulators of renders
+        # without precompute_modulators (precomputed values replace them otherwise)
+        if mono_slice.shape[0] > 0:
+            frame = np.asarray(mono_slice)[np.newaxis, :]
+            self.rms_value = float(self.features.rms(frame)[0])
+            self.spectral_centroid = float(self.features.spectral_centroid(frame, sample_rate)[0])
+        else:
+            self.rms_value = 0.0
+            self.spectral_centroid = 0.0
 
     def resample(self,
             data: np.ndarray,
@@ -142,6 +238,7 @@ class AudioProcessing:
         if ratio == 1:
             return data
         else:
+            import samplerate
             return samplerate.resample(data, ratio, 'sinc_best')
 
     # Get N semitones above / below A4 key, 440 Hz
@@ -172,14 +269,6 @@ class AudioProcessing:
 
             # Get info on config
             sample_rate = value.get("sample_rate")
-            start_freq = value.get("start_freq")
-            end_freq = value.get("end_freq")
-
-            # Get the frequencies we want and will return in the end
-            wanted_freqs = self.datautils.list_items_in_between(
-                self.piano_keys_frequencies,
-                start_freq, end_freq,
-            )
 
             # Calculate the binned FFT, we get N vectors of [freq, value]
             # of this FFT
@@ -195,27 +284,223 @@ class AudioProcessing:
                 original_sample_rate = original_sample_rate,
             )
 
-            # Get the nearest freq and add to processed            
-            for freq in wanted_freqs:
-
-                # Get the nearest and FFT value
-                nearest = self.find_nearest(binned_fft[0], freq)
-                value = binned_fft[1][nearest[0]]
-     
-                # How much bars we'll render duped at this freq, see
-                # this function on the Functions class for more detail
-                N = math.ceil(
-                    self.functions.how_much_bars_on_this_frequency(
-                        x = freq,
-                        where_decay_less_than_one = self.where_decay_less_than_one,
-                        value_at_zero = self.value_at_zero,
+            self.add_wanted_frequencies(processed, binned_fft[0], binned_fft[1], value.get("start_freq"), value.get("end_freq"))
+
+        return self.linear_processed(processed)
+
+    # # Multirate filter bank
+
+    # Halfband lowpass (cutoff at a quarter of the sample rate, every other tap is zero),
+    # each decimation stage filters with it and drops every other sample
+    HALFBAND_TAPS = 31
+
+    # Shortest FFT window of a decimated band, the bass bands get their resolution from it
+    MIN_BAND_WINDOW = 256
+
+    # Instead of resampling the slice of every frame to each band's sample_rate, decimate the
+    # whole track once per band with a cascade of halfband stages down to the lowest power of
+    # two division of the sample rate that still is at least the band's sample_rate. Every
+    # frame then only FFTs a window of the already decimated streams, see process_filter_bank
+    def prepare_filter_bank(self, stereo_data, sample_rate: int, block_size: int = 2 ** 20, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[AudioProcessing.prepare_filter_bank]"
+        from scipy.signal import firwin
+
+        self.halfband = firwin(self.HALFBAND_TAPS, 0.5)
+        self.filter_bank = {}
+
+        # Bands decimated by the same factor share the streams
+        streams_of_stages = {}
+
+        for key, value in self.config.items():
+            stages = 0
+            while sample_rate / (2 ** (stages + 1)) >= value["sample_rate"]:
+                stages += 1
+
+            if not stages in streams_of_stages:
+                streams_of_stages[stages] = [self.decimate(stereo_data[channel], stages, block_size) for channel in (0, 1)]
+
+            self.filter_bank[key] = {
+                "factor": 2 ** stages,
+                "rate": sample_rate / (2 ** stages),
+                "streams": streams_of_stages[stages],
+            }
+            logging.info(f"{depth}{debug_prefix} Band [{key}] asks for [{value['sample_rate']}] Hz, decimated [{stages}] times to [{sample_rate / (2 ** stages)}] Hz")
+
+    # Decimate a signal by 2 ** stages, in blocks with enough margin on each side for the filters
+    # so long (memory mapped) inputs are never whole in memory. Output sample j is at input sample
+    # j * 2 ** stages as the filters are centered
+    def decimate(self, data, stages: int, block_size: int) -> np.ndarray:
+        if stages == 0:
+            return data
+
+        from scipy.signal import oaconvolve
+
+        factor = 2 ** stages
+        margin = factor * self.HALFBAND_TAPS
+        block_size = max(factor, block_size // factor * factor)
+
+        N = len(data)
+        decimated = np.empty(-(-N // factor), dtype = np.float32)
+
+        for start in range(0, N, block_size):
+            low = max(0, start - margin)
+            block = np.asarray(data[low:min(N, start + block_size + margin)], dtype = np.float64)
+
+            for _ in range(stages):
+                block = oaconvolve(block, self.halfband, mode = "same")[::2]
+
+            first = (start - low) // factor
+            count = -(-min(block_size, N - start) // factor)
+            decimated[start // factor:start // factor + count] = block[first:first + count]
+
+        return decimated
+
+    # FFTs of the left and right channel at some sample (the center of the frame's slice) from
+    # the decimated streams, same output as process on each channel's slice. Windows are
+    # batch_size samples of the original rate or MIN_BAND_WINDOW samples, the longer one.
+    # Magnitudes are scaled to what process would give on the resampled slice
+    def process_filter_bank(self, center: int, batch_size: int, original_sample_rate: int) -> list:
+        processed = [{}, {}]
+
+        for key, value in self.config.items():
+            band = self.filter_bank[key]
+            window = max(batch_size // band["factor"], self.MIN_BAND_WINDOW) if band["factor"] > 1 else batch_size
+
+            first = center // band["factor"] - window // 2
+            frequencies = np.fft.fftfreq(window, 1 / band["rate"])[1:window // 2]
+
+            # Loudness compensation of Fourier.binned_fft and the length of the resampled slice
+            resampled_length = batch_size * value["sample_rate"] / original_sample_rate
+            gain = (math.log10(original_sample_rate / value["sample_rate"]) / math.log10(2)) * (resampled_length / window)
+
+            for channel, stream in enumerate(band["streams"]):
+
+                # Zero padded past the edges of the audio
+                data = np.zeros(window)
+                low, high = max(first, 0), min(first + window, len(stream))
+                if high > low:
+                    data[low - first:high - first] = stream[low:high]
+
+                self.add_wanted_frequencies(processed[channel], frequencies, self.fourier.fft(data) * gain, value["start_freq"], value["end_freq"])
+
+        return [self.linear_processed(channel_processed) for channel_processed in processed]
+
+    # # Constant Q transform
+
+    # Kernel values smaller than this (relative) are dropped from the sparse kernel
+    CONSTANT_Q_SPARSITY = 0.0054
+
+    # One bin per piano key of each band instead of the nearest FFT bin, with the spectral
+    # kernels of Brown & Puckette: each key's windowed complex exponential, as long as the Q
+    # of a semitone needs at the band's decimated rate, is FFT'd once here and thresholded into
+    # a sparse matrix, so every frame is one FFT and a sparse matrix vector product per band
+    # and channel. Needs the streams of prepare_filter_bank. filter_scale < 1 shortens the
+    # kernels (less smearing of the bass, less resolution)
+    def prepare_constant_q(self, filter_scale: float = 1, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[AudioProcessing.prepare_constant_q]"
+        from scipy.sparse import csr_matrix
+
+        Q = filter_scale / (2 ** (1 / 12) - 1)
+
+        for key, value in self.config.items():
+            band = self.filter_bank[key]
+            rate = band["rate"]
+
+            # Keys of this band that fit under its Nyquist frequency
+            frequencies = [
+                frequency for frequency in self.datautils.list_items_in_between(self.piano_keys_frequencies, value["start_freq"], value["end_freq"])
+                if frequency < rate / 2
+            ]
+            lengths = [int(math.ceil(Q * rate / frequency)) for frequency in frequencies]
+            length = 1 << int(math.ceil(math.log2(max(lengths + [2]))))
+
+            kernel = np.zeros((len(frequencies), length), dtype = np.complex128)
+
+            for row, (frequency, N) in enumerate(zip(frequencies, lengths)):
+                temporal = np.zeros(length, dtype = np.complex128)
+                start = length // 2 - N // 2
+                temporal[start:start + N] = np.hanning(N) * np.exp(2j * np.pi * frequency * np.arange(N) / rate) / N
+                kernel[row] = np.fft.fft(temporal)
+
+            kernel[np.abs(kernel) < self.CONSTANT_Q_SPARSITY * np.abs(kernel).max(initial = 0)] = 0
+
+            band["constant_q"] = {
+                "kernel": csr_matrix(np.conj(kernel) / length),
+                "length": length,
+                "frequencies": frequencies,
+            }
+            logging.info(f"{depth}{debug_prefix} Band [{key}] has [{len(frequencies)}] keys, window [{length}] at [{rate}] Hz, [{band['constant_q']['kernel'].nnz}] kernel values")
+
+    # Same output as process_filter_bank but with the constant Q magnitude of every key.
+    # A unit sine on a key gives 1/4 (Hann window), scaled to what the FFT path gives
+    def process_constant_q(self, center: int, batch_size: int, original_sample_rate: int) -> list:
+        processed = [{}, {}]
+
+        for key, value in self.config.items():
+            band = self.filter_bank[key]
+            constant_q = band["constant_q"]
+            length = constant_q["length"]
+
+            first = center // band["factor"] - length // 2
+            resampled_length = batch_size * value["sample_rate"] / original_sample_rate
+            gain = 2 * resampled_length * (math.log10(original_sample_rate / value["sample_rate"]) / math.log10(2))
+
+            for channel, stream in enumerate(band["streams"]):
+
+                # Zero padded past the edges of the audio
+                data = np.zeros(length)
+                low, high = max(first, 0), min(first + length, len(stream))
+                if high > low:
+                    data[low - first:high - first] = stream[low:high]
+
+                magnitudes = np.abs(constant_q["kernel"] @ np.fft.fft(data)) * gain
+
+                for frequency, magnitude in zip(constant_q["frequencies"], magnitudes):
+                    N = math.ceil(
+                        self.functions.how_much_bars_on_this_frequency(
+                            x = frequency,
+                            where_decay_less_than_one = self.where_decay_less_than_one,
+                            value_at_zero = self.value_at_zero,
+                        )
                     )
+                    for i in range(N):
+                        processed[channel][frequency + (i/10)] = magnitude
+
+        return [self.linear_processed(channel_processed) for channel_processed in processed]
+
+    # Add the nearest FFT value of every piano key frequency between start and end
+    # frequencies (and its duplicated bars) into the processed dictionary
+    def add_wanted_frequencies(self, processed: dict, frequencies: np.ndarray, values: np.ndarray, start_freq: float, end_freq: float) -> None:
+
+        # Get the frequencies we want and will return in the end
+        wanted_freqs = self.datautils.list_items_in_between(
+            self.piano_keys_frequencies,
+            start_freq, end_freq,
+        )
+
+        # Get the nearest freq and add to processed            
+        for freq in wanted_freqs:
+
+            # Get the nearest and FFT value
+            nearest = self.find_nearest(frequencies, freq)
+            value = values[nearest[0]]
+ 
+            # How much bars we'll render duped at this freq, see
+            # this function on the Functions class for more detail
+            N = math.ceil(
+                self.functions.how_much_bars_on_this_frequency(
+                    x = freq,
+                    where_decay_less_than_one = self.where_decay_less_than_one,
+                    value_at_zero = self.value_at_zero,
                 )
+            )
+
+            # Add repeated bars or just one
+            for i in range(N):
+                processed[nearest[1] + (i/10)] = value
 
-                # Add repeated bars or just one
-                for i in range(N):
-                    processed[nearest[1] + (i/10)] = value
-                
+    # [fft values, frequencies] lists of a processed dictionary
+    def linear_processed(self, processed: dict) -> list:
         linear_processed_fft = []
         frequencies = []
 
@@ -0,0 +1,154 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Vectorized audio features (YIN pitch, RMS, spectral centroid) over framed signals
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+
+
+# Frame level features computed for a whole signal at once: the signal is viewed as
+# overlapping frames (no copies) and every feature is a handful of NumPy calls over the
+# (frames, frame_size) matrix instead of a Python loop per frame. Used by the sample sorter
+# for classifying samples and by AudioProcessing on the visualization audio slices
+class AudioFeatures:
+
+    # (N frames, frame_size) strided view of a 1D signal, zero padded so the last samples
+    # get a frame too. Read only, copy it if you need to change the values
+    def frames(self, data: np.ndarray, frame_size: int, hop_size: int) -> np.ndarray:
+        data = np.asarray(data, dtype = np.float64)
+
+        if data.shape[0] < frame_size:
+            data = np.pad(data, (0, frame_size - data.shape[0]))
+
+        # Pad to a whole number of hops after the first frame
+        remainder = (data.shape[0] - frame_size) % hop_size
+        if remainder:
+            data = np.pad(data, (0, hop_size - remainder))
+
+        return sliding_window_view(data, frame_size)[::hop_size]
+
+    # Root mean square of each frame
+    def rms(self, frames: np.ndarray) -> np.ndarray:
+        return np.sqrt(np.mean(frames * frames, axis = -1))
+
+    # Hann windowed magnitude spectrum of each frame
+    def magnitudes(self, frames: np.ndarray) -> np.ndarray:
+        return np.abs(np.fft.rfft(frames * np.hanning(frames.shape[-1]), axis = -1))
+
+    # Magnitude weighted mean frequency of each frame, zero on silent frames. Pass the
+    # magnitudes if they were already calculated for something else
+    def spectral_centroid(self, frames: np.ndarray, sample_rate: int, magnitudes: np.ndarray = None) -> np.ndarray:
+        frame_size = frames.shape[-1]
+        if magnitudes is None:
+            magnitudes = self.magnitudes(frames)
+        frequencies = np.fft.rfftfreq(frame_size, 1 / sample_rate)
+
+        total = magnitudes.sum(axis = -1)
+        weighted = magnitudes @ frequencies
+
+        return np.divide(weighted, total, out = np.zeros_like(weighted), where = total > 0)
+
+    # YIN fundamental frequency of each frame, returns (pitches, confidences) where the
+    # confidence is 1 - the cumulative mean normalized difference at the chosen lag, like
+    # aubio's get_confidence. Frames without a periodicity have a pitch of zero.
+    #
+    # The difference function d(tau) = sum (x[j] - x[j + tau])^2 over half a frame is
+    # expanded into energy terms (cumulative sums) minus twice the cross correlation
+    # (one batched FFT), so all frames and lags come out of a few array operations.
+    def yin(self, frames: np.ndarray, sample_rate: int, threshold: float = 0.2, min_frequency: float = 30, max_frequency: float = None) -> tuple:
+        N_frames, frame_size = frames.shape
+        window = frame_size // 2
+
+        max_lag = window
+        min_lag = max(2, int(sample_rate / max_frequency)) if max_frequency else 2
+        max_lag = min(max_lag, int(sample_rate / min_frequency) + 1)
+
+        # Cross correlation of the first half of each frame against the whole frame
+        n_fft = 1 << int(np.ceil(np.log2(frame_size + window)))
+        spectrum = np.fft.rfft(frames, n_fft, axis = -1)
+        head_spectrum = np.fft.rfft(frames[:, :window], n_fft, axis = -1)
+        cross = np.fft.irfft(spectrum * np.conj(head_spectrum), n_fft, axis = -1)[:, :max_lag]
+
+        # Energy of the first half and of the window starting at each lag
+        squares_cumsum = np.concatenate([np.zeros((N_frames, 1)), np.cumsum(frames * frames, axis = -1)], axis = -1)
+        head_energy = squares_cumsum[:, window:window + 1]
+        lag_energy = squares_cumsum[:, window:window + max_lag] - squares_cumsum[:, :max_lag]
+
+        difference = np.maximum(head_energy + lag_energy - 2 * cross, 0)
+
+        # Cumulative mean normalized difference, d'(0) = 1
+        lags = np.arange(max_lag)
+        running_sum = np.cumsum(difference[:, 1:], axis = -1)
+        normalized = np.ones_like(difference)
+        normalized[:, 1:] = np.divide(
+            difference[:, 1:] * lags[1:], running_sum,
+            out = np.ones_like(running_sum), where = running_sum > 0
+        )
+
+        # First local minimum under the threshold, else the global minimum in the lag range
+        search = normalized[:, min_lag:max_lag - 1]
+        is_minimum = (search < threshold) & (search <= normalized[:, min_lag + 1:max_lag]) & (search < normalized[:, min_lag - 1:max_lag - 2])
+        has_minimum = is_minimum.any(axis = -1)
+        best = np.where(has_minimum, is_minimum.argmax(axis = -1), search.argmin(axis = -1)) + min_lag
+
+        # Parabolic interpolation around the chosen lag for sub sample precision
+        rows = np.arange(N_frames)
+        previous, current, following = normalized[rows, best - 1], normalized[rows, best], normalized[rows, best + 1]
+        curvature = previous - 2 * current + following
+        shift = np.divide(previous - following, 2 * curvature, out = np.zeros_like(curvature), where = np.abs(curvature) > 1e-12)
+        lag = best + np.clip(shift, -1, 1)
+
+        confidences = np.clip(1 - current, 0, 1)
+        pitches = np.where(has_minimum, sample_rate / lag, 0.0)
+
+        # Silent frames have no pitch
+        silent = head_energy[:, 0] == 0
+        pitches[silent] = 0
+        confidences[silent] = 0
+
+        return pitches, confidences
+
+    # Every feature of a mono signal as a dictionary of per frame arrays plus its summary
+    # values, dominant_frequency being the confidence weighted mean of the pitches
+    def extract(self, data: np.ndarray, sample_rate: int, frame_size: int = 4096, hop_size: int = 512, threshold: float = 0.2) -> dict:
+        frames = self.frames(data, frame_size, hop_size)
+        pitches, confidences = self.yin(frames, sample_rate, threshold = threshold)
+
+        total_confidence = confidences.sum()
+        if total_confidence > 0:
+            dominant_frequency = float(np.dot(confidences, pitches) / total_confidence)
+        else:
+            dominant_frequency = 0.0
+
+        return {
+            "pitch": pitches,
+            "confidence": confidences,
+            "rms": self.rms(frames),
+            "spectral_centroid": self.spectral_centroid(frames, sample_rate),
+            "standard_deviation": float(np.std(data)),
+            "dominant_frequency": dominant_frequency,
+        }
@@ -0,0 +1,248 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Precompute per frame audio modulators (bands, onsets, beats, envelopes) for a whole track
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+import logging
+import time
+import math
+
+
+# Every modulator of a render is analyzed once before the first frame: the whole track is
+# cut into one window per video frame (where MMVSkiaCore slices the audio of that step) and
+# processed in chunks of frames with a few NumPy calls each, so rendering a step only looks
+# values up by index. Values are float arrays of length total_steps:
+#
+#   bass, mid, treble: energy of these frequency bands, about 0 to 1 (1 = 99th percentile of the track)
+#   rms: root mean square of the window, same units as average_value
+#   rms_envelope: rms smoothed with the attack / release times
+#   spectral_centroid: brightness in Hz
+#   flux: spectral flux onset strength, about 0 to 1
+#   onset, kick: 1 on the frames a (bass only for kick) onset was detected, 0 otherwise
+#   beat: 1 on the frames of the beat grid, 0 otherwise
+#   beat_phase: goes from 0 to 1 between two beats
+#
+# Plus tempo, the estimated BPM of the track. The beat grid assumes a constant tempo
+class AudioModulators:
+
+    BANDS = {
+        "bass": (20, 250),
+        "mid": (250, 4000),
+        "treble": (4000, 20000),
+    }
+
+    # Tempo search range and the BPM we lean towards on octave ambiguities
+    MIN_BPM = 60
+    MAX_BPM = 200
+    PREFERRED_BPM = 120
+
+    def __init__(self, features) -> None:
+        self.features = features
+        self.values = {}
+        self.tempo = 0
+
+    def compute(self,
+            mono_data,  # Array or MonoAudio, anything we can slice and take the len of
+            sample_rate: int,
+            fps: float,
+            total_steps: int,
+            frame_size: int = 2048,
+            attack: float = 0.01,  # Seconds for the rms envelope to rise
+            release: float = 0.15,  # Seconds for the rms envelope to fall
+            amplitude_multiplier: float = 1,  # Applied on rms and rms_envelope
+            chunk_frames: int = 512,  # Frames FFT'd at once, bounds the memory used
+            depth = LOG_NO_DEPTH,
+        ) -> None:
+        debug_prefix = "[AudioModulators.compute]"
+        ndepth = depth + LOG_NEXT_DEPTH
+        start = time.time()
+
+        logging.info(f"{depth}{debug_prefix} Precomputing modulators of [{total_steps}] frames, window size [{frame_size}]")
+
+        # Where the window of each step starts
+        starts = (np.arange(total_steps) * (sample_rate / fps)).astype(np.int64)
+
+        frequencies = np.fft.rfftfreq(frame_size, 1 / sample_rate)
+        band_masks = {name: (frequencies >= low) & (frequencies < high) for name, (low, high) in self.BANDS.items()}
+
+        rms = np.zeros(total_steps)
+        centroid = np.zeros(total_steps)
+        flux = np.zeros(total_steps)
+        bass_flux = np.zeros(total_steps)
+        bands = {name: np.zeros(total_steps) for name in self.BANDS.keys()}
+
+        # Log compressed spectrum of the frame before the current chunk for the flux
+        previous = None
+
+        for chunk_start in range(0, total_steps, chunk_frames):
+            chunk = slice(chunk_start, min(chunk_start + chunk_frames, total_steps))
+
+            # Only read the span of audio this chunk covers, mono_data may be a lazy view of a
+            # memory mapped file. Zero padded past the end of the audio
+            chunk_starts = starts[chunk]
+            first, last = chunk_starts[0], chunk_starts[-1] + frame_size
+            span = np.zeros(last - first)
+            available = np.asarray(mono_data[first:min(last, len(mono_data))], dtype = np.float64)
+            span[:available.shape[0]] = available
+
+            frames = sliding_window_view(span, frame_size)[chunk_starts - first]
+            magnitudes = self.features.magnitudes(frames)
+
+            rms[chunk] = self.features.rms(frames)
+            centroid[chunk] = self.features.spectral_centroid(frames, sample_rate, magnitudes = magnitudes)
+
+            power = magnitudes * magnitudes
+            for name, mask in band_masks.items():
+                bands[name][chunk] = np.sqrt(power[:, mask].sum(axis = -1))
+
+            # Spectral flux, sum of the positive changes of the log spectrum
+            compressed = np.log1p(magnitudes)
+            before = np.vstack([compressed[:1] if previous is None else previous, compressed[:-1]])
+            rise = np.maximum(compressed - before, 0)
+            flux[chunk] = rise.sum(axis = -1)
+            bass_flux[chunk] = rise[:, band_masks["bass"]].sum(axis = -1)
+            previous = compressed[-1:]
+
+        flux = self.normalize(flux)
+        bass_flux = self.normalize(bass_flux)
+
+        self.values = {name: self.normalize(values) for name, values in bands.items()}
+        self.values["rms"] = rms * amplitude_multiplier
+        self.values["rms_envelope"] = self.envelope(rms, fps, attack, release) * amplitude_multiplier
+        self.values["spectral_centroid"] = centroid
+        self.values["flux"] = flux
+        self.values["onset"] = self.pick_onsets(flux, fps)
+        self.values["kick"] = self.pick_onsets(bass_flux, fps)
+
+        # Beat grid from the onset strength
+        self.tempo, beat, beat_phase = self.beat_grid(flux, fps)
+        self.values["beat"] = beat
+        self.values["beat_phase"] = beat_phase
+
+        # Lookups return Python floats, store them small
+        self.values = {name: values.astype(np.float32) for name, values in self.values.items()}
+
+        logging.info(f"{depth}{debug_prefix} Took [{time.time() - start:.2f}s], tempo [{self.tempo:.2f}] BPM, [{int(self.values['onset'].sum())}] onsets, [{int(self.values['kick'].sum())}] kicks, [{int(beat.sum())}] beats")
+
+    # Modulator values of some step as a dictionary, steps out of the track (offsets) are clamped
+    def at(self, step: int) -> dict:
+        values = {name: float(values[int(min(max(step, 0), len(values) - 1))]) for name, values in self.values.items() if len(values)}
+        values["tempo"] = self.tempo
+        return values
+
+    # Scale so the 99th percentile is 1, robust against a few loud spikes
+    def normalize(self, values: np.ndarray) -> np.ndarray:
+        reference = np.percentile(values, 99) if values.size else 0
+        if reference <= 0:
+            return np.zeros_like(values)
+        return values / reference
+
+    # One pole follower rising with attack and falling with release time constants
+    def envelope(self, values: np.ndarray, fps: float, attack: float, release: float) -> np.ndarray:
+        attack_coefficient = math.exp(-1 / max(attack * fps, 1e-9))
+        release_coefficient = math.exp(-1 / max(release * fps, 1e-9))
+
+        envelope = np.empty_like(values)
+        current = 0.0
+
+        for index, value in enumerate(values.tolist()):
+            coefficient = attack_coefficient if value > current else release_coefficient
+            current = value + coefficient * (current - value)
+            envelope[index] = current
+
+        return envelope
+
+    # Onsets are local maxima of the strength over +-50 ms that stand above its mean of the
+    # last 100 ms by some delta, at least 50 ms apart from each other
+    def pick_onsets(self, strength: np.ndarray, fps: float, delta: float = 0.1) -> np.ndarray:
+        if not strength.size:
+            return np.zeros(0)
+
+        from scipy.ndimage import maximum_filter1d, uniform_filter1d
+
+        radius = max(1, int(round(0.05 * fps)))
+        average_size = max(1, int(round(0.1 * fps)))
+
+        is_peak = strength == maximum_filter1d(strength, size = 2 * radius + 1, mode = "nearest")
+        average = uniform_filter1d(strength, size = average_size, mode = "nearest", origin = (average_size - 1) // 2)
+        is_onset = is_peak & (strength > average + delta)
+
+        # Plateaus count once
+        is_onset[1:] &= ~is_onset[:-1]
+
+        return is_onset.astype(np.float64)
+
+    # Estimate a constant tempo from the autocorrelation of the onset strength, then the beat
+    # offset whose grid lands on the most onset strength. Returns (bpm, beat, beat_phase)
+    def beat_grid(self, strength: np.ndarray, fps: float) -> tuple:
+        N = strength.shape[0]
+        min_lag = max(1, int(fps * 60 / self.MAX_BPM))
+        max_lag = int(math.ceil(fps * 60 / self.MIN_BPM))
+
+        if (N < 2 * max_lag) or (not strength.any()):
+            return 0, np.zeros(N), np.zeros(N)
+
+        # Autocorrelation of the mean removed strength through the FFT
+        centered = strength - strength.mean()
+        n_fft = 1 << int(math.ceil(math.log2(2 * N)))
+        spectrum = np.fft.rfft(centered, n_fft)
+        autocorrelation = np.fft.irfft(spectrum * np.conj(spectrum), n_fft)[:max_lag + 2]
+
+        # Weight by a log gaussian around the preferred tempo to settle octave errors
+        lags = np.arange(min_lag, max_lag + 1)
+        bpms = 60 * fps / lags
+        weights = np.exp(-0.5 * np.log2(bpms / self.PREFERRED_BPM) ** 2)
+        best = lags[np.argmax(autocorrelation[min_lag:max_lag + 1] * weights)]
+
+        # Sub frame period with a parabola around the peak
+        previous, current, following = autocorrelation[best - 1], autocorrelation[best], autocorrelation[best + 1]
+        curvature = previous - 2 * current + following
+        period = best + (np.clip((previous - following) / (2 * curvature), -1, 1) if abs(curvature) > 1e-12 else 0)
+
+        # Small tempo errors drift the grid over a whole track, try periods around the estimate
+        # and offsets in quarter frames together, keeping the grid that sums the most strength
+        best_score = -1
+        for candidate in period * (1 + np.linspace(-0.01, 0.01, 41)):
+            offsets = np.arange(0, candidate, 0.25)
+            beats_count = int((N - 1) // candidate) + 1
+            grid = np.rint(offsets[:, np.newaxis] + np.arange(beats_count) * candidate).astype(np.int64)
+            scores = np.where(grid < N, strength[np.minimum(grid, N - 1)], 0).sum(axis = -1)
+
+            if scores.max() > best_score:
+                best_score = scores.max()
+                period, offset = candidate, offsets[np.argmax(scores)]
+
+        beats_count = int((N - 1) // period) + 1
+        beat = np.zeros(N)
+        positions = np.rint(offset + np.arange(beats_count) * period).astype(np.int64)
+        beat[positions[positions < N]] = 1
+
+        beat_phase = ((np.arange(N) - offset) / period) % 1
+
+        return float(60 * fps / period), beat, beat_phase
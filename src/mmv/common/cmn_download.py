@@ -27,16 +27,15 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 import mmv.common.cmn_any_logger
-from pyunpack import Archive
-from tqdm import tqdm
-import requests
 import zipfile
 import logging
 import time
-import wget
 import sys
 import os
 
+# NOTE: wget, requests and pyunpack are imported on the methods using them as
+# downloading externals is rare and they add up on every `import mmv`
+
 
 class Download:
 
@@ -68,6 +67,7 @@ class Download:
             print(debug_prefix, f"Download file already exists, skipping")
             return
 
+        import wget
         wget.download(url, save, bar=self.wget_progress_bar)
         print()
     
@@ -77,6 +77,7 @@ class Download:
 
         print(debug_prefix, f"Getting content from [{url}]")
 
+        import requests
         r = requests.get(url)
         return r.text
 
@@ -85,6 +86,7 @@ class Download:
         debug_prefix = "[Download.extract_file]"
         print(debug_prefix, f"Extracing [{src}] -> [{dst}]")
 
+        from pyunpack import Archive
         Archive(src).extractall(dst)
     
     def extract_zip(self, src, dst):
@@ -27,6 +27,7 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 ===============================================================================
 """
 
+from mmv.common.cmn_utils import lazy_cv2
 import mmv.common.cmn_any_logger
 from PIL import Image
 import numpy as np
@@ -34,11 +35,8 @@ import skia
 import time
 import copy
 import sys
-import cv2
 import os
 
-cv2.setNumThreads(12)
-
 """
 original_image -> if we wanna "undo" all processing
 image -> current processed image
@@ -46,14 +44,51 @@ image -> current processed image
 class Frame:
     def __init__(self) -> None:
         self.size = 1
+
+        # How to rebuild the original image: the path it was loaded from and the resizes
+        # overriding it, None if it came from an array or some other override
+        self.source = None
+
+    # # Snapshots
+
+    # Images loaded from a path are rebuilt from the source instead of being serialized,
+    # the current image is always reset to the original one so we never store it
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop("image", None)
+        if state.get("source", None) is not None:
+            state.pop("original_image", None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        source = self.__dict__.get("source", None)
+
+        # Reload and redo the resizes
+        if source is not None:
+            self.load_from_path(source["path"])
+            for width, height in source["resizes"]:
+                self.original_image = self.original_image.resize(width, height)
+            self.source = source
+
+        if hasattr(self, "original_image"):
+            self.image = self.original_image
+            self._update_resolution()
     
     # # Internal functions
     
     # if override: self.original_image <-- self.image
-    def _override(self, override: bool) -> None:
+    # resize: (width, height) if this override is a resize we can redo from the source
+    def _override(self, override: bool, resize: tuple = None) -> None:
         if override:
             # self.original_image = skia.Image.fromarray(self.image.toarray())
             self.original_image = self.image
+
+            # Keep track of how to rebuild the original image
+            if (resize is not None) and (self.source is not None):
+                self.source["resizes"].append(resize)
+            else:
+                self.source = None
     
     # Update resolution from the array shape
     def _update_resolution(self) -> None:
@@ -87,6 +122,7 @@ class Frame:
         # Set the image
         self.original_image = skia.Image.fromarray(array)
         self.image = self.original_image
+        self.source = None
 
         # Update width, height info
         self.height = self.image.height()
@@ -118,6 +154,7 @@ class Frame:
         
         # Copy the original image
         self.image = self.original_image
+        self.source = {"path": path, "resizes": []}
 
         self._update_resolution()
 
@@ -151,7 +188,8 @@ class Frame:
 
         self.image = processing.resize(new_width, new_height)
 
-        self._override(override)
+        # Resizing the original image is something we can redo from the source, the current one isn't
+        self._override(override, resize = (new_width, new_height) if processing is self.original_image else None)
         self._update_resolution()
 
         # Return the offset to preserve the center
@@ -181,7 +219,7 @@ class Frame:
         )
 
         # Override or not, update resolution as this is a resize function
-        self._override(kwargs.get("override", False))
+        self._override(kwargs.get("override", False), resize = (w, h) if processing is self.original_image else None)
         # self._update_resolution()
         self.width, self.height = w, h
     
@@ -211,7 +249,7 @@ class Frame:
         processing = self._get_processing_image(from_current_frame)
 
         # Split the original image's channels
-        r, g, b, alpha = cv2.split(processing.toarray())
+        r, g, b, alpha = lazy_cv2().split(processing.toarray())
 
         # Multiply the alpha by that ratio
         alpha = np.array(alpha) * ratio
@@ -241,15 +279,15 @@ class Frame:
         processing = self._get_processing_image(from_current_frame)
         
         # Split the image into the channels
-        red, green, blue, alpha = cv2.split(processing)
+        red, green, blue, alpha = lazy_cv2().split(processing)
 
         # Get the rows and columns of the image
         img = np.array(self.original_image)
         rows, cols = img.shape[:2]
 
         # Calculate our mask
-        a = cv2.getGaussianKernel(2*cols, deviation_x)[cols - x: 2 * cols - x]
-        b = cv2.getGaussianKernel(2*rows, deviation_y)[rows - y: 2 * rows - y]
+        a = lazy_cv2().getGaussianKernel(2*cols, deviation_x)[cols - x: 2 * cols - x]
+        b = lazy_cv2().getGaussianKernel(2*rows, deviation_y)[rows - y: 2 * rows - y]
         c = b * a.T
         d = c/c.max()
 
@@ -28,6 +28,7 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 
 import mmv.common.cmn_any_logger
 from mmv.common.cmn_functions import Functions
+import numpy as np
 import random
 
 
@@ -96,3 +97,100 @@ class Interpolation:
         where = self.functions.proportion(total, 1, current)
         walk = distance * self.functions.sigmoid(where, smooth)
         return a + walk
+
+
+# # Compiled kernels
+
+# The Interpolation methods above take kwargs and recompute everything on every call,
+# these run once per animated property per object per frame (and once per FFT bin on the
+# music bars) so here we precompute the coefficients at construction and have positional
+# scalar / ndarray entry points, plus advance(n) that jumps n steps in closed form
+
+
+# Remaining approach walks ratio of the remaining distance each step, so after n steps
+# the remaining distance is (1 - ratio)^n of the starting one, a geometric series
+class RemainingApproachKernel:
+
+    # ratio is the one of a 60 fps video, it's converted to the given fps so the
+    # animations take the same time regardless of the frame rate.
+    # rng is anything with an uniform(a, b) method (a RandomStream), None uses the random module.
+    # The module itself isn't stored so the kernel stays picklable for snapshots
+    def __init__(self, ratio: float, fps: float = 60, ratio_randomness: float = 0, rng = None) -> None:
+        self.fps = fps
+        self.ratio_randomness = ratio_randomness
+        self.rng = rng
+        self.set_ratio(ratio)
+
+    # Ratio according to the fps of some 60 fps ratio
+    # https://gitlab.com/Tremeschin/modular-music-visualizer/-/issues/2
+    def fps_ratio(self, ratio: float) -> float:
+        return 1 - ((1 - ratio)**(60 / self.fps))
+
+    # Precompute the coefficients of some ratio
+    def set_ratio(self, ratio: float) -> None:
+        self.ratio = ratio
+        self.alpha = self.fps_ratio(ratio)
+        self.keep = 1 - self.alpha
+
+    # Where we draw the randomness from
+    def random_source(self):
+        return self.rng if self.rng is not None else random
+
+    # Effective ratio of this step, only draws a random number if we have randomness
+    def step_alpha(self) -> float:
+        if self.ratio_randomness:
+            return self.alpha + self.random_source().uniform(0, self.ratio_randomness)
+        return self.alpha
+
+    # Next value of a scalar
+    def step(self, current: float, target: float) -> float:
+        return current + ((target - current) * self.step_alpha())
+
+    # Next value with a different 60 fps ratio just this step (audio volume speed ups)
+    def step_ratio(self, current: float, target: float, ratio: float) -> float:
+        alpha = self.fps_ratio(ratio)
+        if self.ratio_randomness:
+            alpha += self.random_source().uniform(0, self.ratio_randomness)
+        return current + ((target - current) * alpha)
+
+    # Next values of an array, in place if out is given (can be current itself)
+    def step_array(self, current: np.ndarray, target: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        alpha = self.step_alpha()
+        if out is None:
+            return current + ((target - current) * alpha)
+        # Delta on a scratch array, out can alias current and must not be written before we're done reading it
+        delta = np.subtract(target, current)
+        delta *= alpha
+        np.add(current, delta, out = out)
+        return out
+
+    # Value after n steps towards a fixed target, randomness isn't considered
+    def advance(self, current, target, n: int):
+        return target + ((current - target) * (self.keep**n))
+
+
+# Linear from start to target in total_steps, clamped to the target after that
+class LinearKernel:
+    def __init__(self, start_value: float, target_value: float, total_steps: float) -> None:
+        self.set_points(start_value, target_value, total_steps)
+
+    # Precompute the part we walk each step
+    def set_points(self, start_value: float, target_value: float, total_steps: float) -> None:
+        self.start_value = start_value
+        self.target_value = target_value
+        self.total_steps = total_steps
+        self.part = (target_value - start_value) / total_steps
+
+    # Value at some step
+    def value(self, step: float) -> float:
+        if step > self.total_steps:
+            return self.target_value
+        return self.start_value + (self.part * step)
+
+    # Values at an array of steps
+    def value_array(self, steps: np.ndarray) -> np.ndarray:
+        return np.where(steps > self.total_steps, self.target_value, self.start_value + (self.part * steps))
+
+    # Value n steps after some step
+    def advance(self, step: float, n: int) -> float:
+        return self.value(step + n)
@@ -28,11 +28,12 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 
 from mmv.common.cmn_utils import DataUtils
 import mmv.common.cmn_any_logger
+import numpy as np
 import subprocess
+import threading
+import hashlib
 import logging
-import mido
-import copy
-import sys
+import shutil
 import os
 
 
@@ -60,6 +61,9 @@ class RangeNotes:
 # Wrapper and utilities for mido interface, processing MIDI files.
 class MidiFile:
     def load(self, path, bpm=130):
+        # mido is imported here so importing the skia interface doesn't load it
+        import mido
+
         self.midi = mido.MidiFile(path, clip=True)
         self.tempo = mido.bpm2tempo(bpm)
         self.range_notes = RangeNotes()
@@ -76,108 +80,231 @@ class MidiFile:
         return letter + octave
 
     # Basically, MIDI information -> timestamps dictionary
-    # Really finicky because how MIDI works on the ticks and channels and whatnot
+    # Every message is read once into arrays, absolute times come from a cumulative tempo map
+    # and notes are paired per (channel, note) with array operations. A note starts on a note_on
+    # with positive velocity and ends on the next note event of the same key, its velocity is
+    # the note_on one. Also sets self.notes with the start, end, channel, note, velocity arrays
     def get_timestamps(self):
         debug_prefix = "[MidiFile.get_timestamps]"
 
-        self.time_first_note = None
-        self.time = 0
+        # Absolute ticks, track and message index for ordering, type, channel, note, velocity, tempo
+        ticks, order, kinds, channels, notes, velocities, tempos = [], [], [], [], [], [], []
 
-        # Empty channels dictionary list
-        channels = { channel: {} for channel in range(0, 16) }
+        # Message kinds we care about
+        NOTE_ON, NOTE_OFF, TEMPO = 0, 1, 2
 
-        # Timestamps dictionary and "ongoing" midi notes, not finished        
-        self.timestamps = {
-            **{"tempo": []},
-            **channels,
-        }
+        for track_index, track in enumerate(self.midi.tracks):
+            absolute = np.cumsum([msg.time for msg in track], dtype = np.int64)
 
-        ongoing = copy.deepcopy(channels)
-
-        self.used_channels = []
-
-        # Iterate through each message on ALL midi tracks together...
-        # Use synchronous mode if possible TODO: right loop for every mode
-        for msg in mido.merge_tracks(self.midi.tracks):
-           
-            # Convert message time from absolute time
-            # in ticks to relative time in seconds.
-            if msg.time > 0:
-                delta = mido.tick2second(msg.time, self.midi.ticks_per_beat, self.tempo)
-            else:
-                delta = 0
-            
-            # Add to current time the delta based on tempo
-            self.time += delta
-
-            # Message is a note we play or release (or weirdly play at zero velocity for releasing)
-            if msg.type in ["note_on", "note_off"]:
-
-                # Time that the first note plays
-                if self.time_first_note is None:
-                    print(debug_prefix, f"Time of the first playing note on the MIDI file = [{self.time}]")
-                    self.time_first_note = self.time
-                
-                velocity = msg.velocity
-                channel = msg.channel
-                note = msg.note
+            for index, msg in enumerate(track):
+                if msg.type in ["note_on", "note_off"]:
+                    kind = NOTE_ON if ((msg.type == "note_on") and (msg.velocity > 0)) else NOTE_OFF
+                    kinds.append(kind); channels.append(msg.channel); notes.append(msg.note); velocities.append(msg.velocity); tempos.append(0)
+                elif msg.type == "set_tempo":
+                    kinds.append(TEMPO); channels.append(0); notes.append(0); velocities.append(0); tempos.append(msg.tempo)
+                else:
+                    continue
+                ticks.append(absolute[index])
+                order.append((track_index, index))
+
+        ticks = np.array(ticks, dtype = np.int64)
+        kinds = np.array(kinds, dtype = np.int8)
+        channels = np.array(channels, dtype = np.int16)
+        notes = np.array(notes, dtype = np.int16)
+        velocities = np.array(velocities, dtype = np.int16)
+        tempos = np.array(tempos, dtype = np.int64)
+
+        # Same order as mido.merge_tracks: by absolute tick, ties keep track order
+        if len(ticks):
+            track_order = np.array(order, dtype = np.int64)
+            sort = np.lexsort((track_order[:, 1], track_order[:, 0], ticks))
+            ticks, kinds, channels, notes, velocities, tempos = (array[sort] for array in (ticks, kinds, channels, notes, velocities, tempos))
+
+        # # Tempo map
+
+        # Segments start at tick zero with the loaded bpm then on every set_tempo
+        is_tempo = (kinds == TEMPO)
+        segment_ticks = np.concatenate([[0], ticks[is_tempo]])
+        segment_tempos = np.concatenate([[self.tempo], tempos[is_tempo]])
+
+        # Seconds at the start of each segment, cumulative sum of the previous segments durations
+        seconds_per_tick = segment_tempos / (self.midi.ticks_per_beat * 1e6)
+        segment_seconds = np.concatenate([[0], np.cumsum(np.diff(segment_ticks) * seconds_per_tick[:-1])])
+
+        # A tempo change applies from its own tick on
+        segment = np.searchsorted(segment_ticks, ticks, side = "right") - 1
+        times = segment_seconds[segment] + (ticks - segment_ticks[segment]) * seconds_per_tick[segment]
+
+        self.tempo = int(segment_tempos[-1])
+        self.time = float(times[-1]) if len(times) else 0
+
+        # # Pair notes
+
+        is_note = ~is_tempo
+        note_times, note_kinds, note_channels, note_notes, note_velocities = (array[is_note] for array in (times, kinds, channels, notes, velocities))
+
+        # Group by key keeping time order, an event is followed by the next one of the same key
+        key = note_channels.astype(np.int64) * 128 + note_notes
+        group = np.argsort(key, kind = "stable")
+        key, note_times, note_kinds, note_channels, note_notes, note_velocities = (array[group] for array in (key, note_times, note_kinds, note_channels, note_notes, note_velocities))
+
+        has_next = np.zeros(len(key), dtype = bool)
+        has_next[:-1] = (key[1:] == key[:-1])
+
+        # Notes never released end with the file
+        ends = np.full(len(key), self.time)
+        ends[:-1] = np.where(has_next[:-1], note_times[1:], self.time)
+
+        starts = (note_kinds == NOTE_ON)
+
+        # Back to time order so every note list is sorted by start
+        started = np.flatnonzero(starts)
+        started = started[np.argsort(note_times[started], kind = "stable")]
+
+        self.notes = {
+            "start": note_times[started],
+            "end": ends[started],
+            "channel": note_channels[started],
+            "note": note_notes[started],
+            "velocity": note_velocities[started],
+        }
 
-                if not channel in self.used_channels:
-                    self.used_channels.append(channel)
+        # # Old dictionary format
 
-                self.range_notes.update(note)
+        # Empty channels dictionary list
+        self.timestamps = {
+            **{"tempo": [[float(time), int(tempo)] for time, tempo in zip(times[is_tempo], tempos[is_tempo])]},
+            **{ channel: {} for channel in range(0, 16) },
+        }
 
-                if note in ongoing[channel].keys():
+        for start, end, channel, note, velocity in zip(*(self.notes[name].tolist() for name in ["start", "end", "channel", "note", "velocity"])):
+            self.timestamps[channel].setdefault(note, {"time": []})["time"].append([start, end, {"velocity": velocity}])
 
-                    if not note in self.timestamps[channel].keys():
-                        self.timestamps[channel][note] = {"time": []}
+        self.used_channels = sorted(set(note_channels.tolist()))
 
-                    # Append start, end and info values as a list
-                    self.timestamps[channel][note]["time"].append([
-                        ongoing[channel][note]["start"],
-                        self.time,
-                        {
-                            "velocity": velocity
-                        }
-                    ])
+        # Time that the first note plays
+        self.time_first_note = float(note_times.min()) if len(note_times) else None
+        print(debug_prefix, f"Time of the first playing note on the MIDI file = [{self.time_first_note}]")
 
-                    del ongoing[channel][note]
-                else:
-                    ongoing[channel][note] = {
-                        "start": self.time,
-                    }
-                
-            if msg.type == 'set_tempo':
-                self.tempo = msg.tempo
-                self.timestamps["tempo"].append([
-                    self.time, self.tempo
-                ])
-        self.used_channels.sort()
+        if len(note_notes):
+            self.range_notes.update(int(note_notes.min()))
+            self.range_notes.update(int(note_notes.max()))
 
+        print(f"{debug_prefix} [{len(started)}] notes, [{len(segment_tempos) - 1}] tempo changes, [{self.time:.2f}s] long")
         print("Channels on midi file:", self.used_channels)
 
-        # TODO: Need to adapt function to accept {} as third argument   
-        # for key in self.timestamps.keys():
-        #     if isinstance(key, int):
-        #         self.timestamps[key]["time"] = self.datautils.shorten_overlaps_keep_start_value(self.timestamps[key]["time"])
-       
-        # print(self.timestamps)
-        # print("Range:", self.range_notes.min, self.range_notes.max)
-        # print(self.timestamps)
-    
-    # Converts this midi file set previously to audio
-    def convert_to_audio(self, source_path, save_path, musescore_binary, bitrate = 300000):
+    # Converts a midi file to audio, rendered audio is kept on a cache keyed by the sha256 of the
+    # MIDI contents, bitrate, soundfont and renderer so changing any of them renders again and
+    # unchanged MIDIs are only copied from the cache. The cache defaults to a .midi_render_cache
+    # directory next to save_path. synthesizer is any callable (source_path, save_path, bitrate,
+    # soundfont) writing the audio, defaults to MuseScore, see SineSynthesizer for a stand-in
+    def convert_to_audio(self, source_path, save_path, musescore_binary = None, bitrate = 300000, soundfont = None, cache_directory = None, synthesizer = None):
         debug_prefix = "[MidiFile.convert_to_audio]"
         print(f"{debug_prefix} Converting [{source_path}] -> [{save_path}]")
-        
-        # If there is already a file by the save_path name, don't convert
-        if os.path.exists(save_path):
-            print(f"{debug_prefix} Save path [{save_path}] already exists, not converting to audio and overwriting..")
-            return
+
+        if synthesizer is None:
+            synthesizer = MuseScoreSynthesizer(musescore_binary)
+
+        if cache_directory is None:
+            cache_directory = os.path.join(os.path.dirname(os.path.abspath(save_path)), ".midi_render_cache")
+        os.makedirs(cache_directory, exist_ok = True)
+
+        key = self.render_key(source_path, bitrate, soundfont, synthesizer)
+        cached = os.path.join(cache_directory, key + os.path.splitext(save_path)[1])
+
+        # Same MIDI rendered with the same settings before
+        if os.path.exists(cached):
+            print(f"{debug_prefix} Using cached render [{cached}]")
+        else:
+            print(f"{debug_prefix} This might take a while, be patient..")
+
+            # Render on a temporary name so a failed conversion never ends up on the cache
+            root, extension = os.path.splitext(cached)
+            temporary = f"{root}.{os.getpid()}.{threading.get_ident()}.part{extension}"
+            synthesizer(source_path, temporary, bitrate, soundfont)
+
+            # Assert we were successful?
+            if not os.path.exists(temporary):
+                raise RuntimeError(f"Target save path don't exist after converting to audio [{temporary}]")
+
+            os.replace(temporary, cached)
+
+        if not os.path.abspath(cached) == os.path.abspath(save_path):
+            shutil.copyfile(cached, save_path)
+
+        # Return
+        return save_path
+
+    # Convert many (source_path, save_path) MIDI files at once with at most max_workers renders
+    # running, identical MIDIs with the same settings are rendered only once. Returns the
+    # save paths in order, raises after every job finished if any of them failed
+    def convert_many_to_audio(self, jobs, musescore_binary = None, bitrate = 300000, soundfont = None, cache_directory = None, synthesizer = None, max_workers = 2):
+        debug_prefix = "[MidiFile.convert_many_to_audio]"
+        from concurrent.futures import ThreadPoolExecutor
+
+        if synthesizer is None:
+            synthesizer = MuseScoreSynthesizer(musescore_binary)
+
+        # Group the jobs by render key, the first of each group renders and the others copy it
+        groups = {}
+        for source_path, save_path in jobs:
+            key = (self.render_key(source_path, bitrate, soundfont, synthesizer), os.path.splitext(save_path)[1], cache_directory or os.path.dirname(os.path.abspath(save_path)))
+            groups.setdefault(key, []).append((source_path, save_path))
+
+        print(f"{debug_prefix} Converting [{len(jobs)}] MIDI files, [{len(groups)}] unique renders on [{max_workers}] workers")
+
+        def convert_group(group):
+            for source_path, save_path in group:
+                self.convert_to_audio(source_path, save_path, bitrate = bitrate, soundfont = soundfont, cache_directory = cache_directory, synthesizer = synthesizer)
+
+        failures = []
+        with ThreadPoolExecutor(max_workers = max_workers) as pool:
+            futures = {pool.submit(convert_group, group): group for group in groups.values()}
+            for future, group in futures.items():
+                try:
+                    future.result()
+                except Exception as error:
+                    failures.append((group[0][0], error))
+
+        if failures:
+            raise RuntimeError(f"Failed converting [{len(failures)}] MIDI files to audio: {failures}")
+
+        return [save_path for _, save_path in jobs]
+
+    # Hex key of a render, sha256 of the MIDI contents and everything else that changes the audio
+    def render_key(self, source_path, bitrate, soundfont, synthesizer):
+        digest = hashlib.sha256()
+
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        # Soundfonts are identified by their contents too, they're big so only by size and mtime
+        if soundfont is not None:
+            stat = os.stat(soundfont)
+            soundfont = f"{os.path.abspath(soundfont)}|{stat.st_size}|{stat.st_mtime}"
+
+        digest.update(f"|{bitrate}|{soundfont}|{getattr(synthesizer, 'name', type(synthesizer).__name__)}".encode())
+        return digest.hexdigest()
+
+
+# Render MIDI files to audio with MuseScore's command line, the soundfont is whatever
+# MuseScore is configured with (it's only part of the cache key)
+class MuseScoreSynthesizer:
+    name = "musescore"
+
+    def __init__(self, musescore_binary):
+        self.musescore_binary = musescore_binary
+
+    def __call__(self, source_path, save_path, bitrate, soundfont = None):
+        debug_prefix = "[MuseScoreSynthesizer.__call__]"
+
+        if self.musescore_binary is None:
+            raise RuntimeError("No MuseScore binary given for converting MIDI to audio")
 
         # Command for converting midi -> audio
         command = [
-            musescore_binary,
+            self.musescore_binary,
             "-i", source_path,
             "-o", save_path,
             "-b", str(bitrate),  
@@ -185,7 +312,6 @@ class MidiFile:
 
         # Log for debug and info
         print(f"{debug_prefix} Command to run for converting midi to audio: {command}")
-        print(f"{debug_prefix} This might take a while, be patient..")
 
         # Don't try opening gui on headless ?
         env = os.environ.copy()
@@ -197,10 +323,58 @@ class MidiFile:
             command, env = env
         )
 
-        # Assert we were successful?
-        if not os.path.exists(save_path):
-            print(f"{debug_prefix} Target save path don't exist after converting to audio [{save_path}]")
-            sys.exit(-1)
 
-        # Return
-        return save_path
\ No newline at end of file
+# Stand-in synthesizer without external binaries, plays every note as a decaying sine and
+# writes a 16 bit WAV whatever the extension is. Good for tests and quick previews
+class SineSynthesizer:
+    name = "sine"
+
+    def __init__(self, sample_rate = 44100, release = 0.1):
+        self.sample_rate = sample_rate
+        self.release = release
+
+    def __call__(self, source_path, save_path, bitrate = None, soundfont = None):
+        import numpy as np
+        import wave
+        import mido
+
+        # Iterating a mido MidiFile yields the messages with their delta times in seconds
+        notes = []
+        ongoing = {}
+        now = 0
+
+        for msg in mido.MidiFile(source_path, clip = True):
+            now += msg.time
+
+            if msg.type in ["note_on", "note_off"]:
+                key = (msg.channel, msg.note)
+
+                if (msg.type == "note_on") and (msg.velocity > 0):
+                    ongoing[key] = (now, msg.velocity)
+                elif key in ongoing:
+                    start, velocity = ongoing.pop(key)
+                    notes.append((start, now, msg.note, velocity))
+
+        # Notes never released end with the file
+        for (_, note), (start, velocity) in ongoing.items():
+            notes.append((start, now, note, velocity))
+
+        audio = np.zeros(int((now + self.release) * self.sample_rate) + 1)
+
+        for start, end, note, velocity in notes:
+            first = int(start * self.sample_rate)
+            length = max(1, int((end - start + self.release) * self.sample_rate))
+            t = np.arange(length) / self.sample_rate
+            frequency = 440 * 2 ** ((note - 69) / 12)
+            audio[first:first + length] += (velocity / 127) * np.sin(2 * np.pi * frequency * t) * np.exp(-3 * t)
+
+        # Normalize so chords don't clip
+        peak = np.abs(audio).max(initial = 0)
+        if peak > 1:
+            audio /= peak
+
+        with wave.open(save_path, "wb") as output:
+            output.setnchannels(1)
+            output.setsampwidth(2)
+            output.setframerate(self.sample_rate)
+            output.writeframes((audio * 32767 * 0.9).astype(np.int16).tobytes())
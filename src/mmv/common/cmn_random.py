@@ -0,0 +1,110 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Seeded random number streams, reproducible renders regardless of object creation timing
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
+import numpy as np
+import hashlib
+import logging
+
+
+# One independent random stream, wraps a NumPy Generator and draws uniform samples in
+# blocks so the scalar calls (once per particle / shake point) don't pay NumPy's per call
+# overhead. The methods mirror the ones of the random module we used before
+class RandomStream:
+    def __init__(self, seed_sequence, block_size: int = 256) -> None:
+        self.generator = np.random.default_rng(seed_sequence)
+        self.block_size = block_size
+        self.block = self.generator.random(self.block_size)
+        self.index = 0
+
+    # Uniform float on [0, 1)
+    def random(self) -> float:
+        if self.index >= self.block_size:
+            self.block = self.generator.random(self.block_size)
+            self.index = 0
+        value = self.block[self.index]
+        self.index += 1
+        return float(value)
+
+    # Uniform float on [a, b)
+    def uniform(self, a: float, b: float) -> float:
+        return a + ((b - a) * self.random())
+
+    # Uniform integer on [a, b] (inclusive as random.randint), floats are truncated
+    def randint(self, a, b) -> int:
+        a, b = int(a), int(b)
+        if a > b:
+            raise ValueError(f"empty range for randint ({a}, {b})")
+        return a + int(self.random() * (b - a + 1))
+
+    # Random element of a sequence
+    def choice(self, sequence):
+        return sequence[int(self.random() * len(sequence))]
+
+    # Vectorized blocks straight from the Generator
+    def uniform_array(self, a: float, b: float, size) -> np.ndarray:
+        return self.generator.uniform(a, b, size)
+
+    def randint_array(self, a, b, size) -> np.ndarray:
+        return self.generator.integers(int(a), int(b), size, endpoint = True)
+
+
+# Every object asks for its own stream derived from the scene seed plus a key, so the
+# numbers one object gets don't depend on how many numbers any other object has drawn.
+# Two renders with the same seed are identical and any frame range can be re-rendered
+# matching the original.
+class RandomStreams:
+    def __init__(self, seed: int = None, depth = LOG_NO_DEPTH) -> None:
+        self.set_seed(seed, depth = depth)
+
+    # Set the scene seed, None draws one from the OS. Resets the per purpose counters
+    def set_seed(self, seed: int = None, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[RandomStreams.set_seed]"
+
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % (2**63))
+            logging.info(f"{depth}{debug_prefix} No seed given, drew [{seed}] (pass it as the seed to reproduce this render)")
+        else:
+            logging.info(f"{depth}{debug_prefix} Scene seed is [{seed}]")
+
+        self.seed = int(seed)
+        self.counters = {}
+
+    # Stream of some key, the same seed and key always yields the same stream.
+    # Python's hash() is salted per process so we hash the key ourselves
+    def stream(self, key: str) -> RandomStream:
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        words = np.frombuffer(digest[:16], dtype = np.uint32).tolist()
+        return RandomStream(np.random.SeedSequence([self.seed % (2**32), self.seed // (2**32)] + words))
+
+    # Stream of the next object of some purpose (class name usually), objects are created in
+    # the same order on every run of the same scene so "purpose:n" works as their identifier
+    def spawn(self, purpose: str) -> RandomStream:
+        index = self.counters.get(purpose, 0)
+        self.counters[purpose] = index + 1
+        return self.stream(f"{purpose}:{index}")
@@ -0,0 +1,126 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Read only, attribute based settings compiled from the prelude.toml files
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+import keyword
+
+
+# The prelude.toml files are validated once when the interfaces load them and frozen
+# into these objects, each section is an instance of a class generated with __slots__
+# for its keys so a hot path checking some logging flag is just an attribute read:
+#
+#     self.preludec = self.mmvskia_main.prelude.mmvimage
+#     if self.preludec.next.debug_timings:
+#         ...
+#
+# Indexing like the old dictionaries (prelude["mmvimage"]["next"]) still works
+class FrozenSettings:
+    __slots__ = ()
+
+    # Generated classes by the section keys, sections with the same keys share one
+    _classes = {}
+
+    # Methods we have, keys with these names would hide them
+    RESERVED = ["get", "keys", "to_dict"]
+
+    # Types a setting can have, toml arrays become tuples
+    LEAF_TYPES = (bool, int, float, str, tuple)
+
+    # Validate and build the settings object of a (nested) dictionary, name is the
+    # path of this section for the error messages
+    @staticmethod
+    def from_dict(data: dict, name: str = "prelude") -> "FrozenSettings":
+        values = {}
+
+        for key, value in data.items():
+            path = f"{name}.{key}"
+
+            # Must be accessible as an attribute
+            if (not isinstance(key, str)) or (not key.isidentifier()) or keyword.iskeyword(key) or (key in FrozenSettings.RESERVED) or key.startswith("__"):
+                raise ValueError(f"Setting [{path}] can't be used as an attribute name")
+
+            if isinstance(value, dict):
+                value = FrozenSettings.from_dict(value, name = path)
+            elif isinstance(value, list):
+                value = tuple(value)
+
+            if not isinstance(value, FrozenSettings.LEAF_TYPES + (FrozenSettings,)):
+                raise ValueError(f"Setting [{path}] has unsupported type [{type(value).__name__}]")
+
+            values[key] = value
+
+        # Get or generate the slotted class for these keys
+        keys = tuple(values.keys())
+        settings_class = FrozenSettings._classes.get(keys, None)
+
+        if settings_class is None:
+            settings_class = type("FrozenSettings", (FrozenSettings,), {"__slots__": keys})
+            FrozenSettings._classes[keys] = settings_class
+
+        settings = object.__new__(settings_class)
+        for key, value in values.items():
+            object.__setattr__(settings, key, value)
+        return settings
+
+    # # Read only
+
+    def __setattr__(self, key, value) -> None:
+        raise AttributeError(f"Settings are read only, can't set [{key}]")
+
+    def __delattr__(self, key) -> None:
+        raise AttributeError(f"Settings are read only, can't delete [{key}]")
+
+    # # Dictionary like access
+
+    def keys(self) -> tuple:
+        return type(self).__slots__
+
+    def __getitem__(self, key):
+        if key not in type(self).__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in type(self).__slots__
+
+    def get(self, key, default = None):
+        if key not in type(self).__slots__:
+            return default
+        return getattr(self, key)
+
+    def to_dict(self) -> dict:
+        return {
+            key: (value.to_dict() if isinstance(value, FrozenSettings) else value)
+            for key, value in ((key, getattr(self, key)) for key in self.keys())
+        }
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    # The generated classes aren't importable, pickle (snapshots) as the dictionary
+    def __reduce__(self):
+        return (FrozenSettings.from_dict, (self.to_dict(),))
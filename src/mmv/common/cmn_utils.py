@@ -39,11 +39,23 @@ import glob
 import math
 import time
 import uuid
-import yaml
 import sys
 import os
 
 
+# OpenCV is slow to import and only some parts of the skia backend use it, load
+# it (and set its threads) on the first call instead of on every `import mmv`
+_cv2 = None
+
+def lazy_cv2():
+    global _cv2
+    if _cv2 is None:
+        import cv2
+        cv2.setNumThreads(12)
+        _cv2 = cv2
+    return _cv2
+
+
 class Utils:
     def __init__(self):
         self.os = self.get_os()
@@ -262,8 +274,9 @@ class Utils:
             print("src and dst must be dirs")
             sys.exit(-1)
 
-    # Get the full path of a random file from a given directory
-    def random_file_from_dir(self, path, depth = LOG_NO_DEPTH, silent = False):
+    # Get the full path of a random file from a given directory, rng is anything with a
+    # choice(sequence) method (a RandomStream), defaults to the random module
+    def random_file_from_dir(self, path, depth = LOG_NO_DEPTH, silent = False, rng = None):
         debug_prefix = "[Utils.random_file_from_dir]"
         ndepth = depth + LOG_NEXT_DEPTH
 
@@ -271,8 +284,9 @@ class Utils:
         if not silent:
             logging.debug(f"{depth}{debug_prefix} Get random file / name from path [{path}]")
 
-        # Actually get the random file from the directory
-        r = random.choice([f"{path}{os.path.sep}{name}" for name in os.listdir(path)])
+        # Actually get the random file from the directory, sorted as listdir's order is arbitrary.
+        # Hidden files are skipped (manifests such as PyGradienter's cache key, .DS_Store)
+        r = (rng if rng is not None else random).choice([f"{path}{os.path.sep}{name}" for name in sorted(os.listdir(path)) if not name.startswith(".")])
 
         # Debug and return the path
         if not silent:
@@ -425,6 +439,7 @@ class Utils:
 
         # Open file in read mode
         with open(path, "r") as f:
+            import yaml
             data = yaml.load(f, Loader = yaml.FullLoader)
 
         # Log read data
@@ -451,6 +466,7 @@ class Utils:
         path = self.get_abspath(path, depth = ndepth, silent = True)
 
         with open(path, "w") as f:
+            import yaml
             yaml.dump(data, f, default_flow_style = False)
 
     # Load a toml and return its content
@@ -27,19 +27,396 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
+from mmv.common.cmn_utils import lazy_cv2
 import mmv.common.cmn_any_logger
+from collections import deque
 from PIL import Image
 import numpy as np
 import subprocess
+import threading
+import tempfile
 import logging
+import shutil
+import json
 import copy
 import time
 import sys
-import cv2
+import os
+
+
+# Converts the RGBA / BGRA frames Skia gives us into the pixel format we pipe to FFmpeg.
+# Feeding FFmpeg a format closer to what the encoder wants saves it a full colorspace
+# conversion per frame (swscale is single threaded on its side of the pipe), OpenCV does
+# the same job multithreaded and releases the GIL so this runs fine on the pipe writer thread
+class PipeFrameConverter:
+
+    # OpenCV conversion codes names for (source, target) pixel formats
+    CV2_CONVERSION_CODES = {
+        ("rgba", "rgb24"): "COLOR_RGBA2RGB",
+        ("bgra", "rgb24"): "COLOR_BGRA2RGB",
+        ("rgba", "yuv420p"): "COLOR_RGBA2YUV_I420",
+        ("bgra", "yuv420p"): "COLOR_BGRA2YUV_I420",
+    }
+
+    def __init__(self, source_pix_fmt: str, target_pix_fmt: str, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[PipeFrameConverter.__init__]"
+        self.source_pix_fmt = source_pix_fmt
+        self.target_pix_fmt = target_pix_fmt
+
+        # Nothing to convert, images go straight into the pipe
+        if self.source_pix_fmt == self.target_pix_fmt:
+            self.code = None
+        else:
+            code = PipeFrameConverter.CV2_CONVERSION_CODES.get((self.source_pix_fmt, self.target_pix_fmt), None)
+
+            # We don't know how to convert these
+            if code is None:
+                raise RuntimeError(f"No conversion from pixel format [{self.source_pix_fmt}] to [{self.target_pix_fmt}]")
+
+            self.cv2 = lazy_cv2()
+            self.code = getattr(self.cv2, code)
+
+        logging.info(f"{depth}{debug_prefix} Pipe frames conversion [{self.source_pix_fmt}] -> [{self.target_pix_fmt}]")
+
+    # Convert one (height, width, 4) image, yuv420p returns the planar (height * 3/2, width) I420
+    # layout FFmpeg expects. OpenCV's RGB -> I420 is BT.601 limited range, same as FFmpeg's default
+    def convert(self, image):
+        if self.code is None:
+            return image
+        return self.cv2.cvtColor(image, self.code)
+
+
+# Structured throughput telemetry of the pipe between the renderer and FFmpeg.
+# Tells us who's the bottleneck: if the render thread spends its time blocked waiting for
+# room on the pipe buffer FFmpeg is the slow one, if the writer thread spends its time
+# waiting for images then it's Skia. Records are dictionaries sent to a callback and / or
+# appended as JSON lines to a file so dashboards don't have to parse the terminal output
+class PipeTelemetry:
+    def __init__(self,
+        frame_count: int,
+        fps: float,
+        max_queue_depth: int,
+        callback = None,  # Function that receives every record dictionary
+        jsonl_path: str = None,  # Append records as JSON lines to this file
+        every: int = None,  # Emit a record every this many encoded frames, defaults to one per second of video
+        window: int = 120,  # Rolling window size in frames for the fps and ETA
+        depth = LOG_NO_DEPTH,
+    ) -> None:
+        debug_prefix = "[PipeTelemetry.__init__]"
+
+        self.frame_count = frame_count
+        self.fps = fps
+        self.max_queue_depth = max_queue_depth
+        self.callback = callback
+        self.jsonl_path = jsonl_path
+        self.every = every if every is not None else max(1, int(fps))
+
+        # Timestamps of rendered (handed to the pipe) and encoded (written to stdin) frames
+        self.render_times = deque(maxlen = window)
+        self.encode_times = deque(maxlen = window)
+
+        # Seconds spent blocked, on stdin.write (FFmpeg not reading) and on the render thread
+        # waiting for room on the pipe buffer (back pressure)
+        self.write_blocked_total = 0
+        self.write_blocked_window = deque(maxlen = window)
+        self.render_blocked_total = 0
+
+        self.rendered = 0
+        self.encoded = 0
+        self.queue_depth = 0
+        self.start = None
+
+        # Start a fresh metrics file
+        if self.jsonl_path is not None:
+            logging.info(f"{depth}{debug_prefix} Writing pipe telemetry as JSON lines to [{self.jsonl_path}]")
+            open(self.jsonl_path, "w").close()
+
+    # The render thread handed one image to the pipe buffer after being blocked for some seconds
+    def record_render(self, queue_depth: int, blocked: float) -> None:
+        now = time.time()
+        if self.start is None:
+            self.start = now
+        self.render_times.append(now)
+        self.render_blocked_total += blocked
+        self.queue_depth = queue_depth
+        self.rendered += 1
+
+    # The writer thread finished writing one image to FFmpeg's stdin which took some seconds
+    def record_encode(self, queue_depth: int, write_seconds: float) -> None:
+        now = time.time()
+        if self.start is None:
+            self.start = now
+        self.encode_times.append(now)
+        self.write_blocked_total += write_seconds
+        self.write_blocked_window.append(write_seconds)
+        self.queue_depth = queue_depth
+        self.encoded += 1
+
+        # Emit periodically and on the last frame
+        if (self.encoded % self.every == 0) or (self.encoded == self.frame_count):
+            self.emit(self.record())
+
+    # Frames per second of a deque of timestamps, None while we don't have at least two
+    def rolling_fps(self, times) -> float:
+        if len(times) < 2:
+            return None
+        took = times[-1] - times[0]
+        if took <= 0:
+            return None
+        return (len(times) - 1) / took
+
+    # Build the current telemetry record
+    def record(self) -> dict:
+        now = time.time()
+        elapsed = (now - self.start) if self.start is not None else 0
+
+        render_fps = self.rolling_fps(self.render_times)
+        encode_fps = self.rolling_fps(self.encode_times)
+
+        # Rolling ETA on the encode rate, unknown until we have a rate
+        remaining_frames = self.frame_count - self.encoded
+        eta = (remaining_frames / encode_fps) if encode_fps else None
+
+        # Who's holding the other back
+        if self.queue_depth >= self.max_queue_depth - 1:
+            bottleneck = "encoder"
+        elif self.queue_depth <= 1:
+            bottleneck = "renderer"
+        else:
+            bottleneck = "balanced"
+
+        return {
+            "time": now,
+            "elapsed": elapsed,
+            "frame": self.encoded,
+            "frame_count": self.frame_count,
+            "progress": (self.encoded / self.frame_count) if self.frame_count else 0,
+            "video_time": self.encoded / self.fps,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "render_fps": render_fps,
+            "encode_fps": encode_fps,
+            "write_blocked_last": self.write_blocked_window[-1] if self.write_blocked_window else 0,
+            "write_blocked_window_average": (sum(self.write_blocked_window) / len(self.write_blocked_window)) if self.write_blocked_window else 0,
+            "write_blocked_total": self.write_blocked_total,
+            "render_blocked_total": self.render_blocked_total,
+            "eta": eta,
+            "bottleneck": bottleneck,
+        }
+
+    # Send a record to the callback and / or the JSON lines file
+    def emit(self, record: dict) -> None:
+        if self.callback is not None:
+            self.callback(record)
+
+        if self.jsonl_path is not None:
+            with open(self.jsonl_path, "a") as metrics:
+                metrics.write(json.dumps(record) + "\n")
 
 
 class FFmpegWrapper:
 
+    # # Encoder profiles
+
+    # Named encoder settings so we don't have to juggle preset / crf / tune by hand.
+    # Every profile pins the encoder threads, slices and lookahead so the encoder CPU
+    # usage can be balanced against Skia's render threads on the same machine.
+    #
+    # "threads_share": Fraction of the logical CPUs the encoder gets when threads are "auto"
+    # "slices": Slices per frame (x264 sliced threads / FFV1 slices), None lets the encoder decide
+    # "lookahead": Frames of rate control lookahead, None lets the encoder decide
+    # "dumb_player": Overrides the dumb player (yuv420p) compatibility flag
+    # "container": Required output container extension, None accepts whatever the user asked
+    #
+    # These are sensible starting points, tweak threads_share for your machine
+    ENCODER_PROFILES = {
+
+        # Lowest latency possible, for previewing stuff quickly, leaves most CPU to the renderer
+        "fast_preview": {
+            "vcodec": "libx264",
+            "preset": "ultrafast",
+            "tune": "zerolatency",
+            "crf": 23,
+            "threads_share": 0.25,
+            "slices": 4,
+            "lookahead": 0,
+            "dumb_player": True,
+            "container": None,
+        },
+
+        # Lossless intermediate with FFV1, keeps RGB(A) untouched for post processing later on
+        "archive_master": {
+            "vcodec": "ffv1",
+            "threads_share": 0.5,
+            "slices": 16,
+            "lookahead": None,
+            "dumb_player": False,
+            "container": ".mkv",
+        },
+
+        # Lossless intermediate with x264 RGB, bigger files than FFV1 but decodes faster
+        "archive_master_x264": {
+            "vcodec": "libx264rgb",
+            "preset": "ultrafast",
+            "crf": 0,
+            "threads_share": 0.5,
+            "slices": None,
+            "lookahead": 0,
+            "dumb_player": False,
+            "container": ".mkv",
+        },
+
+        # Final upload, slow preset with a long lookahead so the rate control behaves close
+        # to a two pass encode on a single pass
+        "delivery": {
+            "vcodec": "libx264",
+            "preset": "slow",
+            "tune": "film",
+            "crf": 18,
+            "threads_share": 0.5,
+            "slices": None,
+            "lookahead": 60,
+            "dumb_player": True,
+            "container": None,
+        },
+    }
+
+    # Get the profile settings dictionary, raises if it doesn't exist
+    def get_encoder_profile(self, profile: str) -> dict:
+        if not profile in FFmpegWrapper.ENCODER_PROFILES.keys():
+            raise RuntimeError(f"Unknown encoder profile [{profile}], available: {list(FFmpegWrapper.ENCODER_PROFILES.keys())}")
+        return FFmpegWrapper.ENCODER_PROFILES[profile]
+
+    # Video encoder arguments of some profile, encoder_threads "auto" uses the profile's
+    # threads_share of the available logical CPUs
+    def encoder_profile_arguments(self, profile: str, encoder_threads = "auto", depth = LOG_NO_DEPTH) -> list:
+        debug_prefix = "[FFmpegWrapper.encoder_profile_arguments]"
+        settings = self.get_encoder_profile(profile)
+
+        # How many threads the encoder gets
+        if encoder_threads == "auto":
+            encoder_threads = max(1, int(round((os.cpu_count() or 1) * settings["threads_share"])))
+
+        logging.info(f"{depth}{debug_prefix} Encoder profile [{profile}] with [{encoder_threads}] threads: {settings}")
+
+        vcodec = settings["vcodec"]
+        arguments = ["-c:v", vcodec, "-threads", f"{encoder_threads}"]
+
+        # x264 family, threads / slices / lookahead go on x264-params
+        if vcodec in ["libx264", "libx264rgb"]:
+            arguments += ["-preset", settings["preset"]]
+
+            if "tune" in settings.keys():
+                arguments += ["-tune", settings["tune"]]
+
+            # crf 0 on 8 bit x264 is lossless
+            arguments += ["-crf", f"{settings['crf']}"]
+
+            x264_params = [f"threads={encoder_threads}"]
+
+            if settings["slices"] is not None:
+                x264_params += ["sliced-threads=1", f"slices={settings['slices']}"]
+
+            if settings["lookahead"] is not None:
+                x264_params += [f"rc-lookahead={settings['lookahead']}"]
+
+            arguments += ["-x264-params", ":".join(x264_params)]
+
+        # FFV1 version 3 is the one that supports slice threading, intra only with slice CRCs
+        elif vcodec == "ffv1":
+            arguments += ["-level", "3", "-g", "1", "-slicecrc", "1"]
+
+            if settings["slices"] is not None:
+                arguments += ["-slices", f"{settings['slices']}"]
+
+        return arguments
+
+    # # Decoded audio input
+
+    # Instead of FFmpeg decoding the audio file a second time (and copying streams that
+    # may not fit the output container) we send the PCM AudioFile already decoded as raw
+    # float32 through a FIFO fed by a thread. Windows doesn't have FIFOs so there we dump the
+    # PCM into a temporary raw file once, FFmpeg still doesn't decode anything
+    def pcm_audio_input(self, audio_source, start_time: float = 0, depth = LOG_NO_DEPTH) -> list:
+        debug_prefix = "[FFmpegWrapper.pcm_audio_input]"
+
+        self.pcm_temporary_directory = tempfile.mkdtemp(prefix = "mmv-pcm-")
+        self.pcm_path = os.path.join(self.pcm_temporary_directory, "audio.f32le")
+
+        if hasattr(os, "mkfifo"):
+            logging.info(f"{depth}{debug_prefix} Creating audio FIFO at [{self.pcm_path}]")
+            os.mkfifo(self.pcm_path)
+
+            # Opening the FIFO blocks until FFmpeg opens it so this has to be on a thread
+            self.pcm_writer_thread = threading.Thread(
+                target = self.pcm_writer,
+                args = (audio_source, self.pcm_path, start_time),
+                daemon = True,
+            )
+        else:
+            logging.info(f"{depth}{debug_prefix} No FIFOs on this OS, writing raw PCM to [{self.pcm_path}]")
+            self.pcm_writer(audio_source, self.pcm_path, start_time)
+
+        return [
+            "-f", "f32le",
+            "-ar", f"{audio_source.sample_rate}",
+            "-ac", f"{audio_source.stereo_data.shape[0]}",
+            "-thread_queue_size", "512",
+            "-i", self.pcm_path,
+        ]
+
+    # Write the interleaved float32 PCM of an AudioFile to some path, in chunks so we never
+    # have a second full copy of the audio in memory
+    def pcm_writer(self, audio_source, path: str, start_time: float = 0, chunk_seconds: float = 5) -> None:
+        chunk = int(audio_source.sample_rate * chunk_seconds)
+        total = audio_source.stereo_data.shape[1]
+        first = int(start_time * audio_source.sample_rate)
+
+        with open(path, "wb") as pcm:
+            for start in range(first, total, chunk):
+                pcm.write(np.ascontiguousarray(audio_source.stereo_data[:, start:start + chunk].T, dtype = np.float32).tobytes())
+
+    # Pixel formats we can convert the frames to before writing them into the pipe
+    PIPE_PIXEL_FORMATS = ["rgb24", "yuv420p"]
+
+    # Decide which pixel format we write into FFmpeg's stdin
+    # "auto" picks yuv420p when we're encoding for dumb players (the output would be yuv420p anyways)
+    # and the resolution allows 4:2:0 chroma subsampling, otherwise keeps the source pixel format
+    # so encoders that care about alpha (or full chroma) still get it
+    def negotiate_pipe_pixel_format(self,
+        source_pix_fmt: str,  # rgba, bgra
+        pipe_pix_fmt: str,  # auto, rgb24, yuv420p or the same as the source
+        dumb_player: bool,
+        width: int,
+        height: int,
+        depth = LOG_NO_DEPTH,
+    ) -> str:
+
+        debug_prefix = "[FFmpegWrapper.negotiate_pipe_pixel_format]"
+
+        # yuv420p needs even dimensions
+        even_resolution = (width % 2 == 0) and (height % 2 == 0)
+
+        if pipe_pix_fmt == "auto":
+            if dumb_player and even_resolution:
+                negotiated = "yuv420p"
+            else:
+                negotiated = source_pix_fmt
+
+        elif pipe_pix_fmt in [source_pix_fmt, None]:
+            negotiated = source_pix_fmt
+
+        elif pipe_pix_fmt in FFmpegWrapper.PIPE_PIXEL_FORMATS:
+            if (pipe_pix_fmt == "yuv420p") and (not even_resolution):
+                raise RuntimeError(f"Pipe pixel format yuv420p needs even width and height, got [{width}x{height}]")
+            negotiated = pipe_pix_fmt
+
+        else:
+            raise RuntimeError(f"Unknown pipe pixel format [{pipe_pix_fmt}], expected one of {['auto', source_pix_fmt] + FFmpegWrapper.PIPE_PIXEL_FORMATS}")
+
+        logging.info(f"{depth}{debug_prefix} Source pixel format [{source_pix_fmt}], requested pipe pixel format [{pipe_pix_fmt}], negotiated [{negotiated}]")
+        return negotiated
+
     # Create a FFmpeg writable pipe for generating a video
     # For more detailed info see [https://trac.ffmpeg.org/wiki/Encode/H.264]
     def pipe_images_to_video(self, 
@@ -50,12 +427,21 @@ class FFmpegWrapper:
         output_video: str, # Path
         pix_fmt: str,  # rgba, rgb24, bgra
         framerate: int,
+        pipe_pix_fmt: str = "auto",  # Convert images to this before piping, see negotiate_pipe_pixel_format
         preset: str = "slow",  # libx264 ffmpeg preset
         hwaccel = "auto",  # Try utilizing hardware acceleration? None ignores this flag
         opencl: bool = False,  # Add -x264opts opencl ?
         dumb_player: bool = True,  # Add -vf format=yuv420p for compatibility
         crf: int = 17,  # Constant Rate Factor [0: lossless, 23: default, 51: worst] 
         vcodec: str = "libx264",  # Encoder library, libx264 or libx265
+        audio_codec: str = "copy",  # "copy" muxes the input audio file as is, anything else encodes the decoded PCM from audio_source
+        audio_bitrate = None,  # Audio encoder bitrate like "320k", None for the encoder default
+        audio_source = None,  # Already read AudioFile, needed when audio_codec isn't "copy"
+        audio_start_time: float = 0,  # Start the audio at this second, for resuming renders
+        output_width: int = None,  # Upscale the piped frames to this resolution when encoding, None keeps width x height
+        output_height: int = None,
+        profile: str = None,  # Encoder profile name on ENCODER_PROFILES, overrides vcodec, preset, crf, opencl
+        encoder_threads = "auto",  # Encoder threads when using a profile, "auto" or int
         override: bool = True,  # Do override the target output video if it exists?
         depth = LOG_NO_DEPTH,
     ) -> None:
@@ -63,40 +449,101 @@ class FFmpegWrapper:
         debug_prefix = "[FFmpegWrapper.pipe_images_to_video]"
         ndepth = depth + LOG_NEXT_DEPTH
 
+        # Profiles can force the dumb player flag and need some specific container
+        if profile is not None:
+            settings = self.get_encoder_profile(profile)
+            dumb_player = settings["dumb_player"]
+
+            # Change the extension of the output video if the container doesn't support the codec
+            if settings["container"] is not None:
+                root, extension = os.path.splitext(output_video)
+                if not extension.lower() == settings["container"]:
+                    output_video = root + settings["container"]
+                    logging.warning(f"{ndepth}{debug_prefix} Encoder profile [{profile}] needs a [{settings['container']}] container, output video changed to [{output_video}]")
+
+        # Which pixel format we'll actually write into the pipe
+        pipe_pix_fmt = self.negotiate_pipe_pixel_format(
+            source_pix_fmt = pix_fmt,
+            pipe_pix_fmt = pipe_pix_fmt,
+            dumb_player = dumb_player,
+            width = width,
+            height = height,
+            depth = ndepth,
+        )
+        self.frame_converter = PipeFrameConverter(source_pix_fmt = pix_fmt, target_pix_fmt = pipe_pix_fmt, depth = ndepth)
+
+        # No decoded audio being fed unless pcm_audio_input says so
+        self.pcm_writer_thread = None
+        self.pcm_temporary_directory = None
+
         # Generate the command for piping images to
         ffmpeg_pipe_command = [
             ffmpeg_binary_path
         ]
 
-        # Add hwaccel flag if it's set
-        if hwaccel is not None:
+        # Add hwaccel flag if it's set, it's a decoding flag so it does nothing on the
+        # rawvideo pipe, profiles don't bother with it
+        if (hwaccel is not None) and (profile is None):
             ffmpeg_pipe_command += ["-hwaccel", hwaccel]
 
-        # Add the rest of the command
+        # Add the inputs
         ffmpeg_pipe_command += [
             "-loglevel", "panic",
             "-nostats",
             "-hide_banner",
             "-f", "rawvideo",
             # "-vcodec", "rawvideo",
-            "-pix_fmt", pix_fmt,
+            "-pix_fmt", pipe_pix_fmt,
             "-r", f"{framerate}",
             "-s", f"{width}x{height}",
+            "-thread_queue_size", "512",
             "-i", "-",
-            "-i", input_audio_file,
-            "-c:v", f"{vcodec}",
-            "-preset", preset,
+        ]
+
+        # Audio input, either the file itself or the PCM we already decoded
+        if audio_codec == "copy":
+            if audio_start_time:
+                ffmpeg_pipe_command += ["-ss", f"{audio_start_time}"]
+            ffmpeg_pipe_command += ["-i", input_audio_file]
+        else:
+            if audio_source is None:
+                raise RuntimeError(f"Audio codec [{audio_codec}] needs the decoded audio_source, got None")
+            ffmpeg_pipe_command += self.pcm_audio_input(audio_source = audio_source, start_time = audio_start_time, depth = ndepth)
+
+        # Video encoder settings
+        if profile is not None:
+            ffmpeg_pipe_command += self.encoder_profile_arguments(profile = profile, encoder_threads = encoder_threads, depth = ndepth)
+        else:
+            ffmpeg_pipe_command += [
+                "-c:v", f"{vcodec}",
+                "-preset", preset,
+                "-crf", f"{crf}",
+            ]
+
+        ffmpeg_pipe_command += [
             "-r", f"{framerate}",
-            "-crf", f"{crf}",
-            "-c:a", "copy",
+            "-c:a", audio_codec,
         ]
 
-        # Compatibility mode
-        if dumb_player:
-            ffmpeg_pipe_command += ["-vf", "format=yuv420p"]
+        # Audio bitrate, meaningless when copying
+        if (audio_bitrate is not None) and (not audio_codec == "copy"):
+            ffmpeg_pipe_command += ["-b:a", f"{audio_bitrate}"]
+
+        # Video filters, upscaling draft renders and compatibility mode (no need for
+        # it if we're already piping yuv420p)
+        video_filters = []
+
+        if (output_width is not None) and (output_height is not None) and (not [output_width, output_height] == [width, height]):
+            video_filters.append(f"scale={output_width}:{output_height}:flags=bicubic")
+
+        if dumb_player and (not pipe_pix_fmt == "yuv420p"):
+            video_filters.append("format=yuv420p")
+
+        if video_filters:
+            ffmpeg_pipe_command += ["-vf", ",".join(video_filters)]
 
         # Add opencl to x264 flags?
-        if opencl:
+        if opencl and (profile is None):
             ffmpeg_pipe_command += ["-x264opts", "opencl"]
    
         # Add output video
@@ -119,19 +566,45 @@ class FFmpegWrapper:
 
         print(debug_prefix, "Open one time pipe")
 
+        # Start feeding the decoded audio to FFmpeg
+        if self.pcm_writer_thread is not None:
+            self.pcm_writer_thread.start()
+
+        # The output might have been changed by the encoder profile
+        self.output_video = output_video
+
         self.stop_piping = False
         self.lock_writing = False
         self.images_to_pipe = {}
+        self.telemetry = None
+
+    # Configure the pipe telemetry, call this before starting pipe_writer_loop
+    # See PipeTelemetry for the arguments
+    def configure_telemetry(self, frame_count: int, fps: float, max_queue_depth: int, callback = None, jsonl_path: str = None, every: int = None, depth = LOG_NO_DEPTH) -> None:
+        self.max_images_on_pipe_buffer = max_queue_depth
+        self.telemetry = PipeTelemetry(
+            frame_count = frame_count,
+            fps = fps,
+            max_queue_depth = max_queue_depth,
+            callback = callback,
+            jsonl_path = jsonl_path,
+            every = every,
+            depth = depth,
+        )
 
     # Write images into pipe, run pipe_writer_loop first!!
     def write_to_pipe(self, index, image):
+        blocked_start = time.time()
         while len(list(self.images_to_pipe.keys())) >= self.max_images_on_pipe_buffer:
-            print("Too many images on pipe buffer")
-            time.sleep(0.1)
+            time.sleep(0.01)
 
         self.images_to_pipe[index] = image
         del image
 
+        # Back pressure telemetry, how long we waited for FFmpeg to make room
+        if self.telemetry is not None:
+            self.telemetry.record_render(queue_depth = len(self.images_to_pipe), blocked = time.time() - blocked_start)
+
     # Thread save the images to the pipe, this way processing.py can do its job while we write the images
     def pipe_writer_loop(self, duration_seconds: float, fps: float, frame_count: int, max_images_on_pipe_buffer: int):
         debug_prefix = "[FFmpegWrapper.pipe_writer_loop]"
@@ -139,6 +612,10 @@ class FFmpegWrapper:
         self.max_images_on_pipe_buffer = max_images_on_pipe_buffer
         self.count = 0
 
+        # Telemetry wasn't configured, still keep track of it for the progress line
+        if self.telemetry is None:
+            self.configure_telemetry(frame_count = frame_count, fps = fps, max_queue_depth = max_images_on_pipe_buffer)
+
         while not self.stop_piping:
             if self.count in list(self.images_to_pipe.keys()):
                 if self.count == 0:
@@ -150,8 +627,13 @@ class FFmpegWrapper:
                 # Get the next image from the list as count is on the images to pipe dictionary keys
                 image = self.images_to_pipe.pop(self.count)
 
-                # Pipe the numpy RGB array as image
+                # Convert to the negotiated pipe pixel format
+                image = self.frame_converter.convert(image)
+
+                # Pipe the numpy array as image, time how long FFmpeg kept us blocked
+                write_start = time.time()
                 self.pipe_subprocess.stdin.write(image)
+                self.telemetry.record_encode(queue_depth = len(self.images_to_pipe), write_seconds = time.time() - write_start)
 
                 # Finished writing
                 self.lock_writing = False
@@ -162,24 +644,29 @@ class FFmpegWrapper:
                 
                 self.count += 1
 
-                # Stats
-                current_time = (self.count / fps)   # Current second we're processing
-                propfinished = ((current_time + (1/fps)) / duration_seconds) * 100  # Overhaul percentage completion
-                remaining = duration_seconds - current_time  # How much seconds left to produce
-                now = time.time()
-                took = now - start  # Total time took in this runtime
-                eta = (took * remaining) / current_time
+                # Stats, only refresh the progress line once in a while
+                if (self.count % self.telemetry.every == 0) or (self.count == frame_count):
+                    record = self.telemetry.record()
+                    current_time = record["video_time"]  # Current second we're processing
+                    propfinished = record["progress"] * 100  # Overhaul percentage completion
+                    took = time.time() - start  # Total time took in this runtime
+
+                    # Rolling ETA, unknown until we have an encode rate
+                    eta = record["eta"] if record["eta"] is not None else 0
 
-                # Convert to minutes
-                took /= 60
-                eta /= 60
-                took_plus_eta = took + eta
+                    # Convert to minutes
+                    took /= 60
+                    eta /= 60
+                    took_plus_eta = took + eta
 
-                took_plus_eta = f"{int(took_plus_eta)}m:{(took_plus_eta - int(took_plus_eta))*60:.0f}s"
-                took = f"{int(took)}m:{(took - int(took))*60:.0f}s"
-                eta = f"{int(eta)}m:{(eta - int(eta))*60:.0f}s"
+                    took_plus_eta = f"{int(took_plus_eta)}m:{(took_plus_eta - int(took_plus_eta))*60:.0f}s"
+                    took = f"{int(took)}m:{(took - int(took))*60:.0f}s"
+                    eta = f"{int(eta)}m:{(eta - int(eta))*60:.0f}s"
 
-                print(f"\rProgress=[Frame: {self.count} - {current_time:.2f}s / {duration_seconds:.2f}s = {propfinished:0.2f}%] Took=[{took}] ETA=[{eta}] EST Total=[{took_plus_eta}]", end="")
+                    render_fps = f"{record['render_fps']:.2f}" if record["render_fps"] else "?"
+                    encode_fps = f"{record['encode_fps']:.2f}" if record["encode_fps"] else "?"
+
+                    print(f"\rProgress=[Frame: {self.count} - {current_time:.2f}s / {duration_seconds:.2f}s = {propfinished:0.2f}%] Took=[{took}] ETA=[{eta}] EST Total=[{took_plus_eta}] FPS=[render {render_fps}, encode {encode_fps}] Queue=[{record['queue_depth']}/{record['max_queue_depth']}]", end="")
             else:
                 time.sleep(0.1)
         
@@ -207,3 +694,15 @@ class FFmpegWrapper:
 
         print(debug_prefix, "Stopped pipe!!")
 
+    # Wait for FFmpeg to finish and remove the decoded audio FIFO / raw file if we used one
+    def finish(self) -> None:
+        debug_prefix = "[FFmpegWrapper.finish]"
+
+        if getattr(self, "pipe_subprocess", None) is not None:
+            self.pipe_subprocess.wait()
+
+        if getattr(self, "pcm_temporary_directory", None) is not None:
+            print(debug_prefix, "Removing decoded audio temporary directory")
+            shutil.rmtree(self.pcm_temporary_directory, ignore_errors = True)
+            self.pcm_temporary_directory = None
+
@@ -28,6 +28,7 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 
 from mmv.common.cmn_constants import LOG_NEXT_DEPTH, PACKAGE_DEPTH, LOG_NO_DEPTH, LOG_SEPARATOR, STEP_SEPARATOR
 from mmv.mmvshader.mmv_shader_main import MMVShaderMain
+from mmv.common.cmn_settings import FrozenSettings
 from mmv.common.cmn_tree import DisplayablePath
 from pathlib import Path
 import logging
@@ -75,7 +76,7 @@ class MMVShaderInterface:
         logging.info(f"{depth}{debug_prefix} Attempting to load prelude file located at [{prelude_file}], we cannot continue if this is wrong..")
 
         with open(prelude_file, "r") as f:
-            self.prelude = toml.loads(f.read())
+            self.prelude = FrozenSettings.from_dict(toml.loads(f.read()))
 
         # Log prelude configuration
         logging.info(f"{depth}{debug_prefix} Prelude configuration is: {self.prelude}")
@@ -261,7 +261,7 @@ class MMVShaderMPV:
         # Generate command
         self.__generate_command()
 
-        if self.mmvshader_main.prelude["flow"]["stop_at_run_command"]:
+        if self.mmvshader_main.prelude.flow.stop_at_run_command:
             logging.critical(f"{depth}{debug_prefix} Stopping program as key stop_at_run_command is True on prelude.toml")
             sys.exit(0)
             
@@ -29,12 +29,13 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 print("[mmvskia.__init__.py package] Importing MMV package files, this might take a while from time to time..")
 
 from mmv.common.cmn_constants import LOG_NEXT_DEPTH, PACKAGE_DEPTH, LOG_NO_DEPTH, LOG_SEPARATOR, STEP_SEPARATOR
-from mmv.mmvskia.pygradienter.pyg_main import PyGradienter
+from mmv.mmvskia.mmv_preview import MMVSkiaRealtimePreview
+from mmv.mmvskia.mmv_quality import MMVSkiaQualityGovernor
 from mmv.mmvskia.mmv_generator import MMVSkiaGenerator
+from mmv.common.cmn_settings import FrozenSettings
 from mmv.mmvskia.mmv_image import MMVSkiaImage
 print("[mmvskia.__init__.py package] Importing probably heaviest dependency [MMVSkiaMain], Skia might take a bit to load so does numpy, opencv etc..")
 from mmv.mmvskia.mmv_main import MMVSkiaMain
-from mmv.common.cmn_midi import MidiFile
 from mmv.common.cmn_utils import Utils
 import subprocess
 import tempfile
@@ -87,7 +88,7 @@ class MMVSkiaInterface:
         logging.info(f"{depth}{debug_prefix} Attempting to load prelude file located at [{prelude_file}], we cannot continue if this is wrong..")
 
         with open(prelude_file, "r") as f:
-            self.prelude = toml.loads(f.read())
+            self.prelude = FrozenSettings.from_dict(toml.loads(f.read()))
 
         # Log prelude configuration
         logging.info(f"{depth}{debug_prefix} Prelude configuration is: {self.prelude}")
@@ -112,7 +113,7 @@ class MMVSkiaInterface:
         self.configure_mmv_main()
 
         # Quit if code flow says so
-        if self.prelude["flow"]["stop_at_interface_init"]:
+        if self.prelude.flow.stop_at_interface_init:
             logging.critical(f"{ndepth}{debug_prefix} Not continuing because stop_at_interface_init key on prelude.toml is True")
             sys.exit(0)
 
@@ -123,12 +124,20 @@ class MMVSkiaInterface:
         self.mmv_main.context.audio_amplitude_multiplier = kwargs.get("audio_amplitude_multiplier", 1)
         self.mmv_main.context.skia_render_backend = kwargs.get("render_backend", "gpu")
 
+        # Scene seed of the random streams, same seed same video. None picks (and logs) one
+        self.mmv_main.random.set_seed(kwargs.get("random_seed", None))
+
         # # Encoding options
 
         # FFmpeg
         self.mmv_main.context.ffmpeg_pixel_format = kwargs.get("ffmpeg_pixel_format", "auto")
+        self.mmv_main.context.ffmpeg_pipe_pixel_format = kwargs.get("ffmpeg_pipe_pixel_format", "auto")
         self.mmv_main.context.ffmpeg_dumb_player = kwargs.get("ffmpeg_dumb_player", "auto")
         self.mmv_main.context.ffmpeg_hwaccel = kwargs.get("ffmpeg_hwaccel", "auto")
+        self.mmv_main.context.ffmpeg_encoder_profile = kwargs.get("ffmpeg_encoder_profile", None)
+        self.mmv_main.context.ffmpeg_encoder_threads = kwargs.get("ffmpeg_encoder_threads", "auto")
+        self.mmv_main.context.ffmpeg_audio_codec = kwargs.get("ffmpeg_audio_codec", "copy")
+        self.mmv_main.context.ffmpeg_audio_bitrate = kwargs.get("ffmpeg_audio_bitrate", None)
 
         # x264 specific
         self.mmv_main.context.x264_use_opencl = kwargs.get("x264_use_opencl", False)
@@ -139,6 +148,11 @@ class MMVSkiaInterface:
         # Pipe writer
         self.mmv_main.context.max_images_on_pipe_buffer = kwargs.get("max_images_on_pipe_buffer", 20)
 
+        # Pipe telemetry, a function receiving the records and / or a JSON lines file path
+        self.mmv_main.context.pipe_telemetry_callback = kwargs.get("pipe_telemetry_callback", None)
+        self.mmv_main.context.pipe_telemetry_file = kwargs.get("pipe_telemetry_file", None)
+        self.mmv_main.context.pipe_telemetry_every = kwargs.get("pipe_telemetry_every", None)
+
     # Execute MMV with the configurations we've done
     def run(self, depth = PACKAGE_DEPTH) -> None:
         debug_prefix = "[MMVSkiaInterface.run]"
@@ -172,6 +186,79 @@ class MMVSkiaInterface:
         self.mmv_main.canvas.create_canvas(depth = ndepth)
         logging.info(STEP_SEPARATOR)
 
+    # Preview the scene realtime instead of rendering the video, call this right after quality()
+    # and before configuring any object as it scales the resolution objects are configured with.
+    # See MMVSkiaRealtimePreview for the kwargs (sink, play_audio, max_lag_frames)
+    def realtime_preview(self, scale: float = 0.5, depth = PACKAGE_DEPTH, **kwargs) -> None:
+        debug_prefix = "[MMVSkiaInterface.realtime_preview]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        # Preview surface resolution, even numbers for the raw sinks
+        width = int(self.mmv_main.context.width * scale) // 2 * 2
+        height = int(self.mmv_main.context.height * scale) // 2 * 2
+
+        logging.info(f"{depth}{debug_prefix} Realtime preview at scale [{scale}] -> [{width}x{height}], kwargs: {kwargs}")
+
+        # Recreate the canvas with the reduced resolution
+        self.quality(width = width, height = height, fps = self.mmv_main.context.fps, batch_size = self.mmv_main.context.batch_size, depth = ndepth)
+
+        self.mmv_main.context.realtime_preview = True
+        self.mmv_main.preview = MMVSkiaRealtimePreview(mmvskia_main = self.mmv_main, depth = ndepth, **kwargs)
+        logging.info(STEP_SEPARATOR)
+
+    # Draft render of long pieces, call this right after quality() and before configuring any
+    # object. Renders at scale of the resolution (FFmpeg upscales it back to the one set on
+    # quality()) and lowers blur, particle density and FFT batch size while the render is
+    # slower than target_fps. See MMVSkiaQualityGovernor for the kwargs
+    def adaptive_quality(self, scale: float = 0.5, target_fps: float = 30, depth = PACKAGE_DEPTH, **kwargs) -> None:
+        debug_prefix = "[MMVSkiaInterface.adaptive_quality]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        if self.mmv_main.context.realtime_preview:
+            raise RuntimeError("Adaptive quality renders to a video file, can't use it together with the realtime preview")
+
+        # Keep the final resolution for the encoder
+        self.mmv_main.context.output_width = self.mmv_main.context.width
+        self.mmv_main.context.output_height = self.mmv_main.context.height
+
+        # Render resolution, even numbers for the pipe
+        width = int(self.mmv_main.context.width * scale) // 2 * 2
+        height = int(self.mmv_main.context.height * scale) // 2 * 2
+
+        logging.info(f"{depth}{debug_prefix} Adaptive quality at scale [{scale}] -> [{width}x{height}] upscaled to [{self.mmv_main.context.output_width}x{self.mmv_main.context.output_height}], target [{target_fps}] fps")
+
+        # Recreate the canvas with the reduced resolution
+        self.quality(width = width, height = height, fps = self.mmv_main.context.fps, batch_size = self.mmv_main.context.batch_size, depth = ndepth)
+
+        self.mmv_main.context.adaptive_quality = True
+        self.mmv_main.quality = MMVSkiaQualityGovernor(mmvskia_main = self.mmv_main, scale = scale, target_fps = target_fps, depth = ndepth, **kwargs)
+        logging.info(STEP_SEPARATOR)
+
+    # Save a snapshot of the scene every some seconds of video into a directory, any of
+    # them can be given to resume_from_snapshot later on to render from that point
+    def snapshots(self, directory: str, every_seconds: float = 30, depth = PACKAGE_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaInterface.snapshots]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        directory = self.get_absolute_path(directory, depth = ndepth)
+        self.utils.mkdir_dne(path = directory, depth = ndepth)
+
+        logging.info(f"{depth}{debug_prefix} Snapshots every [{every_seconds}s] on directory [{directory}]")
+        self.mmv_main.context.snapshot_directory = directory
+        self.mmv_main.context.snapshot_every = every_seconds
+        logging.info(STEP_SEPARATOR)
+
+    # Resume rendering from a snapshot of this same scene, configure everything as you did
+    # when it was taken as the objects state gets replaced. The video only has the frames
+    # from that point on, use other output_video and concatenate them afterwards
+    def resume_from_snapshot(self, path: str, depth = PACKAGE_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaInterface.resume_from_snapshot]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        logging.info(f"{depth}{debug_prefix} Resume from snapshot [{path}], getting absolute path..")
+        self.mmv_main.context.resume_snapshot = self.get_absolute_path(path, depth = ndepth)
+        logging.info(STEP_SEPARATOR)
+
     # Set the input audio file, raise exception if it does not exist
     def input_audio(self, path: str, depth = PACKAGE_DEPTH) -> None:
         debug_prefix = "[MMVSkiaInterface.input_audio]"
@@ -272,7 +359,11 @@ class MMVSkiaInterface:
         logging.info(f"{depth}{debug_prefix} Get absolute path and returning random file from directory: [{path}]")
 
         logging.info(STEP_SEPARATOR)
-        return self.utils.random_file_from_dir(self.utils.get_abspath(path, depth = ndepth), depth = ndepth)
+        return self.utils.random_file_from_dir(
+            self.utils.get_abspath(path, depth = ndepth),
+            depth = ndepth,
+            rng = self.mmv_main.random.spawn("MMVSkiaInterface.random_file_from_dir"),
+        )
 
     # Make the directory if it doesn't exist
     def make_directory_if_doesnt_exist(self, path: str, depth = PACKAGE_DEPTH, silent = True) -> None:
@@ -331,11 +422,14 @@ class MMVSkiaInterface:
         # Log action
         logging.info(f"{depth}{debug_prefix} Generating and returning one PyGradienter object")
 
+        from mmv.mmvskia.pygradienter.pyg_main import PyGradienter
+
         logging.info(STEP_SEPARATOR)
         return PyGradienter(self.mmv_main, depth = ndepth, **kwargs)
     
     # Returns a cmn_midi.py MidiFile class
     def get_midi_class(self):
+        from mmv.common.cmn_midi import MidiFile
         return MidiFile()
 
     # # [ Advanced ] # #
@@ -377,6 +471,14 @@ class AudioProcessingPresets:
             }
         }
 
+    # Get the value of every piano key with a constant Q transform (one bin per semitone) instead
+    # of the nearest FFT bin, call it after one of the other presets as it uses their bands.
+    # filter_scale < 1 reacts faster on the bass with less frequency resolution
+    def constant_q(self, filter_scale: float = 1) -> None:
+        print("[AudioProcessingPresets.constant_q]", f"Configuring MMV.AudioProcessing to use a constant Q transform with filter scale [{filter_scale}]")
+        self.mmv.mmv_main.context.music_bars_transform = "constant_q"
+        self.mmv.mmv_main.context.constant_q_filter_scale = filter_scale
+
     # Do nothing FFT-regarding, useful for speed up on Piano Roll renders
     def preset_dummy(self) -> None:
         print("[AudioProcessingPresets.preset_dummy]", "Configuring MMV.AudioProcessing do nothing, only slice and calculate average value")
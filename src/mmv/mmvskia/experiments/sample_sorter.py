@@ -1,16 +1,21 @@
 
 
+from mmv.common.cmn_audio_features import AudioFeatures
+from concurrent.futures import ProcessPoolExecutor
+from scipy.spatial import cKDTree
 from playsound import playsound
 from enum import Enum
 import numpy as np
 import samplerate
 import threading
 import datetime
+import hashlib
+import sqlite3
 import librosa
-import shelve
 import scipy
 import math
 import time
+import json
 import os
 
 # A point on the plot
@@ -29,269 +34,514 @@ class SampleInfo(Enum):
     NOT_FOUND = 3
 
 
+# Walk recursively on a path yielding (path, mtime, size) of the files with some extension,
+# scandir gives us the stat for free on most systems so we don't stat every file again
+def walk_files(path, extensions):
+    try:
+        entries = list(os.scandir(path))
+    except (PermissionError, FileNotFoundError):
+        return
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks = False):
+            yield from walk_files(entry.path, extensions)
+        elif entry.name.lower().endswith(extensions):
+            stat = entry.stat()
+            yield (entry.path, stat.st_mtime, stat.st_size)
+
+
+# Content hash of a file, reads it in chunks so big files don't go all into memory.
+# This and process_file run on the process pool, module level so they can be pickled
+def hash_file(path, chunk_size = 1024 * 1024):
+    digest = hashlib.blake2b(digest_size = 16)
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def process_file(path, settings):
+
+    # Load the file, get stereo and mono data, samplerate
+    try:
+        stereo_data, sample_rate = librosa.load(path, mono=False, sr=None)
+    except FileNotFoundError:
+        return SampleInfo.NOT_FOUND
+
+    channels = stereo_data.shape[0] if stereo_data.ndim == 2 else 1
+
+    # Get the mono data for processing
+    if channels == 2:
+        mono_data = (stereo_data[0] + stereo_data[1]) / 2
+    else:
+        mono_data = stereo_data
+
+    # Trim the data of the file, we process only the mono for now
+    # Normalize to 1 the mono_data
+    mono_data = np.trim_zeros(mono_data)
+    norm = np.linalg.norm(mono_data)
+
+    if norm == 0:
+        return SampleInfo.TOO_SHORT
+
+    mono_data = mono_data / norm
+
+    # Total number of samples points
+    N_samples = mono_data.shape[0]
+
+    # Info on duration, channels
+    duration = N_samples / sample_rate
+
+    # Audio is too long
+    if duration > settings["max_duration"]:
+        return SampleInfo.TOO_LONG
+
+    # Couldn't read even one hop_size, sample too short
+    if N_samples < settings["hop_size"]:
+        return SampleInfo.TOO_SHORT
+
+    # Pitch, confidence, RMS and spectral centroid of every frame in one go. Higher standard
+    # deviation should mean a higher quantity of bass but also can define a bit of punchiness?
+    features = AudioFeatures().extract(
+        mono_data, sample_rate,
+        frame_size = settings["win_size"],
+        hop_size = settings["hop_size"],
+        threshold = settings["yin_threshold"],
+    )
+
+    return {
+        "path": path,
+        "channels": channels,
+        "duration": duration,
+        "standard_deviation": features["standard_deviation"],
+        "dominant_frequency": features["dominant_frequency"],
+        "rms": float(features["rms"].mean()),
+        "spectral_centroid": float(np.average(features["spectral_centroid"], weights = features["rms"] + 1e-12)),
+    }
+
+
+# Index of the processed samples on a SQLite file. A file is processed again only if its
+# mtime or size changed and its content hash is new (renamed, moved or touched samples
+# reuse the features of the same content), or if the algorithm and its settings changed.
+# Results are committed in batches so killing the indexer loses at most one batch
+class SampleIndex:
+
+    COLUMNS = ["path", "mtime", "size", "hash", "settings", "status", "channels", "duration", "standard_deviation", "dominant_frequency", "rms", "spectral_centroid", "sample_type"]
+
+    def __init__(self, path, settings):
+        self.path = path
+
+        # Anything that changes the results of process_file, stored per row
+        self.settings = json.dumps(settings, sort_keys = True)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+
+        # Start over if the index was made with other columns
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(samples)")]
+        if columns and (not columns == self.COLUMNS + ["indexed_at"]):
+            self.connection.execute("DROP TABLE samples")
+
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS samples (
+                path TEXT PRIMARY KEY,
+                mtime REAL,
+                size INTEGER,
+                hash TEXT,
+                settings TEXT,
+                status TEXT,
+                channels INTEGER,
+                duration REAL,
+                standard_deviation REAL,
+                dominant_frequency REAL,
+                rms REAL,
+                spectral_centroid REAL,
+                sample_type TEXT,
+                indexed_at REAL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS samples_hash ON samples (hash)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS samples_indexed_at ON samples (indexed_at)")
+        self.connection.commit()
+
+        self.pending = []
+
+    # Forget about files that doesn't exist anymore, returns how many
+    def cleanup(self):
+        missing = [(path,) for (path,) in self.connection.execute("SELECT path FROM samples") if not os.path.exists(path)]
+        self.connection.executemany("DELETE FROM samples WHERE path = ?", missing)
+        self.connection.commit()
+        return len(missing)
+
+    # {path: (mtime, size)} of the rows processed with the current settings
+    def up_to_date(self):
+        return {
+            path: (mtime, size) for (path, mtime, size) in
+            self.connection.execute("SELECT path, mtime, size FROM samples WHERE settings = ?", (self.settings,))
+        }
+
+    # A row with this content already processed with the current settings, or None
+    def find_hash(self, file_hash):
+        return self.connection.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM samples WHERE hash = ? AND settings = ? LIMIT 1",
+            (file_hash, self.settings)
+        ).fetchone()
+
+    # Queue a row for writing, flush every batch_size rows
+    def put(self, row, batch_size = 256):
+        self.pending.append(row)
+        if len(self.pending) >= batch_size:
+            self.flush()
+
+    # Write the queued rows stamped with the time, the similarity index catches up with them
+    def flush(self):
+        if self.pending:
+            now = time.time()
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO samples ({', '.join(self.COLUMNS)}, indexed_at) VALUES ({', '.join(['?'] * (len(self.COLUMNS) + 1))})",
+                [list(row) + [now] for row in self.pending]
+            )
+            self.connection.commit()
+            self.pending = []
+
+    # (path, standard_deviation, dominant_frequency, sample_type) of every valid sample
+    def samples(self):
+        return self.connection.execute(
+            "SELECT path, standard_deviation, dominant_frequency, sample_type FROM samples WHERE status = 'ok' AND settings = ?",
+            (self.settings,)
+        ).fetchall()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+# k nearest samples in a normalized feature space. A KD tree is built over every valid
+# sample of the SampleIndex and saved next to it, rows written after that (new or changed
+# files) go into a small delta searched by brute force and removed or replaced paths are
+# masked out, so updating only reads the rows newer than the last one seen. Once the delta
+# and masked rows are more than REBUILD_RATIO of the tree it is built again from scratch
+class SampleSimilarityIndex:
+
+    FEATURES = ["dominant_frequency", "standard_deviation", "duration", "rms", "spectral_centroid"]
+    REBUILD_RATIO = 0.1
+
+    def __init__(self, sample_index, path):
+        self.sample_index = sample_index
+        self.path = path
+        self.loaded = False
+
+        if os.path.exists(self.path):
+            with np.load(self.path, allow_pickle = False) as saved:
+                if str(saved["settings"]) == self.sample_index.settings:
+                    self.paths = saved["paths"].tolist()
+                    self.vectors = saved["vectors"]
+                    self.mask = saved["mask"]
+                    self.delta_paths = saved["delta_paths"].tolist()
+                    self.delta_vectors = saved["delta_vectors"]
+                    self.mean = saved["mean"]
+                    self.scale = saved["scale"]
+                    self.last_indexed_at = float(saved["last_indexed_at"])
+                    self.loaded = True
+
+        if self.loaded:
+            self.tree = cKDTree(self.vectors)
+            self.update()
+        else:
+            self.rebuild()
+
+    # Raw features to the space we measure distances on, frequencies are perceived
+    # logarithmically and the standard deviation is plotted as its square root
+    def transform(self, rows):
+        features = np.asarray(rows, dtype = np.float64).reshape(-1, len(self.FEATURES))
+        return np.column_stack([
+            np.log1p(np.maximum(features[:, 0], 0)),
+            np.sqrt(np.maximum(features[:, 1], 0)),
+            np.log1p(features[:, 2]),
+            features[:, 3],
+            np.log1p(np.maximum(features[:, 4], 0)),
+        ])
+
+    # Valid rows as (paths, raw features, latest indexed_at), only the ones after some time
+    def query(self, after = None):
+        sql = f"SELECT path, {', '.join(self.FEATURES)}, indexed_at FROM samples WHERE status = 'ok' AND settings = ?"
+        arguments = [self.sample_index.settings]
+
+        if after is not None:
+            sql += " AND indexed_at > ?"
+            arguments.append(after)
+
+        rows = self.sample_index.connection.execute(sql, arguments).fetchall()
+        paths = [row[0] for row in rows]
+        features = [row[1:-1] for row in rows]
+        latest = max([row[-1] for row in rows], default = after or 0)
+        return paths, features, latest
+
+    # Build the tree over every valid sample again
+    def rebuild(self):
+        self.paths, features, self.last_indexed_at = self.query()
+        vectors = self.transform(features)
+
+        # Z score normalization so no feature dominates the distances
+        self.mean = vectors.mean(axis = 0) if len(vectors) else np.zeros(len(self.FEATURES))
+        self.scale = vectors.std(axis = 0) if len(vectors) else np.ones(len(self.FEATURES))
+        self.scale[self.scale == 0] = 1
+
+        self.vectors = (vectors - self.mean) / self.scale
+        self.mask = np.ones(len(self.paths), dtype = bool)
+        self.delta_paths = []
+        self.delta_vectors = np.zeros((0, len(self.FEATURES)))
+        self.tree = cKDTree(self.vectors)
+        self.save()
+
+    # Catch up with the rows written since the last update or rebuild
+    def update(self):
+        paths, features, self.last_indexed_at = self.query(after = self.last_indexed_at)
+
+        # Files that don't exist anymore on the sample index
+        valid = set(path for (path,) in self.sample_index.connection.execute(
+            "SELECT path FROM samples WHERE status = 'ok' AND settings = ?", (self.sample_index.settings,)
+        ))
+
+        # Changed files come back as new rows, their old vectors get masked or dropped
+        changed = set(paths)
+        self.mask &= np.array([(path in valid) and (not path in changed) for path in self.paths], dtype = bool)
+        keep = [index for index, path in enumerate(self.delta_paths) if (path in valid) and (not path in changed)]
+        self.delta_paths = [self.delta_paths[index] for index in keep] + paths
+        self.delta_vectors = np.concatenate([
+            self.delta_vectors[keep],
+            (self.transform(features) - self.mean) / self.scale
+        ])
+
+        # Too much outside the tree, build it again
+        outside = len(self.delta_paths) + np.count_nonzero(~self.mask)
+        if outside > self.REBUILD_RATIO * max(len(self.paths), 1):
+            self.rebuild()
+        elif paths or (outside > 0):
+            self.save()
+
+    def save(self):
+        np.savez(
+            self.path,
+            settings = self.sample_index.settings,
+            paths = np.array(self.paths, dtype = str),
+            vectors = self.vectors,
+            mask = self.mask,
+            delta_paths = np.array(self.delta_paths, dtype = str),
+            delta_vectors = self.delta_vectors,
+            mean = self.mean,
+            scale = self.scale,
+            last_indexed_at = self.last_indexed_at,
+        )
+
+    # Normalized vector of some indexed path, None if it isn't on the index
+    def vector_of(self, path):
+        if path in self.delta_paths:
+            return self.delta_vectors[self.delta_paths.index(path)]
+        try:
+            index = self.paths.index(path)
+        except ValueError:
+            return None
+        return self.vectors[index] if self.mask[index] else None
+
+    # The k most similar samples of a path (itself not included) as a list of (path, distance)
+    def similar(self, path, k = 10):
+        vector = self.vector_of(path)
+        if vector is None:
+            return []
+
+        candidates = []
+
+        # Ask the tree for enough neighbours to make up for the masked ones and itself
+        if len(self.paths):
+            wanted = min(len(self.paths), k + 1 + np.count_nonzero(~self.mask))
+            distances, indices = self.tree.query(vector, k = wanted)
+            for distance, index in zip(np.atleast_1d(distances), np.atleast_1d(indices)):
+                if self.mask[index]:
+                    candidates.append((float(distance), self.paths[index]))
+
+        # Brute force on the delta
+        if len(self.delta_paths):
+            distances = np.linalg.norm(self.delta_vectors - vector, axis = 1)
+            candidates += [(float(distance), delta_path) for distance, delta_path in zip(distances, self.delta_paths)]
+
+        candidates.sort()
+        return [(candidate_path, distance) for distance, candidate_path in candidates if not candidate_path == path][:k]
+
+
 class SampleSorter:
     """
     kwargs: {
         "path": list
             list of pathes to search recursively for samples
+        "workers": int, os.cpu_count()
+            Processes for indexing the samples
+        "batch_size": int, 256
+            Commit the index every this many processed files
     }
     """
     def __init__(self, mmv, **kwargs):
         self.mmv = mmv
-
-        import aubio
-        import matplotlib.pyplot as plt
         self.samples = []
 
         # Get list of pathes for searching
         search_paths = self.mmv.utils.force_list(kwargs["path"])
         search_paths = [self.mmv.utils.get_abspath(path) for path in search_paths]
 
+        self.workers = kwargs.get("workers", os.cpu_count())
+        self.batch_size = kwargs.get("batch_size", 256)
+
         self.NOT_A_SAMPLE_IF_DURATION_GREATER_THAN = 6
-        self.WHO_IS_AUDIO = [".wav", ".ogg", ".flac", ".mp3"]
+        self.WHO_IS_AUDIO = (".wav", ".ogg", ".flac", ".mp3")
         self.THIS_FILE_DIR = os.path.dirname(os.path.abspath(__file__))
-        self.ALGORITHM_VERSION = 1
+        self.ALGORITHM_VERSION = 3
 
-        self.shelve_file = self.THIS_FILE_DIR + os.path.sep + "data.shelf"
+        self.index_file = self.THIS_FILE_DIR + os.path.sep + "samples.sqlite"
+        self.similarity_file = self.THIS_FILE_DIR + os.path.sep + "samples_similarity.npz"
         self.log_file = self.THIS_FILE_DIR + os.path.sep + "log.txt"
 
         # Constants
-        self.win_size = 4096 
+        self.win_size = 4096
         self.hop_size = 512
-        
+        self.yin_threshold = 0.2
+
+        # What process_file depends on, rows with other settings are processed again
+        self.settings = {
+            "algorithm_version": self.ALGORITHM_VERSION,
+            "max_duration": self.NOT_A_SAMPLE_IF_DURATION_GREATER_THAN,
+            "win_size": self.win_size,
+            "hop_size": self.hop_size,
+            "yin_threshold": self.yin_threshold,
+        }
+
         if not os.path.exists(self.log_file):
             with open(self.log_file, "w") as f:
                 f.write("")
 
-        with shelve.open(self.shelve_file, 'c') as shelf:
+        self.index = SampleIndex(self.index_file, self.settings)
+
+        try:
+            self.update_index(search_paths)
+
+            # Nearest neighbours for the find similar samples queries
+            self.similarity = SampleSimilarityIndex(self.index, self.similarity_file)
+
+            # Add the valid samples to the plot points
+            for path, standard_deviation, dominant_frequency, sample_type in self.index.samples():
+                self.samples.append(
+                    NamedPoint(
+                        standard_deviation**0.5,
+                        # duration,
+                        dominant_frequency,
+                        self.get_color_by_type(sample_type),
+                        path
+                    )
+                )
+        finally:
+            self.index.close()
+
+        self.plot()
+
+    # Find the new and changed files, hash and process them on a process pool
+    def update_index(self, search_paths):
+
+        # # Cleanup file path entries of files that doesn't exist
+        removed = self.index.cleanup()
+        if removed:
+            print(f"Deleted [{removed}] entries of files that doesn't exist anymore")
 
-            # # Cleanup and check file path entries, older entries, files that doesn't exist
+        # # Get processing files, only the ones not up to date with mtime and size
+        up_to_date = self.index.up_to_date()
+        files_to_process = []
 
-            for file_path in shelf.keys():
-                path = os.path.realpath(os.path.abspath(file_path))
-                data = shelf[file_path]
+        # For each path the user gave us for searching
+        for path in search_paths:
+            for file_path, mtime, size in walk_files(path, self.WHO_IS_AUDIO):
+                if not up_to_date.get(file_path) == (mtime, size):
+                    files_to_process.append((file_path, mtime, size))
 
-                if not os.path.exists(path):
-                    print(f"File path doesn't exist, deleting on shelf dictionary [{path}]")
-                    del shelf[path]
-                
-                if "algorithm_version" in data.keys():
-                    # Algorithm version has changed
-                    if not data["algorithm_version"] == self.ALGORITHM_VERSION:
-                        print(f"Algorithm version changed, deleting old entry [{path}]")
-                        del shelf[path]
+        N_files = len(files_to_process)
+        print(f"[{len(up_to_date)}] files up to date, [{N_files}] new or changed files to index")
+
+        if N_files == 0:
+            return
+
+        stats = {path: (mtime, size) for (path, mtime, size) in files_to_process}
+        paths = sorted(stats.keys())
+
+        with ProcessPoolExecutor(max_workers = self.workers) as pool:
+
+            # # Hash the changed files first, contents we already know don't need processing
+            hashes = dict(zip(paths, pool.map(hash_file, paths, chunksize = 64)))
+            to_process = []
+
+            for file_path in paths:
+                mtime, size = stats[file_path]
+                known = None if hashes[file_path] is None else self.index.find_hash(hashes[file_path])
+
+                # Same content already processed, the sample was touched, moved or copied
+                if known is not None:
+                    row = list(known)
+                    row[0:3] = [file_path, mtime, size]
+
+                    # The type is guessed by the file name
+                    if row[5] == "ok":
+                        row[-1] = self.guess_sample_type({"path": file_path})
+
+                    self.index.put(row, batch_size = self.batch_size)
                 else:
-                    print(f"No algorithm version found, deleting entry [{path}]")
-                    del shelf[path]
-
-                # File was blocked
-                if "blocked" in data:
-                    if data["blocked"] == "too_long":
-                        # Limits of greater than has changed
-                        if not self.NOT_A_SAMPLE_IF_DURATION_GREATER_THAN == data["value"]:
-                            print(f"Limits of minimum sample duration changed, deleting blocked entry [{path}]")
-                            del shelf[path]
-
-            # # Get processing files
-
-            # For each path the user gave us for searching
-            for path in search_paths:
-
-                # Get all file paths to process
-                files_to_process = []
-
-                # Walk recursively on the path
-                for root, dirs, files in os.walk(path):
-
-                    # For each file in this folder, not including directories
-                    for file in files:
-
-                        # File is valid and will be listed for processing
-                        if any([file.endswith(extension) for extension in self.WHO_IS_AUDIO]):
-                            files_to_process.append(os.path.join(root, file))
-                
-                # Total number of file
-                N_files = len(files_to_process)
-
-                for index, file_path in enumerate(sorted(files_to_process)):
-                    
-                    # Check if file already been processed or new
-                    if not file_path in shelf.keys():
-
-                        print(f"Processing file [{index+1}/{N_files} : {((index+1)/N_files)*100:.2f}%] [{file_path}]")
-
-                        # Process the file
-                        info = self.process_file(file_path, print_info = True)
-
-                        # Audio file is too long, perhaps a loop or big FX?
-                        if info == SampleInfo.TOO_LONG:
-                            shelf[file_path] = {
-                                "blocked": "too_long",
-                                "value": self.NOT_A_SAMPLE_IF_DURATION_GREATER_THAN,
-                            }
-                            print(" > Too long, not a sample\n")
-                            self.write_log(f"File too long, not a sample [{file_path}]")
-                            continue
-                        
-                        # Audio file is too short, couldn't even slice into self.hop_size
-                        elif info == SampleInfo.TOO_SHORT:
-                            shelf[file_path] = {
-                                "blocked": "too_short",
-                                "less_than": self.hop_size,
-                            }
-                            print(" > Too short, not a sample\n")
-                            self.write_log(f"File too short, not a sample [{file_path}]")
-                            continue
-
-                        elif info == SampleInfo.NOT_FOUND:
-                            shelf[file_path] = {
-                                "blocked": "not_found",
-                            }
-                            print(" > Not found\n")
-                            continue
-
-                        # Sample is a valid sample
-                        else:
-
-                            # Guess the type..
-                            sample_type = self.guess_sample_type(info)
-                            info["sample_type"] = sample_type
-
-                            print("Sample type is", sample_type)
-                            
-                            # Add the info to the file
-                            shelf[file_path] = info
-
-                            color = self.get_color_by_type(info["sample_type"])
-
-                            # Add to plot points
-                            self.samples.append(
-                                NamedPoint(
-                                    info
-                                    ["standard_deviation"]**0.5,
-                                    # ["duration"],
-                                    info["dominant_frequency"],
-                                    color,
-                                    file_path
-                                )
-                            )
-                    
-                    # File is a valid sample and was already processed,
-                    else:
-                        # Get the previously processed info
-                        info = shelf[file_path]
-
-                        if "blocked" in info.keys():
-                            print(f"Skipping file [{index+1}/{N_files} : {((index+1)/N_files)*100:.2f}%] [{file_path}] blocked")
-
-                        else:
-                            color = self.get_color_by_type(info["sample_type"])
-                            
-                            self.samples.append(
-                                NamedPoint(
-                                    info["standard_deviation"]**0.5,
-                                    # ["duration"],
-                                    info["dominant_frequency"],
-                                    color,
-                                    file_path
-                                )
-                            )
-
-                            print(f"Skipping file [{index+1}/{N_files} : {((index+1)/N_files)*100:.2f}%] [{file_path}] already in shelve dictionary")
-        self.plot()
+                    to_process.append(file_path)
 
+            self.index.flush()
+            N_process = len(to_process)
+            print(f"[{N_files - N_process}] files reused by content hash, [{N_process}] files to process")
 
-    def process_file(self, path, print_info = False):
+            # # Process the new contents
+            start = time.time()
+            results = pool.map(process_file, to_process, [self.settings] * N_process, chunksize = 16)
 
-        # Load the file, get stereo and mono data, samplerate
-        try:
-            stereo_data, sample_rate = librosa.load(path, mono=False, sr=None)
-        except FileNotFoundError:
-            self.write_log(f"File not found [{path}]\n")
-            return SampleInfo.NOT_FOUND
+            for index, (file_path, info) in enumerate(zip(to_process, results)):
+                mtime, size = stats[file_path]
+                self.index_result(file_path, mtime, size, hashes[file_path], info)
+
+                if (index + 1) % 100 == 0 or (index + 1) == N_process:
+                    took = max(time.time() - start, 1e-9)
+                    print(f"Processed [{index+1}/{N_process} : {((index+1)/N_process)*100:.2f}%] [{(index+1)/took:.2f} files/s]")
+
+        self.index.flush()
+
+    # Queue the row of one processed file
+    def index_result(self, file_path, mtime, size, file_hash, info):
+
+        # Audio file is too long, perhaps a loop or big FX?
+        if info == SampleInfo.TOO_LONG:
+            status = "too_long"
+            self.write_log(f"File too long, not a sample [{file_path}]\n")
 
-        channels = stereo_data.shape[0]
+        # Audio file is too short, couldn't even slice into self.hop_size
+        elif info == SampleInfo.TOO_SHORT:
+            status = "too_short"
+            self.write_log(f"File too short, not a sample [{file_path}]\n")
 
-        # Get the mono data for processing
-        if channels == 2:
-            mono_data = (stereo_data[0] + stereo_data[1]) / 2
+        elif info == SampleInfo.NOT_FOUND:
+            status = "not_found"
+            self.write_log(f"File not found [{file_path}]\n")
+
+        # Sample is a valid sample, guess the type..
         else:
-            mono_data = stereo_data
-
-        # Trim the data of the file, we process only the mono for now
-        # Normalize to 1 the mono_data
-        mono_data = np.trim_zeros(mono_data)
-        mono_data = mono_data / np.linalg.norm(mono_data)
-
-        # Total number of samples points
-        N_samples = mono_data.shape[0]
-
-        # Info on duration, channels
-        duration = N_samples / sample_rate
-
-        # Audio is too long
-        if duration > self.NOT_A_SAMPLE_IF_DURATION_GREATER_THAN:
-            return SampleInfo.TOO_LONG
-
-        # Higher standard deviation should mean a higher quantity of bass but also can define a bit of punchiness?
-        standard_deviation = np.std(mono_data)
-
-        # # Dominant frequency
-
-        pitch_o = aubio.pitch("yin", self.win_size, self.hop_size, sample_rate)
-        # pitch_o.set_unit("midi")
-        pitch_o.set_tolerance(0.8)
-
-        pitches = []
-        confidences = []
-
-        data = np.zeros(math.ceil(N_samples / self.hop_size) * self.hop_size, dtype = "float32")
-        data[0:N_samples] = mono_data
-        N_chunks = (data.shape[0] / self.hop_size)
-        
-        if int(N_chunks) == 0:
-            return SampleInfo.TOO_SHORT
-
-        chunks = np.split(data, N_chunks)
-
-        # For each chunk of processed stuff
-        for chunk in chunks:
-
-            # We're probably on the last chunk and it will potentially be less than self.hop_size
-            if not len(chunk) == self.hop_size:
-                break
-
-            # Get pitch, confidence
-            pitch = pitch_o(chunk)[0]
-            confidence = pitch_o.get_confidence()
-
-            # Append to the lists
-            pitches += [pitch]
-            confidences += [confidence]
-        
-        # Couldn't read even one hop_size, sample too short
-        if len(pitches) + len(confidences) == 0:
-            return SampleInfo.TOO_SHORT
-
-        # Dominant frequency is the weighted averages of the pitches and confidences of aubio
-        dominant_frequency = sum( [confidences[i] * pitches[i] for i in range(len(pitches))] ) / sum(confidences)
-        
-        if print_info:
-            pretty_print = " ::"
-            # print(pretty_print, f"Path:               [\"{path}\"]")
-            print(pretty_print, f"Channels:           [{channels}]")
-            print(pretty_print, f"Duration:           [{duration:.2f}]")
-            print(pretty_print, f"Standard deviation: [{standard_deviation:.16f}]")
-            print(pretty_print, f"Dominant Freq:      [{dominant_frequency:.2f}]")
-            print()
+            info["sample_type"] = self.guess_sample_type(info)
+            self.index.put([
+                file_path, mtime, size, file_hash, self.index.settings, "ok",
+                info["channels"], info["duration"], info["standard_deviation"], info["dominant_frequency"],
+                info["rms"], info["spectral_centroid"], info["sample_type"]
+            ], batch_size = self.batch_size)
+            return
 
-        return {
-            "path": path,
-            "duration": duration,
-            "standard_deviation": standard_deviation,
-            "dominant_frequency": dominant_frequency,
-            "algorithm_version": self.ALGORITHM_VERSION,
-        }
+        self.index.put([file_path, mtime, size, file_hash, self.index.settings, status] + [None] * 7, batch_size = self.batch_size)
 
     # Guess the sample type..
     def guess_sample_type(self, info):
@@ -305,16 +555,16 @@ class SampleSorter:
 
             if any([keyword in file_name for keyword in ["snare"]]):
                 return "snare"
-            
+
             if any([keyword in file_name for keyword in ["kick"]]):
                 return "kick"
-            
+
             if any([keyword in file_name for keyword in ["tom"]]):
                 return "tom"
-            
+
             if any([keyword in file_name for keyword in ["perc"]]):
                 return "percussion"
-            
+
             if any([keyword in file_name for keyword in ["hat"]]):
                 return "hat"
 
@@ -339,22 +589,34 @@ class SampleSorter:
             f.write(f"{date_and_time} {string}")
 
     def plot(self):
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots()
         ax.set_yscale('log')
 
-        for obj in self.samples:
-            print(obj.color)
-            artist = ax.plot(obj.x, obj.y, obj.color + 'o', picker=5)[0]
-            artist.obj = obj
+        # One scatter for every sample, matplotlib finds the clicked indices for us
+        ax.scatter(
+            [obj.x for obj in self.samples],
+            [obj.y for obj in self.samples],
+            c = [obj.color for obj in self.samples],
+            picker = 5,
+        )
 
         fig.canvas.callbacks.connect('pick_event', self.clicked_sample)
 
         plt.show()
 
+    # The k most similar samples to some sample path as (path, distance)
+    def find_similar(self, path, k = 10):
+        return self.similarity.similar(path, k = k)
+
     def clicked_sample(self, event):
-        who = event.artist.obj.name
+        who = self.samples[event.ind[0]].name
         print(who)
-        
+
+        for path, distance in self.find_similar(who, k = 5):
+            print(f" :: Similar [{distance:.3f}] [{path}]")
+
         threading.Thread(target=playsound, args=(who,)).start()
 
 
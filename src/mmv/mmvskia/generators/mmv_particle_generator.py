@@ -29,9 +29,8 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 from mmv.mmvskia.mmv_modifiers import MMVSkiaModifierMode, MMVSkiaModifierLine, MMVSkiaModifierPoint, MMVSkiaModifierShake, MMVSkiaModifierFade
 from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
 from mmv.mmvskia.mmv_interpolation import MMVSkiaInterpolation
-from mmv.mmvskia.mmv_image import MMVSkiaImage
+from mmv.mmvskia.mmv_image import MMVSkiaCompactImage
 from mmv.common.cmn_utils import Utils
-import random
 import copy
 import math
 import os
@@ -44,6 +43,9 @@ class MMVSkiaParticleGenerator:
         self.type = "mmvgenerator"
         self.is_deletable = False
 
+        # Seeded random stream for the particles positions, sizes, fades and images
+        self.rng = self.mmvskia_main.random.spawn("MMVSkiaParticleGenerator")
+
         # # Configs on kwargs
 
         # Get preset
@@ -68,6 +70,9 @@ class MMVSkiaParticleGenerator:
                 Multiply average audio amplitude by this scalar and add to progression until next particle
                 Remember that the audio amplitude on a highly compressed audio should not exceed 0.5 unless heavy DC bias
 
+            "modulator": str, "average_value"
+                Which modulator of MMVSkiaCore the above scalar multiplies, "kick" or "onset" spawn particles on hits
+
             "layer: int, 3
                 What layer on MMVSkiaAnimation to add the particles on?
 
@@ -146,6 +151,7 @@ class MMVSkiaParticleGenerator:
         self.add_per_step = kwargs.get("add_per_step", 10)
         self.add_to_layer = kwargs.get("layer", 3)
         self.average_sound_amplitude_add_per_step = kwargs.get("average_sound_amplitude_add_per_step", 40)
+        self.modulator = kwargs.get("modulator", "average_value")
 
         # Shake
         self.do_apply_shake = kwargs.get("do_apply_shake", True)
@@ -214,10 +220,16 @@ class MMVSkiaParticleGenerator:
     def next(self):
         
         # Add progression until new generated object
-        self.next_particle_percentage += self.add_per_step * self.mmvskia_main.context.fps_ratio_multiplier
+        progression = self.add_per_step * self.mmvskia_main.context.fps_ratio_multiplier
 
         # Add more progression on particles according to sound level
-        self.next_particle_percentage += self.average_sound_amplitude_add_per_step * self.mmvskia_main.core.modulators["average_value"]
+        progression += self.average_sound_amplitude_add_per_step * self.mmvskia_main.core.modulator(self.modulator)
+
+        # Adaptive quality draft renders may generate fewer particles
+        if self.mmvskia_main.context.adaptive_quality:
+            progression *= self.mmvskia_main.quality.particle_density
+
+        self.next_particle_percentage += progression
 
         generate_amount = int(self.next_particle_percentage / 100)
 
@@ -248,12 +260,12 @@ class MMVSkiaParticleGenerator:
     # Bottom mid top preset generator function
     def preset_bottom_mid_top(self):
 
-        particle = MMVSkiaImage(mmvskia_main = self.mmvskia_main, from_generator = True)
+        particle = MMVSkiaCompactImage(mmvskia_main = self.mmvskia_main)
 
         # Load random particle
         particle.image.load_from_path(
             self.mmvskia_main.utils.random_file_from_dir (
-                self.particles_images_directory, silent = True
+                self.particles_images_directory, silent = True, rng = self.rng
             )
         )
         
@@ -263,12 +275,12 @@ class MMVSkiaParticleGenerator:
 
         # # Create start, mid, end positions
 
-        x1 = random.randint(0, self.mmvskia_main.context.width)
+        x1 = self.rng.randint(0, self.mmvskia_main.context.width)
         y1 = self.mmvskia_main.context.height
-        x2 = x1 + random.randint(-horizontal_randomness, horizontal_randomness)
-        y2 = y1 + random.randint(-vertical_randomness_min, -vertical_randomness_max)
-        x3 = x2 + random.randint(-horizontal_randomness, horizontal_randomness)
-        y3 = y2 + random.randint(-vertical_randomness_min, -vertical_randomness_max)
+        x2 = x1 + self.rng.randint(-horizontal_randomness, horizontal_randomness)
+        y2 = y1 + self.rng.randint(-vertical_randomness_min, -vertical_randomness_max)
+        x3 = x2 + self.rng.randint(-horizontal_randomness, horizontal_randomness)
+        y3 = y2 + self.rng.randint(-vertical_randomness_min, -vertical_randomness_max)
 
         # # 
 
@@ -321,7 +333,7 @@ class MMVSkiaParticleGenerator:
         if self.do_apply_fade:
             
             # Add random number to fade mid
-            self.fade_mid += random.uniform(-self.fade_random, self.fade_random)
+            self.fade_mid += self.rng.uniform(-self.fade_random, self.fade_random)
 
             # Upper and lower limit fade mid value
             self.fade_mid = max(min(self.fade_mid, 1), 0)
@@ -340,7 +352,7 @@ class MMVSkiaParticleGenerator:
                 )
             }
 
-        this_steps = random.randint(50, 100)
+        this_steps = self.rng.randint(50, 100)
 
         # First path of animation, we go to the middle of the screen
         particle.animation[0] = {
@@ -397,7 +409,7 @@ class MMVSkiaParticleGenerator:
                 )
             }
         
-        this_steps = random.randint(150, 200)
+        this_steps = self.rng.randint(150, 200)
 
         # Second layer of animation, go up and (fade out?)
         particle.animation[1] = {
@@ -414,7 +426,7 @@ class MMVSkiaParticleGenerator:
 
         # Resize the image by a scalar
         particle.image.resize_by_ratio(
-            random.uniform(
+            self.rng.uniform(
                 self.particle_minimum_size * self.mmvskia_main.context.resolution_ratio_multiplier,
                 self.particle_maximum_size * self.mmvskia_main.context.resolution_ratio_multiplier,
             ),
@@ -430,12 +442,12 @@ class MMVSkiaParticleGenerator:
 
     def preset_middle_out(self):
 
-        particle = MMVSkiaImage(mmvskia_main = self.mmvskia_main, from_generator = True)
+        particle = MMVSkiaCompactImage(mmvskia_main = self.mmvskia_main)
 
         # Load random particle
         particle.image.load_from_path(
             self.mmvskia_main.utils.random_file_from_dir (
-                self.particles_images_directory, silent = True
+                self.particles_images_directory, silent = True, rng = self.rng
             )
         )
         
@@ -449,7 +461,7 @@ class MMVSkiaParticleGenerator:
         # The maximum distance we'll walk is the diagonal (Center - Corner) * maximum_distance_ratio
         self.mmvskia_main.polar_coordinates.from_r_theta(
             r = self.mmvskia_main.context.resolution_diagonal / 2,
-            theta = random.uniform(0, 2*math.pi),
+            theta = self.rng.uniform(0, 2*math.pi),
         )
 
         # The direction we'll walk..
@@ -519,13 +531,13 @@ class MMVSkiaParticleGenerator:
                         self.mmvskia_main,
                         function = "linear",
                         total_steps = self.fade_total_step,
-                        start = self.fade_start + random.uniform(-self.fade_random, self.fade_random),
+                        start = self.fade_start + self.rng.uniform(-self.fade_random, self.fade_random),
                         end = self.fade_end,
                     )
                 )
             }
 
-        this_steps = random.randint(50, 100)
+        this_steps = self.rng.randint(50, 100)
 
         # Set the animation
         particle.animation[0] = {
@@ -542,7 +554,7 @@ class MMVSkiaParticleGenerator:
 
         # Resize the image by a scalar
         particle.image.resize_by_ratio(
-            random.uniform(
+            self.rng.uniform(
                 self.particle_minimum_size * self.mmvskia_main.context.resolution_ratio_multiplier,
                 self.particle_maximum_size * self.mmvskia_main.context.resolution_ratio_multiplier,
             ),
@@ -31,6 +31,7 @@ from mmv.mmvskia.mmv_generator import *
 from mmv.mmvskia.mmv_modifiers import *
 import logging
 import random
+import bisect
 import copy
 import math
 import os
@@ -44,10 +45,10 @@ class MMVSkiaAnimation:
         debug_prefix = "[MMVSkiaAnimation.__init__]"
         ndepth = depth + LOG_NEXT_DEPTH
         self.mmv_main = mmv_main
-        self.preludec = self.mmv_main.prelude["mmvanimation"]
+        self.preludec = self.mmv_main.prelude.mmvanimation
 
         # Log we started
-        if self.preludec["log_creation"]:
+        if self.preludec.log_creation:
             logging.info(f"{depth}{debug_prefix} Creating empty content and generators dictionary and list respectively")
 
         # Content are the MMV objects stored that gets rendered on the screen
@@ -55,28 +56,40 @@ class MMVSkiaAnimation:
         self.content = {}
         self.generators = []
 
+        # Layer indexes of self.content kept sorted, so we don't sort them every frame
+        self.layer_order = []
+
     # Make layers until a given N value
     def mklayers_until(self, n: int, depth = LOG_NO_DEPTH) -> None:
         debug_prefix = "[MMVSkiaAnimation.__init__]"
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Hard debug this action
-        if self.preludec["mklayers_until"]["log_action"]:
+        if self.preludec.mklayers_until.log_action:
             logging.debug(f"{ndepth}{debug_prefix} Making animation layers until N = [{n}]")
 
+        # Layers are made from zero so if N exists every layer below it does too
+        if n in self.content:
+            return
+
         # n + 1 because range() is exclusive at the end ( range(2) = [0, 1] )
         # and we use "human numbers" starting at 1
         for layer_index in range(n + 1):  
 
             # If we need to create this empty animation layer (list)
-            if layer_index not in list(self.content.keys()):
+            if layer_index not in self.content:
 
                 # Log that we'll be doing so
-                if self.preludec["mklayers_until"]["log_new_layers"]:
+                if self.preludec.mklayers_until.log_new_layers:
                     logging.info(f"{depth}{debug_prefix} Animation layer index N = [{layer_index}] didn't existed, creating empty list")
 
-                # Create empty list at
+                # Create empty list at, keep the layer order sorted
                 self.content[layer_index] = []
+                bisect.insort(self.layer_order, layer_index)
+
+    # Sort the layer indexes again, for when self.content is replaced (snapshots)
+    def rebuild_layer_order(self) -> None:
+        self.layer_order = sorted(self.content.keys())
 
     # Call every next step of the content animations
     def next(self, depth = LOG_NO_DEPTH) -> None:
@@ -89,6 +102,13 @@ class MMVSkiaAnimation:
             # Get what the generator has to offer, a list
             new = item.next()
 
+            # Nothing this step
+            if not new:
+                continue
+
+            # Group the new objects by the layer they go to and add them at once
+            new_by_layer = {}
+
             # For each returned new stuff from generator
             for new_object in new:
 
@@ -97,37 +117,37 @@ class MMVSkiaAnimation:
 
                 # Object is not null, add it to the said layer
                 if object_to_add is not None:
-                    layer = new_object["layer"]
-                    self.mklayers_until(layer)
-                    self.content[layer].append(object_to_add)
+                    new_by_layer.setdefault(new_object["layer"], []).append(object_to_add)
 
-        # Dictionary of layers and item indexes on that layer to delete
-        items_to_delete = {}
-        
-        for layer_index in sorted(list(self.content.keys())):
-            for position, item in enumerate(self.content[layer_index]):
+            for layer, objects in new_by_layer.items():
+                self.mklayers_until(layer)
+                self.content[layer].extend(objects)
 
-                # We can delete the item as it has decided life wasn't worth anymore
-                if item.is_deletable:
+        # Someone changed the layers without mklayers_until
+        if len(self.layer_order) != len(self.content):
+            self.rebuild_layer_order()
+
+        for layer_index in self.layer_order:
+            layer = self.content[layer_index]
+
+            # How many items on this layer decided life wasn't worth anymore
+            deletable = 0
 
-                    # Create empty list if key doesn't exist
-                    if layer_index not in items_to_delete:
-                        items_to_delete[layer_index] = []
+            for item in layer:
 
-                    # Append item position on layer index
-                    items_to_delete[layer_index].append(position)
+                # We can delete the item, skip it
+                if item.is_deletable:
+                    deletable += 1
                     continue
 
                 # Generate and draw next step of animation
                 item.next()
-                item.blit()
-
-        # For each layer index we have items to delete
-        for layer_index in items_to_delete.keys():
-            # For each item in the REVERSED list of items indexes to delete,
-            # otherwise we break out iteration and index linking
-            for items in sorted(items_to_delete[layer_index], reverse = True):
-                del self.content[ layer_index ][ items ]
+                if self.mmv_main.core.drawing:
+                    item.blit()
+
+            # Compact the layer in one pass keeping the drawing order, only if it changed
+            if deletable:
+                layer[:] = [item for item in layer if not item.is_deletable]
 
         # Post process this final frame as we added all the items
         self.mmv_main.canvas.next()
@@ -58,7 +58,7 @@ class MMVContext:
         self.batch_size = 2048  # (48000 // self.fps) # 512
 
         # Offset the audio slice by this much of steps
-        self.offset_audio_before_in_many_steps = (60/self.fps) // 8
+        self.offset_audio_before_in_many_steps = int((60/self.fps) // 8)
 
         # Default attribution to resolution ratio
         self.resolution_ratio_multiplier = (1 / 720) * self.height
@@ -70,9 +70,47 @@ class MMVContext:
         self.watch_processing_video_realtime = False
         self.audio_amplitude_multiplier = 1
 
+        # Decode the input audio once into a float32 cache and memory map it, so long mixes don't
+        # need to fit in memory. None directory is the data dir's audio_cache, keeps the last few
+        self.audio_cache = True
+        self.audio_cache_directory = None
+        self.audio_cache_max_files = 4
+
+        # Decimate the audio once per FFT band with halfband filters and FFT windows of those
+        # streams instead of resampling every frame's slice, see AudioProcessing.prepare_filter_bank
+        self.multirate_filter_bank = True
+
+        # How the music bars get a value per piano key, "fft" takes the nearest FFT bin and
+        # "constant_q" a constant Q transform, see AudioProcessingPresets.constant_q
+        self.music_bars_transform = "fft"
+        self.constant_q_filter_scale = 1
+
+        # Analyze bass / mid / treble energies, onsets, kicks, the beat grid and a smoothed
+        # rms before rendering, effects pick them with their "modulator" kwarg. Seconds the
+        # rms_envelope modulator takes to rise and fall, see AudioModulators
+        self.precompute_modulators = True
+        self.modulators_attack = 0.01
+        self.modulators_release = 0.15
+
         # Use "gpu" or "cpu" render backend?
         self.skia_render_backend = "gpu"
 
+        # Render the scene realtime into a preview sink instead of the video file,
+        # see MMVSkiaInterface.realtime_preview
+        self.realtime_preview = False
+
+        # Render a draft at a fraction of the resolution, upscaled to output_width x output_height
+        # by the encoder, lowering quality knobs to hold a fps budget, see MMVSkiaQualityGovernor
+        self.adaptive_quality = False
+        self.output_width = None
+        self.output_height = None
+
+        # Snapshot the scene every this many seconds into snapshot_directory (0 for never)
+        # and the snapshot file to resume rendering from, see MMVSkiaSnapshot
+        self.snapshot_every = 0
+        self.snapshot_directory = None
+        self.resume_snapshot = None
+
     def update_biases(self):
 
         # This is a scalar value that says what percentage of a 720p resolution
@@ -43,12 +43,54 @@ class MMVSkiaCore:
         ndepth = depth + LOG_NEXT_DEPTH
         self.mmvskia_main = mmvskia_main
         self.prelude = self.mmvskia_main.prelude
-        self.preludec = self.prelude["mmvcore"]
+        self.preludec = self.prelude.mmvcore
+
+        # False on steps we advance the scene but don't draw it (dropped realtime preview
+        # frames), objects skip their canvas work and only update their state
+        self.drawing = True
 
         # Log creation
-        if self.preludec["log_creation"]:
+        if self.preludec.log_creation:
             logging.info(f"{depth}{debug_prefix} Created MMVSkiaCore()")
 
+    # Skia images pixel format, "auto" gets the right one based on the OS
+    def get_pixel_format(self, depth = LOG_NO_DEPTH) -> str:
+        debug_prefix = "[MMVSkiaCore.get_pixel_format]"
+
+        # Set pixel format according to the OS
+        if self.mmvskia_main.context.ffmpeg_pixel_format == "auto":
+            logging.info(f"{depth}{debug_prefix} Pixel format is [auto], getting right one based on the OS..")
+
+            # Windows
+            if self.mmvskia_main.utils.os == "windows":
+                logging.info(f"{depth}{debug_prefix} Pixel format set to [bgra] because Windows OS")
+                pixel_format = "bgra"
+
+            # Linux
+            elif self.mmvskia_main.utils.os == "linux":
+                logging.info(f"{depth}{debug_prefix} Pixel format set to [rgba] because GNU/Linux OS")
+                pixel_format = "rgba"
+                
+            # MacOS
+            elif self.mmvskia_main.utils.os == "macos":
+                logging.info(f"{depth}{debug_prefix} Pixel format set to [rgba] because Darwin / MacOS")
+                pixel_format = "rgba"
+
+            else: # Not configured, found?
+                raise RuntimeError(f"Pixel format \"auto\" not found for OS: [{self.mmvskia_main.utils.os}]")
+        else:
+            pixel_format = self.mmvskia_main.context.ffmpeg_pixel_format
+
+        return pixel_format
+
+    # Value of some modulator on this step, effects read theirs through this
+    def modulator(self, name: str) -> float:
+        try:
+            return self.modulators[name]
+        except KeyError:
+            hint = "" if self.mmvskia_main.context.precompute_modulators else " (set precompute_modulators for bands, onsets, beats and envelopes)"
+            raise RuntimeError(f"Unknown modulator [{name}], available ones are {sorted(self.modulators.keys())}{hint}") from None
+
     # Execute MMV, core loop
     def run(self, depth = LOG_NO_DEPTH) -> None:
         debug_prefix = "[MMVSkiaCore.run]"
@@ -63,17 +105,37 @@ class MMVSkiaCore:
         logging.info(f"{depth}{debug_prefix} Saving partial session info to last_session_info file at [{last_session_info_file}]")
 
         # Quit if code flow says so
-        if self.prelude["flow"]["stop_at_mmv_core_run"]:
+        if self.prelude.flow.stop_at_mmv_core_run:
             logging.critical(f"{ndepth}{debug_prefix} Not continuing because stop_at_mmv_core_run key on prelude.toml is True")
             sys.exit(0)
 
         # Don't write any videos, just process the audio (useful for debugging)
-        ONLY_PROCESS_AUDIO = self.prelude["flow"]["only_process_audio"]
+        ONLY_PROCESS_AUDIO = self.prelude.flow.only_process_audio
         logging.info(f"{depth}{debug_prefix} Only process audio: [{ONLY_PROCESS_AUDIO}]")
 
+        # Preview the scene realtime instead of rendering the video
+        REALTIME_PREVIEW = self.mmvskia_main.context.realtime_preview
+        logging.info(f"{depth}{debug_prefix} Realtime preview: [{REALTIME_PREVIEW}]")
+
+        # Lower quality knobs of a draft render to hold a fps budget
+        ADAPTIVE_QUALITY = self.mmvskia_main.context.adaptive_quality
+        logging.info(f"{depth}{debug_prefix} Adaptive quality: [{ADAPTIVE_QUALITY}]")
+
+        # Decoded audio cache, long inputs are memory mapped from it instead of read into memory
+        audio_cache_directory = None
+        if self.mmvskia_main.context.audio_cache:
+            audio_cache_directory = self.mmvskia_main.context.audio_cache_directory
+            if audio_cache_directory is None:
+                audio_cache_directory = os.path.join(self.mmvskia_main.mmvskia_interface.top_level_interace.data_dir, "audio_cache")
+
         # Read the audio and start FFmpeg pipe
         logging.info(f"{depth}{debug_prefix} Read audio file")
-        self.mmvskia_main.audio.read(path = self.mmvskia_main.context.input_audio_file, depth = ndepth)
+        self.mmvskia_main.audio.read(
+            path = self.mmvskia_main.context.input_audio_file,
+            cache_directory = audio_cache_directory,
+            cache_max_files = self.mmvskia_main.context.audio_cache_max_files,
+            depth = ndepth,
+        )
         
         # How many steps is the audio duration times the frames per second
         self.mmvskia_main.context.total_steps = int(self.mmvskia_main.audio.duration * self.mmvskia_main.context.fps)
@@ -83,75 +145,143 @@ class MMVSkiaCore:
         logging.info(f"{depth}{debug_prefix} Update Context bases")
         self.mmvskia_main.context.update_biases()
 
+        # Decimate the whole track once per band of the FFT config, see AudioProcessing.prepare_filter_bank
+        # The constant Q transform works on those same streams
+        CONSTANT_Q = (self.mmvskia_main.context.music_bars_transform == "constant_q") and bool(self.mmvskia_main.audio_processing.config)
+        FILTER_BANK = (self.mmvskia_main.context.multirate_filter_bank or CONSTANT_Q) and bool(self.mmvskia_main.audio_processing.config)
+        if FILTER_BANK:
+            logging.info(f"{depth}{debug_prefix} Preparing multirate filter bank")
+            self.mmvskia_main.audio_processing.prepare_filter_bank(
+                stereo_data = self.mmvskia_main.audio.stereo_data,
+                sample_rate = self.mmvskia_main.audio.sample_rate,
+                depth = ndepth,
+            )
+
+        if CONSTANT_Q:
+            logging.info(f"{depth}{debug_prefix} Preparing constant Q kernels")
+            self.mmvskia_main.audio_processing.prepare_constant_q(
+                filter_scale = self.mmvskia_main.context.constant_q_filter_scale,
+                depth = ndepth,
+            )
+
+        # Analyze the whole track once for the modulators other than the average amplitude
+        PRECOMPUTE_MODULATORS = self.mmvskia_main.context.precompute_modulators
+        if PRECOMPUTE_MODULATORS:
+            self.mmvskia_main.audio_processing.modulators.compute(
+                mono_data = self.mmvskia_main.audio.mono_data,
+                sample_rate = self.mmvskia_main.audio.sample_rate,
+                fps = self.mmvskia_main.context.fps,
+                total_steps = self.mmvskia_main.context.total_steps,
+                frame_size = self.mmvskia_main.context.batch_size,
+                attack = self.mmvskia_main.context.modulators_attack,
+                release = self.mmvskia_main.context.modulators_release,
+                amplitude_multiplier = self.mmvskia_main.context.audio_amplitude_multiplier,
+                depth = ndepth,
+            )
+
+        # Resume from a snapshot, the scene continues from the step it was taken
+        start_step = 0
+        if self.mmvskia_main.context.resume_snapshot is not None:
+            logging.info(f"{depth}{debug_prefix} Resuming from snapshot [{self.mmvskia_main.context.resume_snapshot}]")
+            start_step = self.mmvskia_main.snapshot.load(self.mmvskia_main.context.resume_snapshot, depth = ndepth)
+
+        # Second of the audio we start at
+        start_time = start_step / self.mmvskia_main.context.fps
+
+        # Snapshot every this many steps, 0 for never
+        SNAPSHOT_EVERY = 0
+        if self.mmvskia_main.context.snapshot_every and (self.mmvskia_main.context.snapshot_directory is not None):
+            SNAPSHOT_EVERY = max(1, int(self.mmvskia_main.context.snapshot_every * self.mmvskia_main.context.fps))
+        SNAPSHOT_DIRECTORY = self.mmvskia_main.context.snapshot_directory
+
+        # Fail now rather than on the first snapshot minutes into the render
+        if SNAPSHOT_EVERY:
+            self.mmvskia_main.snapshot.check(start_step, depth = ndepth)
+
         # Create the pipe write thread
         if not ONLY_PROCESS_AUDIO:
            
-            # Set pixel format according to the OS
-            if self.mmvskia_main.context.ffmpeg_pixel_format == "auto":
-                logging.info(f"{depth}{debug_prefix} Pixel format is [auto], getting right one based on the OS..")
-
-                # Windows
-                if self.mmvskia_main.utils.os == "windows":
-                    logging.info(f"{depth}{debug_prefix} Pixel format set to [bgra] because Windows OS")
-                    pixel_format = "bgra"
-
-                # Linux
-                elif self.mmvskia_main.utils.os == "linux":
-                    logging.info(f"{depth}{debug_prefix} Pixel format set to [rgba] because GNU/Linux OS")
-                    pixel_format = "rgba"
-                
-                # MacOS
-                elif self.mmvskia_main.utils.os == "macos":
-                    logging.info(f"{depth}{debug_prefix} Pixel format set to [rgba] because Darwin / MacOS")
-                    pixel_format = "rgba"
+            # Raw pixel format of Skia's images
+            pixel_format = self.get_pixel_format(depth = ndepth)
+
+            # Realtime preview, frames go to the preview sink paced by the audio clock
+            if REALTIME_PREVIEW:
+                logging.info(f"{depth}{debug_prefix} Starting realtime preview")
+                self.mmvskia_main.preview.start(
+                    width = self.mmvskia_main.context.width,
+                    height = self.mmvskia_main.context.height,
+                    fps = self.mmvskia_main.context.fps,
+                    pixel_format = pixel_format,
+                    depth = ndepth,
+                )
 
-                else: # Not configured, found?
-                    raise RuntimeError(f"Pixel format \"auto\" not found for OS: [{self.mmvskia_main.utils.os}]")
+            # Offline render, frames go to the FFmpeg encoder
             else:
-                pixel_format = self.mmvskia_main.context.ffmpeg_pixel_format
-
-            # Start video pipe
-            logging.info(f"{depth}{debug_prefix} Starting FFmpeg Pipe")
-            self.mmvskia_main.ffmpeg.pipe_images_to_video(
-
-                # Search for a FFmpeg binary
-                ffmpeg_binary_path = self.mmvskia_main.utils.get_executable_with_name(
-                    "ffmpeg",
-                    extra_paths = self.mmvskia_main.mmvskia_interface.top_level_interace.externals_dir,
-                    depth = ndepth    
-                ),
+                # Start video pipe
+                logging.info(f"{depth}{debug_prefix} Starting FFmpeg Pipe")
+                self.mmvskia_main.ffmpeg.pipe_images_to_video(
+
+                    # Search for a FFmpeg binary
+                    ffmpeg_binary_path = self.mmvskia_main.utils.get_executable_with_name(
+                        "ffmpeg",
+                        extra_paths = self.mmvskia_main.mmvskia_interface.top_level_interace.externals_dir,
+                        depth = ndepth    
+                    ),
+
+                    # Dump MMVContext configuration
+                    width = self.mmvskia_main.context.width,
+                    height = self.mmvskia_main.context.height,
+                    input_audio_file = self.mmvskia_main.context.input_audio_file,
+                    output_video = self.mmvskia_main.context.output_video,
+                    pix_fmt = pixel_format,
+                    pipe_pix_fmt = self.mmvskia_main.context.ffmpeg_pipe_pixel_format,
+                    framerate = self.mmvskia_main.context.fps,
+                    preset = self.mmvskia_main.context.x264_preset,
+                    hwaccel = self.mmvskia_main.context.ffmpeg_hwaccel,
+                    opencl = self.mmvskia_main.context.x264_use_opencl,
+                    dumb_player = self.mmvskia_main.context.ffmpeg_dumb_player,
+                    crf = self.mmvskia_main.context.x264_crf,
+                    audio_codec = self.mmvskia_main.context.ffmpeg_audio_codec,
+                    audio_bitrate = self.mmvskia_main.context.ffmpeg_audio_bitrate,
+                    audio_source = self.mmvskia_main.audio,
+                    audio_start_time = start_time,
+                    output_width = self.mmvskia_main.context.output_width,
+                    output_height = self.mmvskia_main.context.output_height,
+                    profile = self.mmvskia_main.context.ffmpeg_encoder_profile,
+                    encoder_threads = self.mmvskia_main.context.ffmpeg_encoder_threads,
+                    depth = ndepth,
+                )
 
-                # Dump MMVContext configuration
-                width = self.mmvskia_main.context.width,
-                height = self.mmvskia_main.context.height,
-                input_audio_file = self.mmvskia_main.context.input_audio_file,
-                output_video = self.mmvskia_main.context.output_video,
-                pix_fmt = pixel_format,
-                framerate = self.mmvskia_main.context.fps,
-                preset = self.mmvskia_main.context.x264_preset,
-                hwaccel = self.mmvskia_main.context.ffmpeg_hwaccel,
-                opencl = self.mmvskia_main.context.x264_use_opencl,
-                dumb_player = self.mmvskia_main.context.ffmpeg_dumb_player,
-                crf = self.mmvskia_main.context.x264_crf,
-                depth = ndepth,
-            )
+                # Encoder profiles may change the container of the output video
+                self.mmvskia_main.context.output_video = self.mmvskia_main.ffmpeg.output_video
+
+                # Pipe throughput telemetry
+                self.mmvskia_main.ffmpeg.configure_telemetry(
+                    frame_count = self.mmvskia_main.context.total_steps - start_step,
+                    fps = self.mmvskia_main.context.fps,
+                    max_queue_depth = self.mmvskia_main.context.max_images_on_pipe_buffer,
+                    callback = self.mmvskia_main.context.pipe_telemetry_callback,
+                    jsonl_path = self.mmvskia_main.context.pipe_telemetry_file,
+                    every = self.mmvskia_main.context.pipe_telemetry_every,
+                    depth = ndepth,
+                )
 
-            # Create pipe writer thread
-            logging.info(f"{depth}{debug_prefix} Creating pipe writer thread")
-            self.pipe_writer_loop_thread = threading.Thread(
-                target = self.mmvskia_main.ffmpeg.pipe_writer_loop,
-                args = (
-                    self.mmvskia_main.audio.duration,
-                    self.mmvskia_main.context.fps,
-                    self.mmvskia_main.context.total_steps,
-                    self.mmvskia_main.context.max_images_on_pipe_buffer
-                ),
-                daemon = True,
-            )
+                # Create pipe writer thread
+                logging.info(f"{depth}{debug_prefix} Creating pipe writer thread")
+                self.pipe_writer_loop_thread = threading.Thread(
+                    target = self.mmvskia_main.ffmpeg.pipe_writer_loop,
+                    args = (
+                        self.mmvskia_main.audio.duration,
+                        self.mmvskia_main.context.fps,
+                        self.mmvskia_main.context.total_steps - start_step,
+                        self.mmvskia_main.context.max_images_on_pipe_buffer
+                    ),
+                    daemon = True,
+                )
 
-            # Start the thread to write images onto FFmpeg
-            logging.info(f"{depth}{debug_prefix} Starting pipe writer thread")
-            self.pipe_writer_loop_thread.start()
+                # Start the thread to write images onto FFmpeg
+                logging.info(f"{depth}{debug_prefix} Starting pipe writer thread")
+                self.pipe_writer_loop_thread.start()
 
             # Init Skia
             logging.info(f"{depth}{debug_prefix} Init Skia")
@@ -162,16 +292,17 @@ class MMVSkiaCore:
             )
 
         # What to log and what not to
-        LOG_STEP = self.preludec["run"]["log_step"]
-        LOG_OFFSETTED_STEP = self.preludec["run"]["log_offsetted_step"]
-        LOG_MODULATORS = self.preludec["run"]["log_modulators"]
-        LOG_NEXT_STEPS = self.preludec["run"]["log_next_steps"]
+        LOG_STEP = self.preludec.run.log_step
+        LOG_OFFSETTED_STEP = self.preludec.run.log_offsetted_step
+        LOG_MODULATORS = self.preludec.run.log_modulators
+        LOG_NEXT_STEPS = self.preludec.run.log_next_steps
 
         # We use audio amplitudes on MMVShaders for syncing shaders with the last rendered
         # video. Does not easily work with custom input video, you have to feed values for
         # every frame
+        # Realtime previews drop frames so we don't have every amplitude
         WRITE_AUDIO_AMPLITUDE_VALUES_TO_LAST_SESSION_INFO = \
-            self.preludec["run"]["last_session_info"]["write_audio_amplitude_values"]
+            self.preludec.run.last_session_info.write_audio_amplitude_values and (not REALTIME_PREVIEW)
 
         # Create empty array for saving the audio amplitudes
         if WRITE_AUDIO_AMPLITUDE_VALUES_TO_LAST_SESSION_INFO:
@@ -186,7 +317,7 @@ class MMVSkiaCore:
         self.mmvskia_main.utils.dump_toml(
             data = {
                 "output_video": self.mmvskia_main.context.output_video,
-                "frame_count": self.mmvskia_main.context.total_steps,
+                "frame_count": self.mmvskia_main.context.total_steps - start_step,
                 "width": self.mmvskia_main.context.width,
                 "height": self.mmvskia_main.context.height,
             },
@@ -198,121 +329,185 @@ class MMVSkiaCore:
         logging.info(f"{depth}{debug_prefix} Start main routine")
         logging.info(f"{depth}{debug_prefix} Video will be saved in [{self.mmvskia_main.context.output_video}]")
 
-        # Iterate over all steps
-        for step in range(0, self.mmvskia_main.context.total_steps):
+        # Always close the preview sink, even if the render raises, so its shared memory block doesn't leak
+        try:
+            # Start the audio clock of the realtime preview
+            if REALTIME_PREVIEW and (not ONLY_PROCESS_AUDIO):
+                self.mmvskia_main.preview.play(start_time = start_time, depth = ndepth)
 
-            # Log current step, next iteration
-            if LOG_STEP:
-                logging.debug(STEP_SEPARATOR)
-                logging.debug(f"{depth}{debug_prefix} Next step:")
+            # Iterate over all steps
+            for step in range(start_step, self.mmvskia_main.context.total_steps):
 
-            # The "raw" frame index we're at
-            global_frame_index = step
-            
-            # # # [ Slice the audio ] # # #
+                # Snapshot the scene before rendering this step
+                if SNAPSHOT_EVERY and (step % SNAPSHOT_EVERY == 0) and (not step == start_step):
+                    self.mmvskia_main.snapshot.save(self.mmvskia_main.snapshot.path_of_step(SNAPSHOT_DIRECTORY, step), step, depth = ndepth)
 
-            # Add the offset audio step (because interpolation isn't instant for smoothness)
-            self.this_step = step + self.mmvskia_main.context.offset_audio_before_in_many_steps
+                # Log current step, next iteration
+                if LOG_STEP:
+                    logging.debug(STEP_SEPARATOR)
+                    logging.debug(f"{depth}{debug_prefix} Next step:")
 
-            # If this step is out of bounds because the offset, set it to its max value
-            if self.this_step >= self.mmvskia_main.context.total_steps - 1:
-                self.this_step = self.mmvskia_main.context.total_steps - 1
+                # Don't draw this frame if the realtime preview is behind the audio
+                if REALTIME_PREVIEW and (not ONLY_PROCESS_AUDIO):
+                    self.drawing = self.mmvskia_main.preview.should_render(step - start_step)
 
-            # Log offset step
-            if LOG_OFFSETTED_STEP:
-                logging.debug(f"{depth}{debug_prefix} Offsetted step by [{self.mmvskia_main.context.offset_audio_before_in_many_steps}] is [{self.this_step}]")
+                # The "raw" frame index we're at
+                global_frame_index = step
+            
+                # # # [ Slice the audio ] # # #
 
-            # The current time in seconds we're going to slice the audio based on its sample rate
-            # If we offset to the opposite way, the starting point can be negative hence the max function.
-            current_time = max((1/self.mmvskia_main.context.fps) * self.this_step, 0)
+                # Add the offset audio step (because interpolation isn't instant for smoothness)
+                self.this_step = step + self.mmvskia_main.context.offset_audio_before_in_many_steps
 
-            # Current time we're processing
-            self.mmvskia_main.context.current_time = (1/self.mmvskia_main.context.fps) * self.this_step
+                # If this step is out of bounds because the offset, set it to its max value
+                if self.this_step >= self.mmvskia_main.context.total_steps - 1:
+                    self.this_step = self.mmvskia_main.context.total_steps - 1
 
-            # The current time in sample count to slice the audio
-            this_time_in_samples = int(current_time * self.mmvskia_main.audio.sample_rate)
+                # Log offset step
+                if LOG_OFFSETTED_STEP:
+                    logging.debug(f"{depth}{debug_prefix} Offsetted step by [{self.mmvskia_main.context.offset_audio_before_in_many_steps}] is [{self.this_step}]")
 
-            # The slice starts at the this_time_in_samples and end the cut here
-            until = int(this_time_in_samples + self.mmvskia_main.context.batch_size)
+                # The current time in seconds we're going to slice the audio based on its sample rate
+                # If we offset to the opposite way, the starting point can be negative hence the max function.
+                current_time = max((1/self.mmvskia_main.context.fps) * self.this_step, 0)
 
-            # Slice the audio
-            self.mmvskia_main.audio_processing.slice_audio(
-                stereo_data = self.mmvskia_main.audio.stereo_data,
-                mono_data = self.mmvskia_main.audio.mono_data,
-                sample_rate = self.mmvskia_main.audio.sample_rate,
-                start_cut = this_time_in_samples,
-                end_cut = until,
-                batch_size = self.mmvskia_main.context.batch_size
-            )
+                # Current time we're processing
+                self.mmvskia_main.context.current_time = (1/self.mmvskia_main.context.fps) * self.this_step
 
-            # # # [ Calculate the FFTs ] # # #
+                # The current time in sample count to slice the audio
+                this_time_in_samples = int(current_time * self.mmvskia_main.audio.sample_rate)
 
-            fft_list = []
-            frequencies_list = []
+                # The slice starts at the this_time_in_samples and end the cut here
+                until = int(this_time_in_samples + self.mmvskia_main.context.batch_size)
 
-            # For each sliced channel data we have, process that into the FFTs list
-            for channel_data in self.mmvskia_main.audio_processing.audio_slice:
-               
-                # Process this audio sample
-                fft, frequencies = self.mmvskia_main.audio_processing.process(
-                    data = channel_data,
-                    original_sample_rate = self.mmvskia_main.audio.sample_rate,
+                # Slice the audio
+                self.mmvskia_main.audio_processing.slice_audio(
+                    stereo_data = self.mmvskia_main.audio.stereo_data,
+                    mono_data = self.mmvskia_main.audio.mono_data,
+                    sample_rate = self.mmvskia_main.audio.sample_rate,
+                    start_cut = this_time_in_samples,
+                    end_cut = until,
+                    batch_size = self.mmvskia_main.context.batch_size
                 )
 
-                # Add to the lists
-                fft_list.append(fft)
-                frequencies_list.append(frequencies)
-
-            # We can access this dictionary from anyone for this step audio information
-            self.modulators = {
-                "average_value": self.mmvskia_main.audio_processing.average_value * self.mmvskia_main.context.audio_amplitude_multiplier,
-                "fft": fft_list,
-                "frequencies": frequencies_list,
-            }
-
-            # Append audio amplitude to the list
-            if WRITE_AUDIO_AMPLITUDE_VALUES_TO_LAST_SESSION_INFO:
-                recorded_audio_amplitudes.append(self.modulators["average_value"])
+                # # # [ Calculate the FFTs ] # # #
+
+                fft_list = []
+                frequencies_list = []
+
+                # One value per piano key of the left and right channel
+                if CONSTANT_Q:
+                    channels_processed = self.mmvskia_main.audio_processing.process_constant_q(
+                        center = this_time_in_samples + self.mmvskia_main.context.batch_size // 2,
+                        batch_size = self.mmvskia_main.context.batch_size,
+                        original_sample_rate = self.mmvskia_main.audio.sample_rate,
+                    )
+
+                # Left and right channel FFTs from the decimated streams of the filter bank
+                elif FILTER_BANK:
+                    channels_processed = self.mmvskia_main.audio_processing.process_filter_bank(
+                        center = this_time_in_samples + self.mmvskia_main.context.batch_size // 2,
+                        batch_size = self.mmvskia_main.context.batch_size,
+                        original_sample_rate = self.mmvskia_main.audio.sample_rate,
+                    )
+                else:
+                    channels_processed = []
+
+                    # For each sliced channel data we have, process that into the FFTs list
+                    for channel_data in self.mmvskia_main.audio_processing.audio_slice:
+                   
+                        # Process this audio sample
+                        channels_processed.append(self.mmvskia_main.audio_processing.process(
+                            data = channel_data,
+                            original_sample_rate = self.mmvskia_main.audio.sample_rate,
+                        ))
+
+                for fft, frequencies in channels_processed:
+
+                    # Smaller batch sizes of the adaptive quality yield smaller magnitudes
+                    if ADAPTIVE_QUALITY and (not self.mmvskia_main.quality.fft_gain == 1):
+                        fft = [value * self.mmvskia_main.quality.fft_gain for value in fft]
+
+                    # Add to the lists
+                    fft_list.append(fft)
+                    frequencies_list.append(frequencies)
+
+                # We can access this dictionary from anyone for this step audio information
+                self.modulators = {
+                    "average_value": self.mmvskia_main.audio_processing.average_value * self.mmvskia_main.context.audio_amplitude_multiplier,
+                    "rms": self.mmvskia_main.audio_processing.rms_value * self.mmvskia_main.context.audio_amplitude_multiplier,
+                    "spectral_centroid": self.mmvskia_main.audio_processing.spectral_centroid,
+                    "fft": fft_list,
+                    "frequencies": frequencies_list,
+                }
+
+                # Bands, onsets, beats and envelopes analyzed before the first frame
+                if PRECOMPUTE_MODULATORS:
+                    self.modulators.update(self.mmvskia_main.audio_processing.modulators.at(self.this_step))
+
+                # Append audio amplitude to the list
+                if WRITE_AUDIO_AMPLITUDE_VALUES_TO_LAST_SESSION_INFO:
+                    recorded_audio_amplitudes.append(self.modulators["average_value"])
         
-            # Log modulators
-            if LOG_MODULATORS:
-                logging.debug(f"{depth}{debug_prefix} Modulators on this step: [{self.modulators}]")
+                # Log modulators
+                if LOG_MODULATORS:
+                    logging.debug(f"{depth}{debug_prefix} Modulators on this step: [{self.modulators}]")
 
-            # # # [ Next steps ] # # #
+                # # # [ Next steps ] # # #
 
-            # Don't draw anything or pipe to FFmpeg if we're only processing the audio
-            if not ONLY_PROCESS_AUDIO:
+                # Don't draw anything or pipe to FFmpeg if we're only processing the audio
+                if not ONLY_PROCESS_AUDIO:
                 
-                # Reset skia canvas
-                if LOG_NEXT_STEPS:
-                    logging.debug(f"{depth}{debug_prefix} Reset skia canvas")
-                self.mmvskia_main.skia.reset_canvas()
-
-                # Process next animation with audio info and the step count to process on
-                if LOG_NEXT_STEPS:
-                    logging.debug(f"{depth}{debug_prefix} Call MMVSkiaAnimation.next()")
-                self.mmvskia_main.mmv_animation.next()
-
-                # Next image to pipe
-                if LOG_NEXT_STEPS:
-                    logging.debug(f"{depth}{debug_prefix} Get next image from canvas array")
-                next_image = self.mmvskia_main.skia.canvas_array()
-
-                # Save current canvas's Frame to the final video, the pipe writer thread will actually pipe it
-                if LOG_NEXT_STEPS:
-                    logging.debug(f"{depth}{debug_prefix} Write image to FFmpeg pipe index [{global_frame_index}]")
-                self.mmvskia_main.ffmpeg.write_to_pipe(global_frame_index, next_image)
+                    # Reset skia canvas
+                    if LOG_NEXT_STEPS:
+                        logging.debug(f"{depth}{debug_prefix} Reset skia canvas")
+                    if self.drawing:
+                        self.mmvskia_main.skia.reset_canvas()
+
+                    # Process next animation with audio info and the step count to process on
+                    if LOG_NEXT_STEPS:
+                        logging.debug(f"{depth}{debug_prefix} Call MMVSkiaAnimation.next()")
+                    self.mmvskia_main.mmv_animation.next()
+
+                    # Dropped preview frame, the scene is up to date, nothing to show
+                    if not self.drawing:
+                        continue
+
+                    # Next image to pipe
+                    if LOG_NEXT_STEPS:
+                        logging.debug(f"{depth}{debug_prefix} Get next image from canvas array")
+                    next_image = self.mmvskia_main.skia.canvas_array()
+
+                    # Save current canvas's Frame to the final video, the pipe writer thread will actually pipe it
+                    if LOG_NEXT_STEPS:
+                        logging.debug(f"{depth}{debug_prefix} Write image to FFmpeg pipe index [{global_frame_index}]")
+                    if REALTIME_PREVIEW:
+                        self.mmvskia_main.preview.show(global_frame_index - start_step, next_image)
+                    else:
+                        self.mmvskia_main.ffmpeg.write_to_pipe(global_frame_index - start_step, next_image)
+
+                    # Adapt the quality knobs to the render speed
+                    if ADAPTIVE_QUALITY:
+                        self.mmvskia_main.quality.tick(global_frame_index, depth = ndepth)
             
-            else:  # QOL print what is happening
-                print(f"\rOnly process audio [{global_frame_index} / {self.mmvskia_main.context.total_steps}", end="")
+                else:  # QOL print what is happening
+                    print(f"\rOnly process audio [{global_frame_index} / {self.mmvskia_main.context.total_steps}", end="")
+        finally:
+            if REALTIME_PREVIEW and (not ONLY_PROCESS_AUDIO):
+                logging.info(f"{depth}{debug_prefix} Finishing realtime preview")
+                self.mmvskia_main.preview.finish(depth = ndepth)
 
         # End pipe, no pipe to close if we're only processing audio
         if ONLY_PROCESS_AUDIO:
             self.mmvskia_main.skia.terminate_glfw()
-        else:
+        elif not REALTIME_PREVIEW:
             logging.info(f"{depth}{debug_prefix} Call to close pipe, let it wait until it's done")
             self.mmvskia_main.ffmpeg.close_pipe()
 
+        # Which knobs the draft render had to lower
+        if ADAPTIVE_QUALITY:
+            self.mmvskia_main.quality.report(depth = ndepth)
+
         # Update the TOML with the new data
         if WRITE_AUDIO_AMPLITUDE_VALUES_TO_LAST_SESSION_INFO:
 
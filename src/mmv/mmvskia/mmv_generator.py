@@ -36,16 +36,16 @@ class MMVSkiaGenerator:
         debug_prefix = "[MMVSkiaGenerator.__init__]"
         ndepth = depth + LOG_NEXT_DEPTH
         self.mmvskia_main = mmvskia_main
-        self.preludec = self.mmvskia_main.mmvskia_interface.prelude["mmvgenerator"]
+        self.preludec = self.mmvskia_main.mmvskia_interface.prelude.mmvgenerator
  
         # Get an unique identifier for this MMVSkiaImage object
         self.identifier = self.mmvskia_main.utils.get_unique_id(
             purpose = "MMVSkiaImage object", depth = ndepth,
-            silent = self.preludec["log_get_unique_id"]
+            silent = self.preludec.log_get_unique_id
         )
 
         # Log the creation of this class
-        if self.preludec["log_creation"]:
+        if self.preludec.log_creation:
             logging.info(f"{depth}{debug_prefix} [{self.identifier}] Created new MMVSkiaGenerator object, getting unique identifier for it")
 
         # Start with empty generator object
@@ -61,7 +61,7 @@ class MMVSkiaGenerator:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["particle_generator"]:
+        if self.preludec.particle_generator:
             logging.info(f"{depth}{debug_prefix} [{self.identifier}] Setting this generator object to MMVSkiaParticleGenerator with kwargs: {kwargs}")
 
         # Set this generator to a MMVSkiaParticleGenerator
@@ -28,118 +28,71 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 
 from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
 from mmv.mmvskia.mmv_image_configure import MMVSkiaImageConfigure
+from mmv.common.cmn_utils import lazy_cv2
 from mmv.common.cmn_frame import Frame
 from mmv.mmvskia.mmv_modifiers import *
 import logging
 import time
-import skia
+import itertools
 import uuid
-import cv2
 
 
-# Basically everything on MMV as we have to render images
-class MMVSkiaImage:
-    def __init__(self, mmvskia_main, depth = LOG_NO_DEPTH, from_generator = False) -> None:
-        debug_prefix = "[MMVSkiaImage.__init__]"
-        ndepth = depth + LOG_NEXT_DEPTH
-        self.mmvskia_main = mmvskia_main
-        self.preludec = self.mmvskia_main.prelude["mmvimage"]
+# What every image object on MMV does on a step, the modules, path modifiers and
+# blitting. MMVSkiaImage is the configurable one and MMVSkiaCompactImage the light
+# variant generators spawn by the thousands, see them for the attributes we use
+class MMVSkiaImageBase:
+    __slots__ = ()
 
-        # Log the creation of this class
-        if self.preludec["log_creation"] and not from_generator:
-            logging.info(f"{depth}{debug_prefix} Created new MMVSkiaImage object, getting unique identifier for it")
+    # Order the modules run on a step, video gets the new frame before everything
+    MODULES_ORDER = ["video", "rotate", "resize", "blur", "fade", "vignetting", "vectorial"]
 
-        # Get an unique identifier for this MMVSkiaImage object
-        self.identifier = self.mmvskia_main.utils.get_unique_id(
-            purpose = "MMVSkiaImage object", depth = ndepth,
-            silent = self.preludec["log_get_unique_id"] and from_generator
-        )
-        
-        # The "animation" and path this object will follow
-        self.animation = {}
-
-        # Create classes
-        self.configure = MMVSkiaImageConfigure(mmvskia_main = self.mmvskia_main, mmvimage_object = self)
-        self.image = Frame()
+    ROUND = 3
+    type = "mmvimage"
 
-        self.x = 0
-        self.y = 0
-        self.size = 1
-        self.rotate_value = 0
-        self.current_animation = 0
-        self.current_step = -1
-        self.is_deletable = False
-        self.is_vectorial = False
-        self.type = "mmvimage"
+    # # Snapshots
 
-        # If we want to get the images from a video, be sure to match the fps!!
-        self.video = None
+    # Video captures can't be serialized, store where they were at so we reopen and seek
+    # to the same frame after restoring, see MMVSkiaSnapshot. Works for __slots__ too
+    def __getstate__(self) -> dict:
+        state = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        state.update(getattr(self, "__dict__", {}))
 
-        # Offset is the animations and motions this frame offset
-        self.offset = [0, 0]
+        state["pipelines"] = {}
+        if state.get("video", None) is not None:
+            state["video_resume_frame"] = int(self.video.get(lazy_cv2().CAP_PROP_POS_FRAMES))
+            state["video"] = None
+        return state
 
-        self.ROUND = 3
-        
-        self._reset_effects_variables(depth = ndepth)
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
 
-    # Clean this MMVSkiaImage's todo processing or applied
+    # Clean this MMVSkiaImage's todo processing or applied, empty tuples until
+    # some module adds a filter so we don't create lists every object every frame
     def _reset_effects_variables(self, depth = LOG_NO_DEPTH):
         debug_prefix = "[MMVSkiaImage._reset_effects_variables]"
         ndepth = depth + LOG_NEXT_DEPTH
         
         # Log action
-        if self.preludec["_reset_effects_variables"]["log_action"]:
-            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Resetting effects variables (filters on image, mask, shaders, paint)")
+        if self.preludec._reset_effects_variables.log_action:
+            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Resetting effects variables (filters on image, mask, shaders)")
         
-        self.image_filters = []
-        self.mask_filters = []
-        # self.color_filters = []
-        self.shaders = []
-        self.paint_dict = {
-            "AntiAlias": True
-        }
-    
-    # Our Canvas is an MMVSkiaImage object so we reset it, initialize the animation layers automatically, bla bla
-    # we don't need the actual configuration from the user apart from post processing accesses by this
-    # MMVSkiaImage's MMVSkiaImageConfigure class
-    def create_canvas(self, depth = LOG_NO_DEPTH) -> None:
-        debug_prefix = "[MMVSkiaImage.create_canvas]"
-        ndepth = depth + LOG_NEXT_DEPTH
-
-        # Log action
-        if self.preludec["create_canvas"]["log_action"]:
-            logging.info(f"{depth}{debug_prefix} [{self.identifier}] Create empty canvas (this ought be the video canvas?)")
-
-        # Will we be logging the steps?
-        log_steps = self.preludec["create_canvas"]["log_steps"]
-
-        # Initialize blank animation layer
-        if log_steps:
-            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Init animation layer")
-        self.configure.init_animation_layer(depth = ndepth)
-        
-        # Reset the canvas, create new image of Contex's width and height
-        if log_steps:
-            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Reset canvas")
-        self.reset_canvas(depth = ndepth)
-        
-        # Add Path Point at (0, 0)
-        if log_steps:
-            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add required static path of type Point at (x, y) = (0, 0)")
-        self.configure.add_path_point(x = 0, y = 0, depth = ndepth)
-    
-    # Create empty zeros canvas IMAGE, not CONTENTS.
-    # If we ever wanna mirror the contents and apply post processing
-    def reset_canvas(self, depth = LOG_NO_DEPTH) -> None:
-        debug_prefix = "[MMVSkiaImage.reset_canvas]"
-        ndepth = depth + LOG_NEXT_DEPTH
-
-        # Hard debug, this should be executed a lot and we don't wanna clutter the log file or stdout
-        if self.preludec["reset_canvas"]["log_action"]:
-            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Reset canvas, create new image of Context's width and height in size")
-            
-        # Actually create the new canvas
-        self.image.new(self.mmvskia_main.context.width, self.mmvskia_main.context.height)
+        self.image_filters = ()
+        self.mask_filters = ()
+        # self.color_filters = ()
+        self.shaders = ()
+        self.alpha = 1
+
+    # Add a skia image filter applied when blitting
+    def add_image_filter(self, image_filter) -> None:
+        if self.image_filters:
+            self.image_filters.append(image_filter)
+        else:
+            self.image_filters = [image_filter]
 
     # Next step of animation
     def next(self, depth = LOG_NO_DEPTH) -> None:
@@ -149,15 +102,15 @@ class MMVSkiaImage:
         # Next step
         self.current_step += 1
 
-        if self.preludec["next"]["log_current_step"]:
+        if self.preludec.next.log_current_step:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Next step, current step = [{self.current_step}]")
 
         # Animation has ended, this current_animation isn't present on path.keys
-        if self.current_animation not in list(self.animation.keys()):
+        if self.current_animation not in self.animation:
             self.is_deletable = True
         
             # Log we are marked to be deleted
-            if self.preludec["next"]["log_became_deletable"]:
+            if self.preludec.next.log_became_deletable:
                 logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Object is out of animation, marking to be deleted")
 
             return
@@ -183,184 +136,169 @@ class MMVSkiaImage:
         self.image.reset_to_original_image()
         self._reset_effects_variables()
 
-        position = this_animation["position"]
-        path = position["path"]
+        # Modules and path modifiers of this animation as flat lists of callables
+        pipeline = self.pipelines.get(self.current_animation)
+        if pipeline is None:
+            pipeline = self.compile_pipeline(self.current_animation, depth = ndepth)
 
-        if "modules" in this_animation:
-            
-            
-            modules = this_animation["modules"]
+        self.is_vectorial = pipeline["is_vectorial"]
 
-            self.is_vectorial = "vectorial" in modules
-
-            # The video module must be before everything as it gets the new frame                
-            if "video" in modules:
+        if self.preludec.next.debug_timings:
+            for name, function, this_module in pipeline["modules"]:
                 s = time.time()
+                function(this_module)
+                logging.debug(f"{depth}{debug_prefix} [{self.identifier}] {name.capitalize()} module .next() took [{time.time() - s:.010f}]")
+            logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Global .next() took [{time.time() - sg:.010f}]")
+        else:
+            for _, function, this_module in pipeline["modules"]:
+                function(this_module)
+
+        # Iterate through every position modifier (Point, Line override, Shake offsets)
+        for modifier_next in pipeline["path"]:
+            [self.x, self.y], self.offset = modifier_next(self.x, self.y, *self.offset)
+
+    # # Pipeline
+
+    # Resolve an animation index's modules and path modifiers into flat lists of bound
+    # callables in the order they must run, so .next() don't branch on them every frame
+    def compile_pipeline(self, index: int, depth = LOG_NO_DEPTH) -> dict:
+        debug_prefix = "[MMVSkiaImage.compile_pipeline]"
+        ndepth = depth + LOG_NEXT_DEPTH
 
-                this_module = modules["video"]
+        this_animation = self.animation[index]
+        modules = this_animation.get("modules", {})
 
-                # We haven't set a video capture or it has ended
-                if self.video is None:
-                    self.video = cv2.VideoCapture(this_module["path"])
+        pipeline = {
+            "is_vectorial": "vectorial" in modules,
 
-                # Can we read next frame? if not, go back to frame 0 for a loop
-                ok, frame = self.video.read()
-                if not ok:  # cry
-                    self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    ok, frame = self.video.read()
-                
-                # CV2 utilizes BGR matrix, but we need RGB
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+            # The video module must be before everything as it gets the new frame
+            "modules": [
+                (name, getattr(self, f"_next_module_{name}"), modules[name])
+                for name in self.MODULES_ORDER if name in modules
+            ],
 
-                self.image.load_from_array(frame)
-                self.image.resize_to_resolution(
-                    width = this_module["width"],
-                    height = this_module["height"],
-                    override = True
-                )
+            # Modifiers we know how to move with, they all take (x, y, ox, oy)
+            "path": [
+                modifier.next for modifier in this_animation["position"]["path"]
+                if isinstance(modifier, (MMVSkiaModifierPoint, MMVSkiaModifierLine, MMVSkiaModifierShake))
+            ],
+        }
 
-                if self.preludec["next"]["debug_timings"]:
-                    logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Video module .next() took [{time.time() - s:.010f}]")
+        if self.preludec.next.log_current_step:
+            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Compiled animation [{index}] modules {[name for name, _, _ in pipeline['modules']]}, [{len(pipeline['path'])}] path modifiers")
 
-            if "rotate" in modules:
-                s = time.time()
-                
-                this_module = modules["rotate"]
-                rotate = this_module["object"]
-
-                amount = rotate.next()
-                amount = round(amount, self.ROUND)
-                
-                if not self.is_vectorial:
-                    self.image.rotate(amount, from_current_frame=True)
-                else:
-                    self.rotate_value = amount
-
-                if self.preludec["next"]["debug_timings"]:
-                    logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Rotate module .next() took [{time.time() - s:.010f}]")
-
-            if "resize" in modules:
-                s = time.time()
-                
-                this_module = modules["resize"]
-                resize = this_module["object"]
+        self.pipelines[index] = pipeline
+        return pipeline
 
-                # Where the vignetting intensity is pointing to according to our 
-                resize.next()
-                self.size = resize.get_value()
+    # Configuration changed, compile the pipelines again on next .next()
+    def invalidate_pipeline(self) -> None:
+        self.pipelines = {}
 
-                if not self.is_vectorial:
-                    
-                    # If we're going to rotate, resize the rotated frame which is not the original image 
-                    offset = self.image.resize_by_ratio( self.size, from_current_frame = True )
+    # # Modules
 
-                    if this_module["keep_center"]:
-                        self.offset[0] += offset[0]
-                        self.offset[1] += offset[1]
+    def _next_module_video(self, this_module) -> None:
+        cv2 = lazy_cv2()
 
-                if self.preludec["next"]["debug_timings"]:
-                    logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Resize module .next() took [{time.time() - s:.010f}]")
+        # We haven't set a video capture or it has ended
+        if self.video is None:
+            self.video = cv2.VideoCapture(this_module["path"])
 
-            # DONE
-            if "blur" in modules:
-                s = time.time()
-                
-                this_module = modules["blur"]
-                blur = this_module["object"]
+            # Continue from where a snapshot was taken
+            if self.video_resume_frame is not None:
+                self.video.set(cv2.CAP_PROP_POS_FRAMES, self.video_resume_frame)
+                self.video_resume_frame = None
 
-                blur.next()
+        # Can we read next frame? if not, go back to frame 0 for a loop
+        ok, frame = self.video.read()
+        if not ok:  # cry
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.video.read()
+        
+        # CV2 utilizes BGR matrix, but we need RGB
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+
+        self.image.load_from_array(frame)
+        self.image.resize_to_resolution(
+            width = this_module["width"],
+            height = this_module["height"],
+            override = True
+        )
 
-                amount = blur.get_value()
+    def _next_module_rotate(self, this_module) -> None:
+        amount = this_module["object"].next()
+        amount = round(amount, self.ROUND)
+        
+        if not self.is_vectorial:
+            if self.mmvskia_main.core.drawing:
+                self.image.rotate(amount, from_current_frame=True)
+        else:
+            self.rotate_value = amount
 
-                self.image_filters.append(
-                    skia.ImageFilters.Blur(amount, amount)
-                )
+    def _next_module_resize(self, this_module) -> None:
+        resize = this_module["object"]
 
-                if self.preludec["next"]["debug_timings"]:
-                    logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Blur module .next() took [{time.time() - s:.010f}]")
-            
-            if "fade" in modules:
-                s = time.time()
-                
-                this_module = modules["fade"]
-                fade = this_module["object"]
-
-                fade.next()
-           
-                self.image.transparency( fade.get_value() )
-
-                if self.preludec["next"]["debug_timings"]:
-                    logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Fade module .next() took [{time.time() - s:.010f}]")
-                    
-            # Apply vignetting
-            if "vignetting" in modules:
-                s = time.time()
-                
-                this_module = modules["vignetting"]
-                vignetting = this_module["object"]
-
-                # Where the vignetting intensity is pointing to according to our 
-                vignetting.next()
-                vignetting.get_center()
-                next_vignetting = vignetting.get_value()
-
-                # This is a somewhat fake vignetting, we just start a black point with full transparency
-                # at the center and make a radial gradient that is black with no transparency at the radius
-                self.mmvskia_main.skia.canvas.drawPaint({
-                    'Shader': skia.GradientShader.MakeRadial(
-                        center=(vignetting.center_x, vignetting.center_y),
-                        radius=next_vignetting,
-                        colors=[skia.Color4f(0, 0, 0, 0), skia.Color4f(0, 0, 0, 1)]
-                    )
-                })
-
-                if self.preludec["next"]["debug_timings"]:
-                    logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Vignetting module .next() took [{time.time() - s:.010f}]")
+        # Where the vignetting intensity is pointing to according to our 
+        resize.next()
+        self.size = resize.get_value()
 
+        if (not self.is_vectorial) and self.mmvskia_main.core.drawing:
             
-            if "vectorial" in modules:
-                s = time.time()
-                
-                this_module = modules["vectorial"]
-                vectorial = this_module["object"]
+            # If we're going to rotate, resize the rotated frame which is not the original image 
+            offset = self.image.resize_by_ratio( self.size, from_current_frame = True )
 
-                effects = {
-                    "size": self.size,
-                    "rotate": self.rotate_value,
-                    "image_filters": self.image_filters,
-                }
+            if this_module["keep_center"]:
+                self.offset[0] += offset[0]
+                self.offset[1] += offset[1]
 
-                # Visualizer blit itself into the canvas automatically
-                vectorial.next(effects)
+    def _next_module_blur(self, this_module) -> None:
+        blur = this_module["object"]
+        blur.next()
 
-                if self.preludec["next"]["debug_timings"]:
-                    logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Vectorial module .next() took [{time.time() - s:.010f}]")
+        # Adaptive quality draft renders may turn blurs off, keep the animation going anyways
+        if self.mmvskia_main.context.adaptive_quality and (not self.mmvskia_main.quality.blur):
+            return
 
-            if self.preludec["next"]["debug_timings"]:
-                logging.debug(f"{depth}{debug_prefix} [{self.identifier}] Global .next() took [{time.time() - sg:.010f}]")
+        # Shared blur filter of this (quantized) amount, None if it is zero
+        image_filter = self.mmvskia_main.paints.blur(blur.get_value())
 
-        # Iterate through every position module
-        for modifier in path:
-            
-            # # Override modules
+        if image_filter is not None:
+            self.add_image_filter(image_filter)
+
+    def _next_module_fade(self, this_module) -> None:
+        fade = this_module["object"]
+        fade.next()
+
+        # Applied on the paint when blitting rather than on every pixel of the image
+        self.alpha = fade.get_value()
+
+    # Apply vignetting
+    def _next_module_vignetting(self, this_module) -> None:
+        vignetting = this_module["object"]
 
-            argument = [self.x, self.y] + self.offset
+        # Where the vignetting intensity is pointing to according to our 
+        vignetting.next()
+        vignetting.get_center()
+        next_vignetting = vignetting.get_value()
 
-            # Move according to a Point (be stationary)
-            if self.mmvskia_main.utils.is_matching_type([modifier], [MMVSkiaModifierPoint]):
-                # Attribute (x, y) to Point's x and y
-                [self.x, self.y], self.offset = modifier.next(*argument)
+        if not self.mmvskia_main.core.drawing:
+            return
 
-            # Move according to a Line (interpolate current steps)
-            if self.mmvskia_main.utils.is_matching_type([modifier], [MMVSkiaModifierLine]):
-                # Interpolate and unpack next coordinate
-                [self.x, self.y], self.offset = modifier.next(*argument)
+        # This is a somewhat fake vignetting, we just start a black point with full transparency
+        # at the center and make a radial gradient that is black with no transparency at the radius
+        self.mmvskia_main.paints.draw_vignetting(
+            self.mmvskia_main.skia.canvas,
+            vignetting.center_x, vignetting.center_y, next_vignetting
+        )
 
-            # # Offset modules
+    def _next_module_vectorial(self, this_module) -> None:
+        effects = {
+            "size": self.size,
+            "rotate": self.rotate_value,
+            "image_filters": self.image_filters,
+        }
 
-            # Get next shake offset value
-            if self.mmvskia_main.utils.is_matching_type([modifier], [MMVSkiaModifierShake]):
-                [self.x, self.y], self.offset = modifier.next(*argument)
+        # Visualizer blit itself into the canvas automatically
+        this_module["object"].next(effects)
 
     # Blit this item on the canvas
     def blit(self) -> None:
@@ -373,17 +311,159 @@ class MMVSkiaImage:
         y = int(self.x + self.offset[1])
         x = int(self.y + self.offset[0])
 
-        if self.mask_filters:
-            self.paint_dict["MaskFilter"] = self.mask_filters
-    
-        if self.image_filters:
-            self.paint_dict["ImageFilter"] = skia.ImageFilters.Merge(self.image_filters)
+        # Nothing to apply, shared plain paint
+        if (not self.image_filters) and (not self.mask_filters) and (self.alpha == 1):
+            paint = self.mmvskia_main.paints.paint()
+
+        # Mutate this object's own paint (made on first use or after snapshot restores)
+        else:
+            if self.paint is None:
+                self.paint = self.mmvskia_main.paints.mutable_paint()
+            paint = self.paint
 
-        # Get a paint with the options, image filters (if any) for skia to draw
-        paint = skia.Paint(self.paint_dict)
+            # One image filter (no Merge) or a cached merge of them
+            paint.setImageFilter(self.mmvskia_main.paints.merge(self.image_filters) if self.image_filters else None)
+
+            # Skia paints take one mask filter
+            paint.setMaskFilter(self.mask_filters[-1] if self.mask_filters else None)
+            paint.setAlphaf(self.alpha)
 
         # Blit this image
         self.mmvskia_main.skia.canvas.drawImage(
             self.image.image, x, y,
             paint = paint,
         )
+
+
+# Basically everything on MMV as we have to render images
+class MMVSkiaImage(MMVSkiaImageBase):
+    def __init__(self, mmvskia_main, depth = LOG_NO_DEPTH, from_generator = False) -> None:
+        debug_prefix = "[MMVSkiaImage.__init__]"
+        ndepth = depth + LOG_NEXT_DEPTH
+        self.mmvskia_main = mmvskia_main
+        self.preludec = self.mmvskia_main.prelude.mmvimage
+
+        # Log the creation of this class
+        if self.preludec.log_creation and not from_generator:
+            logging.info(f"{depth}{debug_prefix} Created new MMVSkiaImage object, getting unique identifier for it")
+
+        # Get an unique identifier for this MMVSkiaImage object
+        self.identifier = self.mmvskia_main.utils.get_unique_id(
+            purpose = "MMVSkiaImage object", depth = ndepth,
+            silent = self.preludec.log_get_unique_id and from_generator
+        )
+        
+        # The "animation" and path this object will follow
+        self.animation = {}
+
+        # Create classes
+        self.configure = MMVSkiaImageConfigure(mmvskia_main = self.mmvskia_main, mmvimage_object = self)
+        self.image = Frame()
+
+        self.x = 0
+        self.y = 0
+        self.size = 1
+        self.rotate_value = 0
+        self.current_animation = 0
+        self.current_step = -1
+        self.is_deletable = False
+        self.is_vectorial = False
+
+        # If we want to get the images from a video, be sure to match the fps!!
+        self.video = None
+
+        # Frame to seek the video to when it's opened, set when restoring snapshots
+        self.video_resume_frame = None
+
+        # Offset is the animations and motions this frame offset
+        self.offset = [0, 0]
+
+        # Compiled modules and path modifiers per animation index, see compile_pipeline
+        self.pipelines = {}
+
+        # Paint we mutate when blitting with filters or transparency
+        self.paint = None
+        
+        self._reset_effects_variables(depth = ndepth)
+
+    # Our Canvas is an MMVSkiaImage object so we reset it, initialize the animation layers automatically, bla bla
+    # we don't need the actual configuration from the user apart from post processing accesses by this
+    # MMVSkiaImage's MMVSkiaImageConfigure class
+    def create_canvas(self, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaImage.create_canvas]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        # Log action
+        if self.preludec.create_canvas.log_action:
+            logging.info(f"{depth}{debug_prefix} [{self.identifier}] Create empty canvas (this ought be the video canvas?)")
+
+        # Will we be logging the steps?
+        log_steps = self.preludec.create_canvas.log_steps
+
+        # Initialize blank animation layer
+        if log_steps:
+            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Init animation layer")
+        self.configure.init_animation_layer(depth = ndepth)
+        
+        # Reset the canvas, create new image of Contex's width and height
+        if log_steps:
+            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Reset canvas")
+        self.reset_canvas(depth = ndepth)
+        
+        # Add Path Point at (0, 0)
+        if log_steps:
+            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add required static path of type Point at (x, y) = (0, 0)")
+        self.configure.add_path_point(x = 0, y = 0, depth = ndepth)
+    
+    # Create empty zeros canvas IMAGE, not CONTENTS.
+    # If we ever wanna mirror the contents and apply post processing
+    def reset_canvas(self, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaImage.reset_canvas]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        # Hard debug, this should be executed a lot and we don't wanna clutter the log file or stdout
+        if self.preludec.reset_canvas.log_action:
+            logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Reset canvas, create new image of Context's width and height in size")
+            
+        # Actually create the new canvas
+        self.image.new(self.mmvskia_main.context.width, self.mmvskia_main.context.height)
+
+
+# Light MMVSkiaImage for objects generators spawn, no per instance dict, no configure
+# class nor unique id string (just an increasing integer) and no creation logging.
+# The generator writes the animation dictionary directly
+class MMVSkiaCompactImage(MMVSkiaImageBase):
+    __slots__ = (
+        "mmvskia_main", "preludec", "identifier", "animation", "image",
+        "x", "y", "size", "rotate_value", "offset",
+        "current_animation", "current_step", "is_deletable", "is_vectorial",
+        "video", "video_resume_frame", "pipelines",
+        "image_filters", "mask_filters", "shaders", "alpha", "paint",
+    )
+
+    # Integer identifiers of the compact images
+    _identifiers = itertools.count()
+
+    def __init__(self, mmvskia_main) -> None:
+        self.mmvskia_main = mmvskia_main
+        self.preludec = mmvskia_main.prelude.mmvimage
+        self.identifier = next(MMVSkiaCompactImage._identifiers)
+        self.animation = {}
+        self.image = Frame()
+        self.x = 0
+        self.y = 0
+        self.size = 1
+        self.rotate_value = 0
+        self.offset = [0, 0]
+        self.current_animation = 0
+        self.current_step = -1
+        self.is_deletable = False
+        self.is_vectorial = False
+        self.video = None
+        self.video_resume_frame = None
+        self.pipelines = {}
+        self.image_filters = ()
+        self.mask_filters = ()
+        self.shaders = ()
+        self.alpha = 1
+        self.paint = None
@@ -42,7 +42,7 @@ class MMVSkiaImageConfigure:
     # Get MMVSkiaImage object and set image index to zero
     def __init__(self, mmvskia_main, mmvimage_object) -> None:
         self.mmvskia_main = mmvskia_main
-        self.preludec = self.mmvskia_main.prelude["mmvimage_configure"]
+        self.preludec = self.mmvskia_main.prelude.mmvimage_configure
 
         self.parent_object = mmvimage_object
 
@@ -56,10 +56,10 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Get absolute and real path
-        path = self.mmvskia_main.utils.get_abspath(path, depth = ndepth, silent = not self.preludec["load_image"]["log_get_abspath"])
+        path = self.mmvskia_main.utils.get_abspath(path, depth = ndepth, silent = not self.preludec.load_image.log_get_abspath)
 
         # Log action
-        if self.preludec["load_image"]["log_action"]:
+        if self.preludec.load_image.log_action:
             logging.info(f"{depth}{debug_prefix} [{self.identifier}] Loading image from path [{path}]")
 
         # Fail safe get the abspath and 
@@ -75,7 +75,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log info and run routine functions
-        if self.preludec["init_animation_layer"]["log_action"]:
+        if self.preludec.init_animation_layer.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Initializing animation layer")
 
         ndepth += LOG_NEXT_DEPTH
@@ -89,7 +89,7 @@ class MMVSkiaImageConfigure:
         debug_prefix = "[MMVSkiaImageConfigure.start_or_reset_this_animation]"
         ndepth = depth + LOG_NEXT_DEPTH
 
-        if self.preludec["start_or_reset_this_animation"]["log_action"]:
+        if self.preludec.start_or_reset_this_animation.log_action:
             logging.info(f"{depth}{debug_prefix} [{self.identifier}] Reset the parent MMVSkiaImage object animation layers")
 
         # Emptry layer of stuff
@@ -97,13 +97,14 @@ class MMVSkiaImageConfigure:
         self.parent_object.animation[self.animation_index]["position"] = {"path": []}
         self.parent_object.animation[self.animation_index]["modules"] = {}
         self.parent_object.animation[self.animation_index]["animation"] = {}
+        self.parent_object.invalidate_pipeline()
 
     # Override current animation index we're working on into new index
     def set_animation_index(self, n: int, depth = LOG_NO_DEPTH) -> None:
         debug_prefix = "[MMVSkiaImageConfigure.set_animation_index]"
         ndepth = depth + LOG_NEXT_DEPTH
 
-        if self.preludec["set_animation_index"]["log_action"]:
+        if self.preludec.set_animation_index.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Set animation index N = [{n}]")
 
         self.animation_index = n
@@ -114,10 +115,11 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Hard debug
-        if self.preludec["set_this_animation_steps"]["log_action"]:
+        if self.preludec.set_this_animation_steps.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] This animation N = [{self.animation_index}] will have [{steps}] steps")
 
         self.parent_object.animation[self.animation_index]["animation"]["steps"] = steps
+        self.parent_object.invalidate_pipeline()
 
     # Work on next animation index from the current one
     def next_animation_index(self) -> None:
@@ -132,7 +134,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["resize_image_to_resolution"]["log_action"]:
+        if self.preludec.resize_image_to_resolution.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Resize image to resolution, kwargs: {kwargs}")
 
         self.parent_object.image.resize_to_resolution(
@@ -148,7 +150,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["resize_image_to_video_resolution"]["log_action"]:
+        if self.preludec.resize_image_to_video_resolution.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Resize image to video, kwargs: {kwargs}")
 
         self.resize_image_to_resolution(
@@ -175,7 +177,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["add_module_video"]["log_action"]:
+        if self.preludec.add_module_video.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add video module, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["modules"]["video"] = {
@@ -183,6 +185,7 @@ class MMVSkiaImageConfigure:
             "width": kwargs["width"] + kwargs.get("over_resize_width", 0),
             "height": kwargs["height"] + kwargs.get("over_resize_height", 0),
         }
+        self.parent_object.invalidate_pipeline()
 
 
     """     (PATH)
@@ -197,7 +200,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["add_path_point"]["log_action"]:
+        if self.preludec.add_path_point.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add path point, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["position"]["path"].append(
@@ -206,6 +209,7 @@ class MMVSkiaImageConfigure:
                 y = kwargs["y"], x = kwargs["x"],
             )
         )
+        self.parent_object.invalidate_pipeline()
 
 
     """     (PATH OFFSET)
@@ -221,7 +225,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["simple_add_path_modifier_shake"]["log_action"]:
+        if self.preludec.simple_add_path_modifier_shake.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add simple shaker modifier, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["position"]["path"].append(
@@ -240,6 +244,7 @@ class MMVSkiaImageConfigure:
                 distance = kwargs["shake_max_distance"],
             )
         )
+        self.parent_object.invalidate_pipeline()
 
     # # # [ MMVSkiaVectorial ] # # #
 
@@ -251,7 +256,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["add_vectorial_by_kwargs"]["log_action"]:
+        if self.preludec.add_vectorial_by_kwargs.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add vectorial module by kwargs, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["modules"]["vectorial"] = {
@@ -260,6 +265,7 @@ class MMVSkiaImageConfigure:
                 **kwargs,
             )
         }
+        self.parent_object.invalidate_pipeline()
 
     """     (MMVSkiaVectorial), Music Bars
         Add a music bars visualizer module
@@ -273,7 +279,7 @@ class MMVSkiaImageConfigure:
         kwargs["vectorial_type_class"] = "visualizer"
 
         # Log action
-        if self.preludec["add_module_visualizer"]["log_action"]:
+        if self.preludec.add_module_visualizer.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Changed kwargs vectorial_type_class, new kwargs and call add_vectorial_by_kwargs: {kwargs}")
 
         self.add_vectorial_by_kwargs(depth = ndepth, **kwargs)
@@ -290,7 +296,7 @@ class MMVSkiaImageConfigure:
         kwargs["vectorial_type_class"] = "progression-bar"
 
         # Log action
-        if self.preludec["add_module_progression_bar"]["log_action"]:
+        if self.preludec.add_module_progression_bar.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Changed kwargs vectorial_type_class, new kwargs and call add_vectorial_by_kwargs: {kwargs}")
 
         self.add_vectorial_by_kwargs(**kwargs)
@@ -307,7 +313,7 @@ class MMVSkiaImageConfigure:
         kwargs["vectorial_type_class"] = "piano-roll"
 
         # Log action
-        if self.preludec["add_module_piano_roll"]["log_action"]:
+        if self.preludec.add_module_piano_roll.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Changed kwargs vectorial_type_class, new kwargs and call add_vectorial_by_kwargs: {kwargs}")
 
         self.add_vectorial_by_kwargs(**kwargs)
@@ -330,6 +336,8 @@ class MMVSkiaImageConfigure:
             3:   medium-plus
             4:   high
             4.5: high-plus
+        "modulator": str, "average_value", which audio modulator to react to, like "bass", "kick",
+            "onset", "beat" or "rms_envelope", see AudioModulators for all of them
     }
     """
     def add_module_resize(self, depth = LOG_NO_DEPTH, **kwargs)-> None:
@@ -337,7 +345,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["add_module_resize"]["log_action"]:
+        if self.preludec.add_module_resize.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add module resize, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["modules"]["resize"] = {
@@ -352,6 +360,7 @@ class MMVSkiaImageConfigure:
             ),
             "keep_center": kwargs.get("keep_center", True),
         }
+        self.parent_object.invalidate_pipeline()
 
     
     """     (MMVModifier), Blur
@@ -362,6 +371,8 @@ class MMVSkiaImageConfigure:
             10: low
             15: medium
             20: high
+        "modulator": str, "average_value", which audio modulator to react to, like "bass", "kick",
+            "onset", "beat" or "rms_envelope", see AudioModulators for all of them
     }
     """
     def add_module_blur(self, depth = LOG_NO_DEPTH, **kwargs)-> None:
@@ -369,7 +380,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["add_module_blur"]["log_action"]:
+        if self.preludec.add_module_blur.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add module blur, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["modules"]["blur"] = {
@@ -384,6 +395,7 @@ class MMVSkiaImageConfigure:
             ),
             "keep_center": kwargs.get("keep_center", True),
         }
+        self.parent_object.invalidate_pipeline()
 
 
     # # # [ Rotation ] # # #
@@ -402,12 +414,13 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["add_module_swing_rotation"]["log_action"]:
+        if self.preludec.add_module_swing_rotation.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add module swing rotation, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["modules"]["rotate"] = {
             "object": MMVSkiaModifierSineSwing(self.mmvskia_main, **kwargs)
         }
+        self.parent_object.invalidate_pipeline()
 
 
     """     (MMVModifier), Rotation
@@ -422,12 +435,13 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["add_module_linear_rotation"]["log_action"]:
+        if self.preludec.add_module_linear_rotation.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add module linear rotation, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["modules"]["rotate"] = {
             "object": MMVSkiaModifierLinearSwing(self.mmvskia_main, **kwargs)
         }
+        self.parent_object.invalidate_pipeline()
 
 
     """     (MMVModifier), Vignetting
@@ -437,6 +451,8 @@ class MMVSkiaImageConfigure:
         "scalar": float, hange the vignetting intensity by average audio amplitude by this
         "minimum": float, hard limit minimum vignette
         "smooth": float, how smooth changing values are on the interpolation
+        "modulator": str, "average_value", which audio modulator to react to, like "bass", "kick",
+            "onset", "beat" or "rms_envelope", see AudioModulators for all of them
     }
     """
     def add_module_vignetting(self, depth = LOG_NO_DEPTH, **kwargs)-> None:
@@ -444,7 +460,7 @@ class MMVSkiaImageConfigure:
         ndepth = depth + LOG_NEXT_DEPTH
 
         # Log action
-        if self.preludec["add_module_vignetting"]["log_action"]:
+        if self.preludec.add_module_vignetting.log_action:
             logging.debug(f"{ndepth}{debug_prefix} [{self.identifier}] Add module linear rotation, kwargs: {kwargs}")
 
         self.parent_object.animation[self.animation_index]["modules"]["vignetting"] = {
@@ -458,4 +474,5 @@ class MMVSkiaImageConfigure:
                 **kwargs
             ),
         }
+        self.parent_object.invalidate_pipeline()
 
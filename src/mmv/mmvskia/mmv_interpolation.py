@@ -26,7 +26,7 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 ===============================================================================
 """
 
-from mmv.common.cmn_interpolation import Interpolation
+from mmv.common.cmn_interpolation import RemainingApproachKernel, LinearKernel, Interpolation
 import math
 
 
@@ -71,6 +71,10 @@ class MMVSkiaInterpolation:
             self.ratio = kwargs["ratio"]
             self.ratio_randomness = kwargs.get("ratio_randomness", 0)
             self.speed_up_by_audio_volume = kwargs.get("speed_up_by_audio_volume", 0)
+
+            # Precomputed coefficients, own seeded random stream only if we need one
+            rng = self.mmv.random.spawn("MMVSkiaInterpolation") if self.ratio_randomness else None
+            self.kernel = RemainingApproachKernel(self.ratio, self.mmv.context.fps, self.ratio_randomness, rng)
         
         # Get options for a linear interpolation
         elif function == "linear":
@@ -79,6 +83,9 @@ class MMVSkiaInterpolation:
 
             # Options of the interpolation function
             self.total_steps = kwargs.get("total_steps") * self.mmv.context.fps_ratio_multiplier
+
+            # Precomputed coefficients, start and target are set later on with init
+            self.kernel = None
         
         # Get options for a sigmoid interpolation
         elif function == "sigmoid":
@@ -108,38 +115,60 @@ class MMVSkiaInterpolation:
         self.current_step += 1
 
         return self.current_value
+
+    # Same as calling next() n times in closed form, audio volume speed ups and ratio
+    # randomness aren't considered so this is exact only without them
+    def advance(self, n: int) -> float:
+        if n <= 0:
+            return self.current_value
+
+        if self.next_interpolation_function == self.remaining_approach:
+
+            # The first step starts on the start value
+            if self.current_step == 0:
+                self.current_value = self.start_value
+                self.current_step += 1
+                n -= 1
+
+            self.current_value = self.kernel.advance(self.current_value, self.target_value, n)
+
+        elif self.next_interpolation_function == self.linear:
+            self.current_value = self.linear_kernel().value(self.current_step + n - 1)
+
+        else:
+            for _ in range(n):
+                self.next()
+            return self.current_value
+
+        self.current_step += n
+
+        if abs(self.current_value - self.target_value) < 1:
+            self.finished = True
+
+        return self.current_value
     
     def remaining_approach(self) -> float:
 
-        # Change the ratio according to the audio volume
-        ratio = self.ratio + (self.mmv.core.modulators["average_value"] * self.speed_up_by_audio_volume)
+        # We're at the first step, so start on current value
+        if self.current_step == 0:
+            return self.start_value
 
-        # https://gitlab.com/Tremeschin/modular-music-visualizer/-/issues/2
-        # If new fps < 60, ratio should be higher
-        #
-        # Ratio = 0.5,  2x -> 1  0.5  0.25,        1x -> 0.75 , R = 0.25
-        # Ratio = 0.5,  3x -> 1  0.5  0.25  0.125  1x -> 0.865, R = 0.125
-        # Ratio = 0.5,  2x -> 1  0.5  0.25,        4x -> x^4 = 0.25,  x = 0.25**(1/4), 
-        # (self.ratio**60)**(1/self.mmv.context.fps)
-        #
-        ratio_according_to_fps = 1 - ((1 - ratio)**(60 / self.mmv.context.fps))
+        # Change the ratio according to the audio volume, the kernel converts it to the fps
+        if self.speed_up_by_audio_volume:
+            ratio = self.ratio + (self.mmv.core.modulators["average_value"] * self.speed_up_by_audio_volume)
+            return self.kernel.step_ratio(self.current_value, self.target_value, ratio)
 
-        return self.interpolation.remaining_approach(
-            start_value = self.start_value,
-            target_value = self.target_value,
-            current_step = self.current_step,
-            current_value = self.current_value,
-            ratio = ratio_according_to_fps,
-            ratio_randomness = self.ratio_randomness,
-        )
+        return self.kernel.step(self.current_value, self.target_value)
+
+    # Linear kernel of the current start and target values, they're set after creating this
+    # object and changed by some modifiers so only recompile when they change
+    def linear_kernel(self) -> LinearKernel:
+        if (self.kernel is None) or (not self.kernel.start_value == self.start_value) or (not self.kernel.target_value == self.target_value):
+            self.kernel = LinearKernel(self.start_value, self.target_value, self.total_steps)
+        return self.kernel
     
     def linear(self) -> float:
-        return self.interpolation.linear(
-            start_value = self.start_value,
-            target_value = self.target_value,
-            current_step = self.current_step,
-            total_steps = self.total_steps,
-        )
+        return self.linear_kernel().value(self.current_step)
     
     def sigmoid(self) -> float:
         return self.interpolation.sigmoid(
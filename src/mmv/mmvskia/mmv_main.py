@@ -27,10 +27,12 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
+from mmv.mmvskia.pyskt.pyskt_paint_cache import SkiaPaintCache
 from mmv.mmvskia.pyskt.pyskt_backend import SkiaNoWindowBackend
 from mmv.common.cmn_coordinates import PolarCoordinates
 from mmv.common.cmn_interpolation import Interpolation
 from mmv.mmvskia.mmv_animation import MMVSkiaAnimation
+from mmv.mmvskia.mmv_snapshot import MMVSkiaSnapshot
 from mmv.common.cmn_audio import AudioProcessing
 from mmv.mmvskia.mmv_context import MMVContext
 from mmv.common.cmn_functions import Functions
@@ -38,6 +40,7 @@ from mmv.mmvskia.mmv_image import MMVSkiaImage
 from mmv.common.cmn_video import FFmpegWrapper
 from mmv.mmvskia.mmv_core import MMVSkiaCore
 from mmv.common.cmn_audio import AudioFile
+from mmv.common.cmn_random import RandomStreams
 from mmv.common.cmn_fourier import Fourier
 from mmv.common.cmn_utils import Utils
 from PIL import Image
@@ -65,9 +68,15 @@ class MMVSkiaMain:
         logging.info(f"{depth}{debug_prefix} Creating MMVContext() class")
         self.context = MMVContext(mmv_main = self, depth = ndepth)
 
+        logging.info(f"{depth}{debug_prefix} Creating RandomStreams() class")
+        self.random = RandomStreams(depth = ndepth)
+
         logging.info(f"{depth}{debug_prefix} Creating SkiaNoWindowBackend() class")
         self.skia = SkiaNoWindowBackend()
 
+        logging.info(f"{depth}{debug_prefix} Creating SkiaPaintCache() class")
+        self.paints = SkiaPaintCache()
+
         logging.info(f"{depth}{debug_prefix} Creating Functions() class")
         self.functions = Functions()
 
@@ -98,6 +107,9 @@ class MMVSkiaMain:
         logging.info(f"{depth}{debug_prefix} Creating MMVSkiaCore() class")
         self.core = MMVSkiaCore(mmvskia_main = self, depth = ndepth)
 
+        logging.info(f"{depth}{debug_prefix} Creating MMVSkiaSnapshot() class")
+        self.snapshot = MMVSkiaSnapshot(mmvskia_main = self, depth = ndepth)
+
     # Execute the program
     def run(self, depth = LOG_NO_DEPTH) -> None:
         debug_prefix = "[MMVSkiaMain.run]"
@@ -116,15 +128,22 @@ class MMVSkiaMain:
             # p.dump_stats("res.prof")
         except KeyboardInterrupt:
             self.skia.terminate_glfw()
-            self.ffmpeg.close_pipe()
+            if self.context.realtime_preview:
+                self.preview.finish(depth = ndepth)
+            else:
+                self.ffmpeg.close_pipe()
             sys.exit(-1)
         
         # Say thanks message
         self.mmvskia_interface.top_level_interace.thanks_message()
 
-        # Wait for FFmpeg pipe to stop
-        while not self.ffmpeg.stop_piping:
-            time.sleep(0.05)
+        # Wait for FFmpeg pipe to stop, there's none on realtime previews
+        if not self.context.realtime_preview:
+            while not self.ffmpeg.stop_piping:
+                time.sleep(0.05)
+
+            # Let FFmpeg finish muxing (and reading the decoded audio, if we're feeding it)
+            self.ffmpeg.finish()
 
         logging.info(f"{depth}{debug_prefix} Quitting Python")
         sys.exit(0)
@@ -164,6 +164,9 @@ class MMVSkiaModifierShake:
         self.distance = kwargs["distance"]
         self.mode = kwargs.get("mode", MMVSkiaModifierMode.OFFSET_VALUE)
 
+        # Seeded random stream of this shake
+        self.rng = self.mmv.random.spawn("MMVSkiaModifierShake")
+
         # Start at the center point
         self.interpolation_x.start_value = 0
         self.interpolation_y.start_value = 0
@@ -181,9 +184,9 @@ class MMVSkiaModifierShake:
     # @who: "x", "y" or "both"
     def next_random_point(self, who: str) -> None:
         if who == "x":
-            self.towards_x = random.randint(-self.distance, self.distance)
+            self.towards_x = self.rng.randint(-self.distance, self.distance)
         elif who == "y":
-            self.towards_y = random.randint(-self.distance, self.distance)
+            self.towards_y = self.rng.randint(-self.distance, self.distance)
         elif who == "both":
             self.next_random_point("x")
             self.next_random_point("y")
@@ -274,11 +277,12 @@ class MMVSkiaModifierScalarResize:
         self.mmv = mmv
         self.interpolation = kwargs["interpolation"]
         self.scalar = kwargs["scalar"]
+        self.modulator = kwargs.get("modulator", "average_value")
         self.interpolation.start_value = 1
 
     def next(self) -> None:
         # Change interpolation target with scalar
-        self.interpolation.target_value = 1 + (self.mmv.core.modulators["average_value"] * self.scalar)
+        self.interpolation.target_value = 1 + (self.mmv.core.modulator(self.modulator) * self.scalar)
 
         # Calculate next interpolation and assign to this value
         self.interpolation.next()
@@ -326,12 +330,13 @@ class MMVSkiaModifierGaussianBlur:
         self.interpolation = kwargs["interpolation"]
         self.change_interpolation = kwargs.get("change_interpolation", True)
         self.scalar = kwargs["scalar"]
+        self.modulator = kwargs.get("modulator", "average_value")
         self.interpolation.start_value = 0
     
     def next(self) -> None:
         # Change interpolation target with scalar
         if self.change_interpolation:
-            self.interpolation.target_value = self.mmv.core.modulators["average_value"] * self.scalar
+            self.interpolation.target_value = self.mmv.core.modulator(self.modulator) * self.scalar
 
         # Calculate next interpolation and assign to this value
         self.interpolation.next()
@@ -352,6 +357,7 @@ class MMVSkiaModifierVignetting:
         self.start = kwargs["start"] * self.mmv.context.resolution_ratio_multiplier
         self.scalar = kwargs["scalar"] * self.mmv.context.resolution_ratio_multiplier
         self.minimum = kwargs["minimum"] * self.mmv.context.resolution_ratio_multiplier
+        self.modulator = kwargs.get("modulator", "average_value")
         self.interpolation.start_value = 1
 
         self.center_function_x = kwargs.get("center_x", 
@@ -365,7 +371,7 @@ class MMVSkiaModifierVignetting:
 
     def next(self) -> None:
 
-        towards = self.start + (self.mmv.core.modulators["average_value"] * self.scalar)
+        towards = self.start + (self.mmv.core.modulator(self.modulator) * self.scalar)
 
         if towards < self.minimum:
             towards = self.minimum
@@ -165,19 +165,16 @@ class MMVSkiaMusicBarsVectorial:
             if not channel in list(self.current_fft.keys()):
                 self.current_fft[channel] = np.zeros(fft_size)
 
+            # The number of bins changes with the batch size (adaptive quality), stretch what we have
+            elif not self.current_fft[channel].shape[0] == fft_size:
+                current = self.current_fft[channel]
+                self.current_fft[channel] = np.interp(np.linspace(0, 1, fft_size), np.linspace(0, 1, current.shape[0]), current)
+
             # The interpolation dictionary
             interpolation = self.kwargs["fourier"]["interpolation"]
 
-            # Interpolate the next fft with the current one
-            for index in range(len(self.current_fft[channel])):
-                
-                # Set the corresponding start, target and current value
-                interpolation.start_value = self.current_fft[channel][index]
-                interpolation.target_value = fft[index]
-                interpolation.current_value = self.current_fft[channel][index]
-
-                # Get next value of the FFT
-                self.current_fft[channel][index] = interpolation.next()
+            # Interpolate the next fft with the current one, all bins at once in place
+            interpolation.kernel.step_array(self.current_fft[channel], fft, out = self.current_fft[channel])
 
             # Start a zero fitted fft list
             fitted_fft = np.copy( self.current_fft[channel] )
@@ -186,5 +183,6 @@ class MMVSkiaMusicBarsVectorial:
             fitted_ffts[channel] = np.copy(fitted_fft)
 
         # Call our actual visualizer for drawing directly on the canvas
-        self.builder.build(fitted_ffts, frequencies, self.kwargs, effects)
+        if self.mmv.core.drawing:
+            self.builder.build(fitted_ffts, frequencies, self.kwargs, effects)
   
\ No newline at end of file
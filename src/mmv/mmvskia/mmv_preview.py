@@ -0,0 +1,229 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Realtime preview of a scene, paced by the audio clock, dropping frames when behind
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
+import numpy as np
+import subprocess
+import logging
+import time
+import os
+
+
+# Headless realtime preview, instead of piping every frame to the FFmpeg encoder we
+# render against the audio clock: frames that are late get dropped and the ones on time
+# are written raw into a local sink (a ffplay window, shared memory for some external
+# viewer or nowhere for benchmarking). Use it through MMVSkiaInterface.realtime_preview
+#
+# Dropped frames still advance the scene (audio slicing, FFT, modifiers, interpolations,
+# generators) so the preview never falls behind the render, only the drawing, the canvas
+# readback and the sink write are skipped (see MMVSkiaCore.drawing)
+class MMVSkiaRealtimePreview:
+
+    # Prefix of the shared memory block of the "shm" sink, the block is named prefix_pid so
+    # concurrent previews don't collide (see self.shared_memory_name, it's logged on start).
+    # Layout is a header of four int64 [frame index, width, height, channels] followed by
+    # the raw image bytes
+    SHARED_MEMORY_NAME = "mmv_realtime_preview"
+    SHARED_MEMORY_HEADER = 4
+
+    """
+    kwargs: {
+        "sink": str, "ffplay"
+            Where to send the frames, "ffplay", "shm" (shared memory) or "null"
+        "play_audio": bool, True
+            Play the audio with ffplay, the audio clock starts with it
+        "max_lag_frames": int, 2
+            Drop frames when we're this many frames behind the audio clock
+    }
+    """
+    def __init__(self, mmvskia_main, depth = LOG_NO_DEPTH, **kwargs) -> None:
+        debug_prefix = "[MMVSkiaRealtimePreview.__init__]"
+        ndepth = depth + LOG_NEXT_DEPTH
+        self.mmvskia_main = mmvskia_main
+        self.preludec = self.mmvskia_main.prelude.mmvpreview
+
+        self.sink = kwargs.get("sink", "ffplay")
+        self.play_audio = kwargs.get("play_audio", True)
+        self.max_lag_frames = kwargs.get("max_lag_frames", 2)
+
+        if not self.sink in ["ffplay", "shm", "null"]:
+            raise RuntimeError(f"Unknown realtime preview sink [{self.sink}], expected ffplay, shm or null")
+
+        self.sink_subprocess = None
+        self.audio_subprocess = None
+        self.shared_memory = None
+        self.shared_memory_name = None
+
+        # Stats
+        self.rendered = 0
+        self.dropped = 0
+
+        # Log creation
+        if self.preludec.log_creation:
+            logging.info(f"{depth}{debug_prefix} Created MMVSkiaRealtimePreview() with sink [{self.sink}], play audio [{self.play_audio}], max lag frames [{self.max_lag_frames}]")
+
+    # Open the sink
+    def start(self, width: int, height: int, fps: float, pixel_format: str, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaRealtimePreview.start]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        self.width = width
+        self.height = height
+        self.fps = fps
+
+        # play() restarts it, set here so finish() works even if we never got to play
+        self.start_time = time.time()
+
+        externals_dir = self.mmvskia_main.mmvskia_interface.top_level_interace.externals_dir
+
+        # A ffplay window reading raw frames from stdin
+        if self.sink == "ffplay":
+            ffplay_command = [
+                self.mmvskia_main.utils.get_executable_with_name("ffplay", extra_paths = externals_dir, depth = ndepth),
+                "-loglevel", "panic",
+                "-hide_banner",
+                "-window_title", "MMV Realtime Preview",
+                "-f", "rawvideo",
+                "-pixel_format", pixel_format,
+                "-video_size", f"{width}x{height}",
+                "-framerate", f"{fps}",
+                "-fflags", "nobuffer",
+                "-i", "-",
+            ]
+            logging.info(f"{depth}{debug_prefix} Starting ffplay sink: {ffplay_command}")
+            self.sink_subprocess = subprocess.Popen(ffplay_command, stdin = subprocess.PIPE)
+
+        # Latest frame on a shared memory block, any viewer can attach to it
+        elif self.sink == "shm":
+            from multiprocessing import shared_memory
+
+            size = (MMVSkiaRealtimePreview.SHARED_MEMORY_HEADER * 8) + (width * height * 4)
+            self.shared_memory_name = f"{MMVSkiaRealtimePreview.SHARED_MEMORY_NAME}_{os.getpid()}"
+            logging.info(f"{depth}{debug_prefix} Creating shared memory block [{self.shared_memory_name}] of size [{size}]")
+
+            try:
+                self.shared_memory = shared_memory.SharedMemory(name = self.shared_memory_name, create = True, size = size)
+
+            # Stale block of a crashed render that had our pid, unlink and create it again
+            except FileExistsError:
+                logging.warning(f"{depth}{debug_prefix} Unlinking stale shared memory block [{self.shared_memory_name}]")
+                stale = shared_memory.SharedMemory(name = self.shared_memory_name)
+                stale.close()
+                stale.unlink()
+                self.shared_memory = shared_memory.SharedMemory(name = self.shared_memory_name, create = True, size = size)
+
+            self.shared_header = np.ndarray((MMVSkiaRealtimePreview.SHARED_MEMORY_HEADER,), dtype = np.int64, buffer = self.shared_memory.buf)
+            self.shared_image = np.ndarray((height, width, 4), dtype = np.uint8, buffer = self.shared_memory.buf, offset = MMVSkiaRealtimePreview.SHARED_MEMORY_HEADER * 8)
+            self.shared_header[:] = [-1, width, height, 4]
+
+    # Start playing the audio and the clock, call this right before the first step
+    def play(self, start_time: float = 0, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaRealtimePreview.play]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        externals_dir = self.mmvskia_main.mmvskia_interface.top_level_interace.externals_dir
+
+        # Play the audio, this is the clock we pace the frames against
+        if self.play_audio:
+            ffplay_audio_command = [
+                self.mmvskia_main.utils.get_executable_with_name("ffplay", extra_paths = externals_dir, depth = ndepth),
+                "-loglevel", "panic",
+                "-hide_banner",
+                "-nodisp",
+                "-autoexit",
+                "-ss", f"{start_time}",
+                self.mmvskia_main.context.input_audio_file,
+            ]
+            logging.info(f"{depth}{debug_prefix} Playing audio: {ffplay_audio_command}")
+            self.audio_subprocess = subprocess.Popen(ffplay_audio_command)
+
+        self.start_time = time.time()
+
+    # Seconds of audio played so far
+    def clock(self) -> float:
+        return time.time() - self.start_time
+
+    # Should this step be rendered? Returns False if we're too behind the audio clock and
+    # this frame should be dropped, sleeps if we're ahead of it
+    def should_render(self, step: int) -> bool:
+        debug_prefix = "[MMVSkiaRealtimePreview.should_render]"
+
+        # The step the audio is at right now
+        due = self.clock() * self.fps
+
+        # Too late, drop it
+        if step < due - self.max_lag_frames:
+            self.dropped += 1
+            if self.preludec.log_dropped_frames:
+                logging.debug(f"{debug_prefix} Dropped step [{step}], audio clock is at step [{due:.2f}]")
+            return False
+
+        # Too early, wait for the audio to catch up
+        ahead = (step - due) / self.fps
+        if ahead > 0:
+            time.sleep(ahead)
+
+        self.rendered += 1
+        return True
+
+    # Send one rendered frame to the sink
+    def show(self, step: int, image) -> None:
+        if self.sink == "ffplay":
+            try:
+                self.sink_subprocess.stdin.write(image)
+            except BrokenPipeError:
+                # The user closed the window, keep going without showing frames
+                self.sink = "null"
+
+        elif self.sink == "shm":
+            self.shared_image[:] = image
+            self.shared_header[0] = step
+
+    # Close the sink, stop the audio and log the stats
+    def finish(self, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaRealtimePreview.finish]"
+
+        total = self.rendered + self.dropped
+        logging.info(f"{depth}{debug_prefix} Rendered [{self.rendered}] frames, dropped [{self.dropped}] ({(self.dropped / max(total, 1)) * 100:.2f}%) in [{self.clock():.2f}s]")
+
+        if self.sink_subprocess is not None:
+            try:
+                self.sink_subprocess.stdin.close()
+            except BrokenPipeError:
+                pass
+            self.sink_subprocess.wait()
+            self.sink_subprocess = None
+
+        if self.audio_subprocess is not None:
+            self.audio_subprocess.terminate()
+            self.audio_subprocess = None
+
+        if self.shared_memory is not None:
+            self.shared_memory.close()
+            self.shared_memory.unlink()
+            self.shared_memory = None
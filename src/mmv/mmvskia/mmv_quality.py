@@ -0,0 +1,171 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Adaptive quality governor for draft renders, lowers costly knobs to hold a fps budget
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
+import logging
+import time
+
+
+# Draft renders of long pieces don't need every frame at full quality, we render at a
+# fraction of the final resolution (FFmpeg upscales it back when encoding) and watch the
+# render speed: when it falls under the target fps budget we lower the next knob on the
+# LEVELS list, when we're well above it we give the last lowered one back.
+#
+# The resolution is decided once before configuring the objects (the raw pipe can't change
+# its frame size mid video), the knobs changing at runtime are the cheap ones to toggle:
+# blur filters, particle density and the FFT batch size. Use it through
+# MMVSkiaInterface.adaptive_quality
+class MMVSkiaQualityGovernor:
+
+    # Knobs lowered in this order, each level applies itself and every level before it
+    LEVELS = [
+        ("blur", False),
+        ("particle_density", 0.5),
+        ("batch_size_divisor", 2),
+        ("particle_density", 0.25),
+        ("batch_size_divisor", 4),
+    ]
+
+    """
+    kwargs: {
+        "target_fps": float, 30
+            Render speed budget, frames rendered per second of wall clock
+        "check_every": int, 60
+            Measure the render speed every this many frames
+        "hysteresis": float, 1.25
+            Only raise the quality back when rendering this many times faster than the target
+        "min_batch_size": int, 512
+            Never reduce the FFT batch size below this
+    }
+    """
+    def __init__(self, mmvskia_main, scale: float, depth = LOG_NO_DEPTH, **kwargs) -> None:
+        debug_prefix = "[MMVSkiaQualityGovernor.__init__]"
+        self.mmvskia_main = mmvskia_main
+        self.scale = scale
+
+        self.target_fps = kwargs.get("target_fps", 30)
+        self.check_every = kwargs.get("check_every", 60)
+        self.hysteresis = kwargs.get("hysteresis", 1.25)
+        self.min_batch_size = kwargs.get("min_batch_size", 512)
+
+        # Full quality batch size, the divisor knob is applied on top of it
+        self.base_batch_size = self.mmvskia_main.context.batch_size
+
+        # Knobs at full quality
+        self.level = 0
+        self.blur = True
+        self.particle_density = 1
+        self.batch_size_divisor = 1
+
+        # FFT magnitudes grow with the batch size, multiply by this to keep the bars the same height
+        self.fft_gain = 1
+
+        # Measuring window
+        self.window_start = None
+        self.window_frames = 0
+
+        # Every level change as (frame index, old level, new level, measured fps)
+        self.changes = []
+        self.lowest_level = 0
+
+        logging.info(f"{depth}{debug_prefix} Resolution scale [{self.scale}], target [{self.target_fps}] fps checking every [{self.check_every}] frames, kwargs: {kwargs}")
+
+    # Set every knob to what this level says
+    def apply_level(self, level: int) -> None:
+        self.level = level
+        self.blur = True
+        self.particle_density = 1
+        self.batch_size_divisor = 1
+
+        for name, value in self.LEVELS[:level]:
+            setattr(self, name, value)
+
+        # The audio slicing reads the batch size from the context every step
+        batch_size = max(self.min_batch_size, self.base_batch_size // self.batch_size_divisor)
+        self.mmvskia_main.context.batch_size = batch_size
+        self.fft_gain = self.base_batch_size / batch_size
+
+    # Call once per rendered frame, changes the level when a measuring window is complete
+    def tick(self, frame_index: int, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaQualityGovernor.tick]"
+
+        # First frame only starts the clock, it pays for warming up caches
+        if self.window_start is None:
+            self.window_start = time.perf_counter()
+            return
+
+        self.window_frames += 1
+        if self.window_frames < self.check_every:
+            return
+
+        fps = self.window_frames / max(time.perf_counter() - self.window_start, 1e-9)
+        level = self.level
+
+        # Too slow, lower the next knob. Fast enough with room to spare, give one back
+        if (fps < self.target_fps) and (level < len(self.LEVELS)):
+            level += 1
+        elif (fps > self.target_fps * self.hysteresis) and (level > 0):
+            level -= 1
+
+        if not level == self.level:
+            logging.info(f"{depth}{debug_prefix} Frame [{frame_index}] rendering at [{fps:.2f}] fps, quality level [{self.level}] -> [{level}]")
+            self.changes.append((frame_index, self.level, level, round(fps, 2)))
+            self.apply_level(level)
+            self.lowest_level = max(self.lowest_level, level)
+
+        # Start a new window
+        self.window_start = time.perf_counter()
+        self.window_frames = 0
+
+    # Which knobs were lowered at some point of the render, as a dictionary, and log it
+    def report(self, depth = LOG_NO_DEPTH) -> dict:
+        debug_prefix = "[MMVSkiaQualityGovernor.report]"
+        ndepth = depth + LOG_NEXT_DEPTH
+
+        lowered = {}
+        for name, value in self.LEVELS[:self.lowest_level]:
+            lowered[name] = value
+
+        report = {
+            "scale": self.scale,
+            "render_resolution": [self.mmvskia_main.context.width, self.mmvskia_main.context.height],
+            "output_resolution": [self.mmvskia_main.context.output_width, self.mmvskia_main.context.output_height],
+            "lowered": lowered,
+            "final_level": self.level,
+            "changes": self.changes,
+        }
+
+        logging.info(f"{depth}{debug_prefix} Rendered at [{report['render_resolution']}] upscaled to [{report['output_resolution']}]")
+        if lowered:
+            logging.info(f"{depth}{debug_prefix} Knobs lowered to hold [{self.target_fps}] fps: {lowered}, final level [{self.level}] after [{len(self.changes)}] changes")
+            for frame_index, old, new, fps in self.changes:
+                logging.info(f"{ndepth}{debug_prefix} Frame [{frame_index}] at [{fps}] fps: level [{old}] -> [{new}]")
+        else:
+            logging.info(f"{depth}{debug_prefix} Held [{self.target_fps}] fps without lowering any knob")
+
+        return report
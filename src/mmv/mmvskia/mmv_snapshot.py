@@ -0,0 +1,181 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Snapshot and restore the state of a scene so rendering can resume at any frame
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+from mmv.common.cmn_constants import LOG_NEXT_DEPTH, LOG_NO_DEPTH
+import logging
+import pickle
+import random
+import skia
+import zlib
+import io
+import os
+
+
+# Pickler that doesn't serialize the shared MMVSkiaMain services (every object holds a
+# reference to them) but a name we resolve back to the running ones when restoring.
+# Skia objects can't be pickled: images are encoded as PNG, colors as tuples and the rest
+# (paints, filters, shaders) are dropped, objects make them again on first use
+class MMVSkiaSnapshotPickler(pickle.Pickler):
+    def __init__(self, file, shared: dict) -> None:
+        super().__init__(file, protocol = pickle.HIGHEST_PROTOCOL)
+        self.shared_ids = {id(obj): name for name, obj in shared.items()}
+
+    def persistent_id(self, obj):
+        name = self.shared_ids.get(id(obj), None)
+        if name is not None:
+            return ("shared", name)
+
+        if type(obj).__module__ == "skia":
+            if isinstance(obj, skia.Image):
+                return ("skia.Image", bytes(obj.encodeToData()))
+            if isinstance(obj, skia.Color4f):
+                return ("skia.Color4f", (obj.fR, obj.fG, obj.fB, obj.fA))
+            return ("skia.dropped", type(obj).__name__)
+
+        return None
+
+
+class MMVSkiaSnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, shared: dict) -> None:
+        super().__init__(file)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        kind, value = pid
+
+        if kind == "shared":
+            return self.shared[value]
+        if kind == "skia.Image":
+            return skia.Image.MakeFromEncoded(skia.Data.MakeWithCopy(value))
+        if kind == "skia.Color4f":
+            return skia.Color4f(*value)
+        if kind == "skia.dropped":
+            return None
+
+        raise pickle.UnpicklingError(f"Unknown persistent id kind [{kind}]")
+
+
+# Serializes every animation, modifier, interpolation, generator and random stream state
+# into a compressed binary blob and restores it, so we can resume rendering at the step
+# it was taken. Restore on the same scene (same script and configuration) it came from
+class MMVSkiaSnapshot:
+
+    # Blob format version, bump when the layout changes
+    VERSION = 1
+
+    # MMVSkiaMain attributes shared by the objects, stored by name
+    SHARED = [
+        "context", "skia", "functions", "interpolation", "polar_coordinates", "fourier",
+        "ffmpeg", "audio", "audio_processing", "mmv_animation", "core", "utils", "paints",
+    ]
+
+    def __init__(self, mmvskia_main, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaSnapshot.__init__]"
+        self.mmvskia_main = mmvskia_main
+
+    # Name -> object of the shared services
+    def shared(self) -> dict:
+        shared = {"mmvskia_main": self.mmvskia_main}
+        for name in MMVSkiaSnapshot.SHARED:
+            if hasattr(self.mmvskia_main, name):
+                shared[name] = getattr(self.mmvskia_main, name)
+        return shared
+
+    # Snapshot the scene as it is before rendering some step
+    def snapshot(self, step: int, depth = LOG_NO_DEPTH) -> bytes:
+        debug_prefix = "[MMVSkiaSnapshot.snapshot]"
+
+        payload = {
+            "version": MMVSkiaSnapshot.VERSION,
+            "step": step,
+            "content": self.mmvskia_main.mmv_animation.content,
+            "generators": self.mmvskia_main.mmv_animation.generators,
+            "canvas": self.mmvskia_main.canvas,
+            "random": self.mmvskia_main.random,
+            "python_random": random.getstate(),
+        }
+
+        buffer = io.BytesIO()
+        MMVSkiaSnapshotPickler(buffer, shared = self.shared()).dump(payload)
+        blob = zlib.compress(buffer.getvalue())
+
+        logging.info(f"{depth}{debug_prefix} Snapshot of step [{step}] is [{len(blob)}] bytes")
+        return blob
+
+    # Restore a blob, returns the step we should continue rendering from
+    def restore(self, blob: bytes, depth = LOG_NO_DEPTH) -> int:
+        debug_prefix = "[MMVSkiaSnapshot.restore]"
+
+        payload = MMVSkiaSnapshotUnpickler(io.BytesIO(zlib.decompress(blob)), shared = self.shared()).load()
+
+        if not payload["version"] == MMVSkiaSnapshot.VERSION:
+            raise RuntimeError(f"Snapshot version [{payload['version']}] doesn't match ours [{MMVSkiaSnapshot.VERSION}]")
+
+        self.mmvskia_main.mmv_animation.content = payload["content"]
+        self.mmvskia_main.mmv_animation.rebuild_layer_order()
+        self.mmvskia_main.mmv_animation.generators = payload["generators"]
+        self.mmvskia_main.canvas = payload["canvas"]
+        self.mmvskia_main.random = payload["random"]
+        random.setstate(payload["python_random"])
+
+        logging.info(f"{depth}{debug_prefix} Restored snapshot of step [{payload['step']}]")
+        return payload["step"]
+
+    # Snapshot and load back without applying it, raises early (before rendering for a while
+    # until the first snapshot) if something on the scene can't go through a round trip
+    def check(self, step: int, depth = LOG_NO_DEPTH) -> None:
+        debug_prefix = "[MMVSkiaSnapshot.check]"
+
+        try:
+            blob = self.snapshot(step, depth = depth)
+            payload = MMVSkiaSnapshotUnpickler(io.BytesIO(zlib.decompress(blob)), shared = self.shared()).load()
+        except Exception as error:
+            raise RuntimeError(f"Scene can't be snapshotted, disable snapshot_every or fix: {error!r}") from error
+
+        if not len(payload["content"]) == len(self.mmvskia_main.mmv_animation.content):
+            raise RuntimeError(f"Snapshot round trip lost layers of the scene")
+
+        logging.info(f"{depth}{debug_prefix} Snapshot round trip of the scene is fine")
+
+    # File name of the snapshot of some step on a directory
+    def path_of_step(self, directory: str, step: int) -> str:
+        return os.path.join(directory, f"step_{step:08d}.mmvsnap")
+
+    # Snapshot to a file
+    def save(self, path: str, step: int, depth = LOG_NO_DEPTH) -> None:
+        blob = self.snapshot(step, depth = depth)
+        with open(path + ".tmp", "wb") as snapshot_file:
+            snapshot_file.write(blob)
+
+        # Don't leave half written snapshots if we're interrupted
+        os.replace(path + ".tmp", path)
+
+    # Restore from a file, returns the step to continue from
+    def load(self, path: str, depth = LOG_NO_DEPTH) -> int:
+        with open(path, "rb") as snapshot_file:
+            return self.restore(snapshot_file.read(), depth = depth)
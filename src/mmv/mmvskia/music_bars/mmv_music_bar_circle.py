@@ -106,6 +106,18 @@ class MMVSkiaMusicBarsCircle:
         else:
             raise RuntimeError(debug_prefix, f"Invalid color preset: [{self.color_preset}]")
 
+        # The colorful bars change color every frame, each bar keeps a paint we mutate
+        self.bar_paints = {"l": [], "r": []}
+
+    # The paint of this channel's bar index, made on first use (or after a snapshot restore)
+    def bar_paint(self, channel: str, index: int):
+        paints = self.bar_paints[channel]
+        while len(paints) <= index:
+            paints.append(None)
+        if paints[index] is None:
+            paints[index] = self.mmv.paints.mutable_paint(style = "stroke")
+        return paints[index]
+
     # Construct and blit to the Skia Canvas
     def build(self, fitted_ffts: dict, frequencies: list, config: dict, effects):
         debug_prefix = "[MMVSkiaMusicBarsCircle.build]"
@@ -205,38 +217,22 @@ class MMVSkiaMusicBarsCircle:
                     if self.color_rotates:
                         color_shift_on_angle += (self.mmv.core.this_step / self.color_rotate_speed)
 
-                    # Define the color of the bars
-                    colors = [
-                        abs( math.sin((color_shift_on_angle / 2)) ),
-                        abs( math.sin((color_shift_on_angle + ((1/3)*2*math.pi)) / 2) ),
-                        abs( math.sin((color_shift_on_angle + ((2/3)*2*math.pi)) / 2) ),
-                    ] + [0.89] # not full opacity
-
-                    # Make a skia color with the colors list as argument
-                    color = skia.Color4f(*colors)
-
-                    # Make the skia Paint and
-                    this_bar_paint = skia.Paint(
-                        AntiAlias = True,
-                        Color = color,
-                        Style = skia.Paint.kStroke_Style,
-                        StrokeWidth = 8 * self.mmv.context.resolution_ratio_multiplier + bigger_bars_on_magnitude,
+                    # Define the color of the bars, 8 bit ARGB, not full opacity
+                    this_bar_paint = self.bar_paint(channel, index)
+                    this_bar_paint.setARGB(
+                        227,
+                        int(255 * abs( math.sin((color_shift_on_angle / 2)) )),
+                        int(255 * abs( math.sin((color_shift_on_angle + ((1/3)*2*math.pi)) / 2) )),
+                        int(255 * abs( math.sin((color_shift_on_angle + ((2/3)*2*math.pi)) / 2) )),
                     )
+                    this_bar_paint.setStrokeWidth(8 * self.mmv.context.resolution_ratio_multiplier + bigger_bars_on_magnitude)
 
                 if self.color_preset == "white":
 
-                    # Define the color of the bars
-                    colors = [1.0, 1.0, 1.0, 0.89]
-
-                    # Make a skia color with the colors list as argument
-                    color = skia.Color4f(*colors)
-
-                    # Make the skia Paint and
-                    this_bar_paint = skia.Paint(
-                        AntiAlias = True,
-                        Color = color,
-                        Style = skia.Paint.kStroke_Style,
-                        StrokeWidth = 8 * self.mmv.context.resolution_ratio_multiplier + bigger_bars_on_magnitude,
+                    # Define the color of the bars, shared paint
+                    this_bar_paint = self.mmv.paints.stroke(
+                        color = (1.0, 1.0, 1.0, 0.89),
+                        width = 8 * self.mmv.context.resolution_ratio_multiplier + bigger_bars_on_magnitude,
                     )
 
                 # Store it on a list do draw in the end
@@ -199,11 +199,9 @@ class MMVSkiaPianoRollTopDown:
     def draw_markers(self):
 
         # The paint of markers in between white keys
-        white_white_paint = skia.Paint(
-            AntiAlias = True,
-            Color = skia.Color4f(*self.global_colors["marker_color_between_two_white"], 1),
-            Style = skia.Paint.kStroke_Style,
-            StrokeWidth = 1,
+        white_white_paint = self.mmvskia_main.paints.stroke(
+            color = list(self.global_colors["marker_color_between_two_white"]) + [1],
+            width = 1,
         )
 
         current_center = 0
@@ -239,32 +237,20 @@ class MMVSkiaPianoRollTopDown:
         # Is a sharp key
         if "#" in name:
             width = self.semitone_width*0.9
-            color = skia.Color4f(*note_colors["sharp"], 1)
+            color = list(note_colors["sharp"]) + [1]
 
         # Plain key
         else:
             width = self.tone_width*0.6
-            color = skia.Color4f(*note_colors["plain"], 1)
-
-        # Make the skia Paint
-        note_paint = skia.Paint(
-            AntiAlias = True,
-            Color = color,
-            Style = skia.Paint.kFill_Style,
-            # Shader=skia.GradientShader.MakeLinear(
-            #     points=[(0.0, 0.0), (self.mmvskia_main.context.width, self.mmvskia_main.context.height)],
-            #     colors=[skia.Color4f(0, 0, 1, 1), skia.Color4f(0, 1, 0, 1)]),
-            StrokeWidth = 2,
-        )
+            color = list(note_colors["plain"]) + [1]
+
+        # Get the (shared) skia Paint
+        note_paint = self.mmvskia_main.paints.fill(color = color)
 
         # Border of the note
-        note_border_paint = skia.Paint(
-            AntiAlias = True,
-            Color = skia.Color4f(*note_colors["border"], 1),
-            Style = skia.Paint.kStroke_Style,
-            # ImageFilter=skia.ImageFilters.DropShadow(3, 3, 5, 5, skia.ColorBLUE),
-            # MaskFilter=skia.MaskFilter.MakeBlur(skia.kNormal_BlurStyle, 2.0),
-            StrokeWidth = max(self.mmvskia_main.context.resolution_ratio_multiplier * 2, 1),
+        note_border_paint = self.mmvskia_main.paints.stroke(
+            color = list(note_colors["border"]) + [1],
+            width = max(self.mmvskia_main.context.resolution_ratio_multiplier * 2, 1),
         )
         
         # Horizontal we have it based on the tones and semitones we calculated previously
@@ -472,21 +458,11 @@ class PianoKey:
         # Get the color based on if the note is active or not
         color = self.color_active if self.active else self.color_idle
 
-        # Make the skia Paint and
-        key_paint = skia.Paint(
-            AntiAlias = True,
-            Color = color,
-            Style = skia.Paint.kFill_Style,
-            StrokeWidth = 2,
-        )
+        # Get the (shared) skia Paints
+        key_paint = self.mmvskia_main.paints.fill(color = color)
 
         # The border of the key
-        key_border = skia.Paint(
-            AntiAlias = True,
-            Color = skia.Color4f(0, 0, 0, 1),
-            Style = skia.Paint.kStroke_Style,
-            StrokeWidth = 2,
-        )
+        key_border = self.mmvskia_main.paints.stroke(color = (0, 0, 0, 1), width = 2)
 
         # Rectangle border
         rect = skia.Rect(*coords)
@@ -508,12 +484,7 @@ class PianoKey:
             return
 
         # The marker paint
-        marker = skia.Paint(
-            AntiAlias = True,
-            Color = color,
-            Style = skia.Paint.kFill_Style,
-            # StrokeWidth = 2,
-        )
+        marker = self.mmvskia_main.paints.fill(color = color)
 
         # Draw through the entire vertical space of the screen
         rect = skia.Rect(
@@ -72,19 +72,10 @@ class MMVSkiaProgressionBarRectangle:
         if self.config["position"] == "top":
             offset_by_amplitude *= (-1)
 
-        # White full opacity color
-        colors = [1, 1, 1, 1]
-
-        # Make a skia color with the colors list as argument
-        color = skia.Color4f(*colors)
-
-        # Make the skia Paint and
-        paint = skia.Paint(
-            AntiAlias = True,
-            Color = color,
-            Style = skia.Paint.kStroke_Style,
-            StrokeWidth = 10 * resolution_ratio_multiplier, # + (magnitude/4),
-            # ImageFilter=skia.ImageFilters.DropShadow(3, 3, 5, 5, skia.ColorWHITE),
+        # White full opacity (shared) paint
+        paint = self.mmv.paints.stroke(
+            color = (1, 1, 1, 1),
+            width = 10 * resolution_ratio_multiplier, # + (magnitude/4),
         )
 
         # The direction we're walking centered at origin, $\vec{AB} = A - B$
@@ -104,18 +95,8 @@ class MMVSkiaProgressionBarRectangle:
             # Distance away from s
             distance = 9 * resolution_ratio_multiplier
 
-            colors = [1, 1, 1, 0.7]
-
-            # Make a skia color with the colors list as argument
-            color = skia.Color4f(*colors)
-
-            # Make the skia Paint and
-            paint = skia.Paint(
-                AntiAlias = True,
-                Color = color,
-                Style = skia.Paint.kStroke_Style,
-                StrokeWidth = 2,
-            )
+            # A bit transparent white (shared) paint
+            paint = self.mmv.paints.stroke(color = (1, 1, 1, 0.7), width = 2)
 
             # Rectangle border
             border = skia.Rect(
@@ -27,12 +27,213 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 ===============================================================================
 """
 
+from mmv.common.cmn_random import RandomStreams
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from PIL import Image
 import numpy as np
-import random
+import hashlib
+import json
+import os
 import skia
 
 
+# Bump when the drawing changes so cached images are generated again
+ALGORITHM_VERSION = 2
+
+# File names of each mode, formatted with the image index and extension
+FILENAMES = {
+    "particles": "particle-{index}.{extension}",
+    "polygons": "img{index}.{extension}",
+}
+
+
+# Draw one particle on a transparent canvas
+def draw_particle(surface, canvas, width, height, rng):
+
+    # Reset canvas to transparent
+    canvas.clear(skia.ColorTRANSPARENT)
+
+    # How much nodes of gradients in this particle
+    npoints = rng.randint(1, 6)
+
+    # Random scalars for each node, plus ending at zero
+    scalars = [rng.uniform(0.2, 1) for _ in range(npoints)] + [0]
+
+    # Colors list
+    colors = []
+
+    # Iterate in decreasing order
+    for scalar in reversed(sorted(scalars)):
+        colors.append(skia.Color4f(1, 1, 1, scalar))
+    
+    # Create the skia paint with a circle at the center that ends on the edge
+    paint = skia.Paint(
+        Shader = skia.GradientShader.MakeRadial(
+            center = (width/2, height/2),
+            radius = width/2,
+            colors = colors,
+        )
+    )
+
+    # Draw the particles
+    canvas.drawPaint(paint)
+
+
+# Draw one low poly background
+def draw_polygons(surface, canvas, width, height, rng):
+    
+    BASE_GRADIENT_LINEAR = True
+    MUTATION = True
+    LOW_POLY = True
+    RANDOM = True
+    GREYSCALE = False
+
+    if BASE_GRADIENT_LINEAR:
+
+        if RANDOM:
+            color1 = skia.Color4f(rng.uniform(0, 1), rng.uniform(0, 1), rng.uniform(0, 1), 1)
+            color2 = skia.Color4f(rng.uniform(0, 1), rng.uniform(0, 1), rng.uniform(0, 1), 1)
+        
+        if GREYSCALE:
+            gradient1, gradient2 = rng.uniform(0, 1), rng.uniform(0, 1)
+            color1 = skia.Color4f(gradient1, gradient1, gradient1, 1)
+            color2 = skia.Color4f(gradient2, gradient2, gradient2, 1)
+
+        paint = skia.Paint(
+            Shader = skia.GradientShader.MakeLinear(
+                points = [
+                    (rng.randint(-width/2, 0), rng.randint(-height/2, 0)),
+                    (width + rng.randint(0, width/2), height + rng.randint(0, height/2)) ],
+                colors = [color1, color2]
+            )
+        )
+        canvas.drawPaint(paint)
+        colors = surface.toarray()
+    
+
+    if LOW_POLY:
+        break_x = 20
+        break_y = 15
+
+        rectangle_widths = np.linspace(-width/4, 1.25*width, num = break_x)
+        rectangle_heights = np.linspace(-height/4, 1.25*height, num = break_y)
+
+        rectangle_width = width / break_x
+        rectangle_height = height / break_y
+
+        xx, yy = np.meshgrid(rectangle_widths, rectangle_heights)
+
+        pairs = list(np.dstack([xx, yy]).reshape(-1, 2))
+
+        if MUTATION:
+            for index in range(len(pairs)):
+                pairs[index][0] = pairs[index][0] + rng.uniform(0, rectangle_width)
+                pairs[index][1] = pairs[index][1] + rng.uniform(0, rectangle_height)
+
+        rectangle_points = []
+
+        for index, point in enumerate(list(pairs)):
+            samerow = not ((index + 1) % break_x == 0)
+            try:
+                # If they are on the same height
+                if samerow:
+                    rectangle_points.append([
+                        list(pairs[index]),
+                        list(pairs[index + break_x]),
+                        list(pairs[index + break_x + 1]),
+                        list(pairs[index + 1]),
+                    ])   
+            except IndexError:
+                pass
+        
+        
+        for rectangle in rectangle_points:
+            average_x = int(sum([val[0] for val in rectangle]) / 4)
+            average_y = int(sum([val[1] for val in rectangle]) / 4)
+
+            rectangle_color = colors[min(max(average_y, 0), height - 1)][min(max(average_x, 0), width - 1)]
+            rectangle_color_fill = [x/255 for x in rectangle_color]
+            rectangle_color_border = [x/255 - 0.05 for x in rectangle_color]
+
+            # Make a skia color with the colors list as argument
+            color = skia.Color4f(*rectangle_color_fill)
+
+            # Make the skia Paint and
+            paint = skia.Paint(
+                AntiAlias = True,
+                Color = color,
+                Style = skia.Paint.kFill_Style,
+                StrokeWidth = 2,
+            )
+
+            color = skia.Color4f(*rectangle_color_border)
+
+            border = skia.Paint(
+                AntiAlias = True,
+                Color = color,
+                Style = skia.Paint.kStroke_Style,
+                StrokeWidth = 1,
+                # ImageFilter=skia.ImageFilters.DropShadow(3, 3, 5, 5, color)
+            )
+
+            path = skia.Path()
+            path.moveTo(*rectangle[0])
+
+            rectangle.append(rectangle[0])
+
+            for point in rectangle:
+                path.lineTo(*point)
+
+            canvas.drawPath(path, paint)
+            canvas.drawPath(path, border)
+
+
+DRAW = {
+    "particles": draw_particle,
+    "polygons": draw_polygons,
+}
+
+
+# Encode and save one image, runs on the I/O threads. Backgrounds have no alpha
+def save_image(array, path, mode, extension):
+    img = Image.fromarray(array)
+
+    if mode == "polygons":
+        img = img.convert("RGB")
+
+    if extension == "webp":
+        img.save(path, lossless = True)
+    else:
+        img.save(path, quality = 100)
+
+
+# Generate some image indices on this process' own raster surface, encoding on io_workers
+# threads while the next image is drawn. Every image has its own random stream from the
+# seed and its index so the output doesn't depend on how images are split across workers
+def generate_images(mode, width, height, seed, indices, output_dir, extension, io_workers = 2, surface = None):
+    if surface is None:
+        surface = skia.Surface.MakeRasterN32Premul(width, height)
+
+    streams = RandomStreams(seed)
+    paths = []
+
+    with surface as canvas, ThreadPoolExecutor(max_workers = io_workers) as io:
+        saving = []
+        for index in indices:
+            DRAW[mode](surface, canvas, width, height, streams.stream(f"PyGradienter:{mode}:{index}"))
+            path = os.path.join(output_dir, FILENAMES[mode].format(index = index, extension = extension))
+
+            # toarray copies the pixels so the surface is free for the next image
+            saving.append(io.submit(save_image, surface.toarray(), path, mode, extension))
+            paths.append(path)
+
+        # Raise any encoding errors
+        for future in saving:
+            future.result()
+
+    return paths
+
+
 class PyGradienter:
     def __init__(self, mmv, **kwargs):
         self.mmv = mmv
@@ -50,195 +251,91 @@ class PyGradienter:
         self.output_dir = kwargs["output_dir"]
         self.mmv.utils.mkdir_dne(self.output_dir)
 
-        # Skia / canvas we'll draw to
-        self.skia = kwargs["skia"]
-        self.canvas = self.skia.canvas
+        # Skia / canvas we'll draw to when generating on this process only, optional
+        self.skia = kwargs.get("skia", None)
 
         self.mode = kwargs.get("mode", "particles")
 
-    def run(self):
-        if self.mode == "polygons":
-            self.polygons()
-        elif self.mode == "particles":
-            self.particles()
-
-    # Generates particles for MMV
-    def particles(self):
-        
-        print(f"Saving generated particle N=[", end="", flush=True)
-        
-        # Repeat for N images
-        for i in range(self.n_images):
-
-            # Reset canvas to transparent
-            self.skia.reset_canvas()
+        # Images are a function of the seed, defaults to the scene seed so a fixed
+        # random_seed reuses the images generated on the previous render
+        self.seed = kwargs.get("seed", None)
+        if self.seed is None:
+            self.seed = self.mmv.random.seed
 
-            # How much nodes of gradients in this particle
-            npoints = random.randint(1, 6)
+        # Worker processes each drawing on its own raster surface and the threads
+        # per worker encoding the images, "png", "webp" or "jpg" (backgrounds only)
+        self.workers = kwargs.get("workers", os.cpu_count() or 1)
+        self.io_workers = kwargs.get("io_workers", 2)
+        self.image_format = kwargs.get("image_format", "png" if self.mode == "particles" else "jpg")
 
-            # Random scalars for each node, plus ending at zero
-            scalars = [random.uniform(0.2, 1) for _ in range(npoints)] + [0]
+        # Skip generating if the output dir already has these exact images
+        self.cache = kwargs.get("cache", True)
 
-            # Colors list
-            colors = []
+    # Hex key of everything the generated images depend on
+    def cache_key(self):
+        settings = [ALGORITHM_VERSION, self.mode, self.width, self.height, self.seed, self.n_images, self.image_format]
+        return hashlib.sha256(json.dumps(settings).encode()).hexdigest()
 
-            # Iterate in decreasing order
-            for scalar in reversed(sorted(scalars)):
-                colors.append(skia.Color4f(1, 1, 1, scalar))
-            
-            # Create the skia paint with a circle at the center that ends on the edge
-            paint = skia.Paint(
-                Shader = skia.GradientShader.MakeRadial(
-                    center = (self.width/2, self.height/2),
-                    radius = self.width/2,
-                    colors = colors,
-                )
+    def run(self):
+        debug_prefix = "[PyGradienter.run]"
+
+        if not self.mode in DRAW.keys():
+            raise RuntimeError(f"Unknown PyGradienter mode [{self.mode}]")
+
+        manifest_path = os.path.join(self.output_dir, ".pygradienter.json")
+        key = self.cache_key()
+        paths = [os.path.join(self.output_dir, FILENAMES[self.mode].format(index = index, extension = self.image_format)) for index in range(self.n_images)]
+
+        # Same settings and seed generated before and nothing was deleted
+        if self.cache and os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            if (manifest.get("key") == key) and all(os.path.exists(path) for path in paths):
+                print(debug_prefix, f"Reusing [{self.n_images}] cached {self.mode} images on [{self.output_dir}], seed [{self.seed}]")
+                return paths
+
+        # Remove images of a previous run so the directory only has this seed's images
+        prefix = FILENAMES[self.mode].split("{")[0]
+        for name in os.listdir(self.output_dir):
+            if name.startswith(prefix) or (name == ".pygradienter.json"):
+                os.remove(os.path.join(self.output_dir, name))
+
+        indices = list(range(self.n_images))
+        workers = max(1, min(self.workers, self.n_images))
+
+        print(debug_prefix, f"Generating [{self.n_images}] {self.mode} images with seed [{self.seed}] on [{workers}] workers")
+
+        # Single worker draws here, on the given canvas if any
+        if workers == 1:
+            generate_images(
+                self.mode, self.width, self.height, self.seed, indices, self.output_dir, self.image_format,
+                io_workers = self.io_workers,
+                surface = self.skia.surface if self.skia is not None else None,
             )
+        else:
+            # Interleaved chunks so workers get similar amounts of work
+            chunks = [indices[worker::workers] for worker in range(workers)]
 
-            # Draw the particles
-            self.canvas.drawPaint(paint)
+            with ProcessPoolExecutor(max_workers = workers) as pool:
+                futures = [
+                    pool.submit(generate_images, self.mode, self.width, self.height, self.seed, chunk, self.output_dir, self.image_format, self.io_workers)
+                    for chunk in chunks
+                ]
+                for future in futures:
+                    future.result()
 
-            # # Save the image
+        # Write the manifest last, an interrupted generation is never reused
+        with open(manifest_path, "w") as f:
+            json.dump({"key": key, "seed": self.seed, "mode": self.mode, "n_images": self.n_images}, f)
 
-            # Get the PIL image from the array of the canvas
-            img = Image.fromarray(self.skia.canvas_array())
+        print(debug_prefix, f"Saved [{self.n_images}] {self.mode} images to [{self.output_dir}]")
+        return paths
 
-            # Pretty print
-            if not i == self.n_images - 1:
-                print(f"{i}, ", end = "", flush = True)   
-            else:
-                print(f"{i}]")
-
-            # Save the particle to the output dir
-            img.save(self.output_dir + f"/particle-{i}.png", quality = 100)
+    # Generates particles for MMV
+    def particles(self):
+        self.mode = "particles"
+        return self.run()
 
     def polygons(self):
-
-        print(f"Saving generated polygons background N=[", end="", flush=True)
-        
-        BASE_GRADIENT_LINEAR = True
-        MUTATION = True
-        LOW_POLY = True
-        RANDOM = True
-        GREYSCALE = False
-
-        for i in range(self.n_images):
-
-            if BASE_GRADIENT_LINEAR:
-
-                if RANDOM:
-                    color1 = skia.Color4f(random.uniform(0, 1), random.uniform(0, 1), random.uniform(0, 1), 1)
-                    color2 = skia.Color4f(random.uniform(0, 1), random.uniform(0, 1), random.uniform(0, 1), 1)
-                
-                if GREYSCALE:
-                    gradient1, gradient2 = random.uniform(0, 1), random.uniform(0, 1)
-                    color1 = skia.Color4f(gradient1, gradient1, gradient1, 1)
-                    color2 = skia.Color4f(gradient2, gradient2, gradient2, 1)
-
-                paint = skia.Paint(
-                    Shader = skia.GradientShader.MakeLinear(
-                        points = [
-                            (random.randint(-self.width/2, 0), random.randint(-self.height/2, 0)),
-                            (self.width + random.randint(0, self.width/2), self.height + random.randint(0, self.height/2)) ],
-                        colors = [color1, color2]
-                    )
-                )
-                self.canvas.drawPaint(paint)
-                colors = self.skia.canvas_array()
-            
-
-            if LOW_POLY:
-                break_x = 20
-                break_y = 15
-
-                rectangle_widths = np.linspace(-self.width/4, 1.25*self.width, num = break_x)
-                rectangle_heights = np.linspace(-self.height/4, 1.25*self.height, num = break_y)
-
-                rectangle_width = self.width / break_x
-                rectangle_height = self.height / break_y
-
-                xx, yy = np.meshgrid(rectangle_widths, rectangle_heights)
-
-                pairs = list(np.dstack([xx, yy]).reshape(-1, 2))
-
-                if MUTATION:
-                    for index in range(len(pairs)):
-                        pairs[index][0] = pairs[index][0] + random.uniform(0, rectangle_width)
-                        pairs[index][1] = pairs[index][1] + random.uniform(0, rectangle_height)
-                
-                # print(pairs)
-
-                rectangle_points = []
-
-                for index, point in enumerate(list(pairs)):
-                    samerow = not ((index + 1) % break_x == 0)
-                    # print(pairs[index], index, samerow)
-                    try:
-                        # If they are on the same height
-                        if samerow:
-                            rectangle_points.append([
-                                list(pairs[index]),
-                                list(pairs[index + break_x]),
-                                list(pairs[index + break_x + 1]),
-                                list(pairs[index + 1]),
-                            ])   
-                    except IndexError:
-                        pass
-                
-                
-                for rectangle in rectangle_points:
-                    average_x = int(sum([val[0] for val in rectangle]) / 4)
-                    average_y = int(sum([val[1] for val in rectangle]) / 4)
-
-                    # print(rectangle, average_x, average_y)
-
-                    rectangle_color = colors[min(max(average_y, 0), self.height - 1)][min(max(average_x, 0), self.width - 1)]
-                    rectangle_color_fill = [x/255 for x in rectangle_color]
-                    rectangle_color_border = [x/255 - 0.05 for x in rectangle_color]
-
-                    # print(rectangle_color)
-
-                    # Make a skia color with the colors list as argument
-                    color = skia.Color4f(*rectangle_color_fill)
-
-                    # Make the skia Paint and
-                    paint = skia.Paint(
-                        AntiAlias = True,
-                        Color = color,
-                        Style = skia.Paint.kFill_Style,
-                        StrokeWidth = 2,
-                    )
-
-                    color = skia.Color4f(*rectangle_color_border)
-
-                    border = skia.Paint(
-                        AntiAlias = True,
-                        Color = color,
-                        Style = skia.Paint.kStroke_Style,
-                        StrokeWidth = 1,
-                        # ImageFilter=skia.ImageFilters.DropShadow(3, 3, 5, 5, color)
-                    )
-
-                    path = skia.Path()
-                    path.moveTo(*rectangle[0])
-
-                    rectangle.append(rectangle[0])
-
-                    for point in rectangle:
-                        path.lineTo(*point)
-
-                    self.canvas.drawPath(path, paint)
-                    self.canvas.drawPath(path, border)
-                                
-
-            # Save
-            img = self.skia.canvas_array()
-            
-            # Pretty print
-            if not i == self.n_images - 1:
-                print(f"{i}, ", end = "", flush = True)   
-            else:
-                print(f"{i}]")
-
-            img = Image.fromarray(img).convert('RGB')
-            img.save(self.output_dir + f"/img{i}.jpg", quality = 100)
+        self.mode = "polygons"
+        return self.run()
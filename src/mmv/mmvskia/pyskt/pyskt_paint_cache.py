@@ -0,0 +1,173 @@
+"""
+===============================================================================
+                                GPL v3 License                                
+===============================================================================
+
+Copyright (c) 2020,
+  - Tremeschin < https://tremeschin.gitlab.io > 
+
+===============================================================================
+
+Purpose: Cache of skia Paints, image filters and shaders shared across objects
+
+===============================================================================
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+
+===============================================================================
+"""
+
+import skia
+
+
+# skia.Paint, ImageFilters and Shaders are immutable-ish C++ objects that are somewhat
+# expensive to build from Python, we were making new ones per object per frame.
+#
+# Paints, blurs and merges here are keyed by their quantized parameters and shared
+# across every object that asks for the same thing, so DON'T mutate what you get from
+# them. Values that change every frame (alpha, blur sigma, bar colors) go on paints
+# the objects own and mutate in place, see SkiaPaintCache.mutable_paint
+class SkiaPaintCache:
+
+    # Quantization steps, colors are 8 bit anyways and a quarter pixel of stroke
+    # width or blur sigma isn't visible
+    COLOR_STEPS = 255
+    WIDTH_STEP = 0.25
+    SIGMA_STEP = 0.25
+
+    # Start over when a cache grows past this many entries (animated parameters
+    # might create a lot of keys)
+    MAX_ENTRIES = 4096
+
+    STYLES = {
+        "fill": skia.Paint.kFill_Style,
+        "stroke": skia.Paint.kStroke_Style,
+    }
+
+    def __init__(self) -> None:
+        self.paints = {}
+        self.filters = {}
+        self.hits = 0
+        self.misses = 0
+
+        # Radial gradient of radius 1 at the origin from transparent to black
+        self.unit_vignetting = skia.GradientShader.MakeRadial(
+            center = (0, 0), radius = 1,
+            colors = [skia.Color4f(0, 0, 0, 0), skia.Color4f(0, 0, 0, 1)],
+        )
+
+    # # Keys
+
+    # Color as a hashable tuple of 8 bit ints, accepts skia.Color4f or a (r, g, b, a) iterable
+    def color_key(self, color) -> tuple:
+        if isinstance(color, skia.Color4f):
+            color = (color.fR, color.fG, color.fB, color.fA)
+        return tuple(int(round(channel * self.COLOR_STEPS)) for channel in color)
+
+    def _store(self, cache: dict, key, value):
+        if len(cache) >= self.MAX_ENTRIES:
+            cache.clear()
+        cache[key] = value
+        self.misses += 1
+        return value
+
+    # # Paints
+
+    # Shared paint with these options, the color is quantized to 8 bit and the width to WIDTH_STEP
+    def paint(self, color = (1, 1, 1, 1), style: str = "fill", width: float = 1, antialias: bool = True) -> skia.Paint:
+        key = (style, self.color_key(color), int(round(width / self.WIDTH_STEP)), antialias)
+
+        paint = self.paints.get(key, None)
+        if paint is not None:
+            self.hits += 1
+            return paint
+
+        color_key = key[1]
+        return self._store(self.paints, key, skia.Paint(
+            AntiAlias = antialias,
+            Color = skia.Color4f(*[channel / self.COLOR_STEPS for channel in color_key]),
+            Style = self.STYLES[style],
+            StrokeWidth = key[2] * self.WIDTH_STEP,
+        ))
+
+    def fill(self, color, antialias: bool = True) -> skia.Paint:
+        return self.paint(color = color, style = "fill", antialias = antialias)
+
+    def stroke(self, color, width: float, antialias: bool = True) -> skia.Paint:
+        return self.paint(color = color, style = "stroke", width = width, antialias = antialias)
+
+    # A new paint for an object to keep and mutate every frame (setAlphaf, setColor4f,
+    # setStrokeWidth, setImageFilter) instead of building one
+    def mutable_paint(self, style: str = "fill", width: float = 1, antialias: bool = True) -> skia.Paint:
+        return skia.Paint(AntiAlias = antialias, Style = self.STYLES[style], StrokeWidth = width)
+
+    # # Filters
+
+    # Shared gaussian blur image filter, None when the sigma rounds to zero
+    def blur(self, sigma: float):
+        key = int(round(sigma / self.SIGMA_STEP))
+        if key <= 0:
+            return None
+
+        image_filter = self.filters.get(("blur", key), None)
+        if image_filter is not None:
+            self.hits += 1
+            return image_filter
+
+        sigma = key * self.SIGMA_STEP
+        return self._store(self.filters, ("blur", key), skia.ImageFilters.Blur(sigma, sigma))
+
+    # One image filter out of many, the filter itself if only one (no Merge). Filters
+    # should come from this cache so the same combination is the same key
+    def merge(self, image_filters):
+        if len(image_filters) == 1:
+            return image_filters[0]
+
+        # Keyed by the filters ids, the entry holds them so the ids aren't reused
+        key = ("merge",) + tuple(id(image_filter) for image_filter in image_filters)
+        entry = self.filters.get(key, None)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        image_filters = list(image_filters)
+        return self._store(self.filters, key, (image_filters, skia.ImageFilters.Merge(image_filters)))[1]
+
+    # # Shaders
+
+    # Draw a vignetting (transparent center, black at the radius) by transforming the
+    # one unit radial gradient instead of making a new shader every frame
+    def draw_vignetting(self, canvas, center_x: float, center_y: float, radius: float) -> None:
+        if radius <= 0:
+            canvas.drawColor(skia.Color4f(0, 0, 0, 1))
+            return
+
+        paint = self.paints.get("vignetting", None)
+        if paint is None:
+            paint = self._store(self.paints, "vignetting", skia.Paint(Shader = self.unit_vignetting))
+
+        canvas.save()
+        canvas.translate(center_x, center_y)
+        canvas.scale(radius, radius)
+        canvas.drawPaint(paint)
+        canvas.restore()
+
+    # Hit rate and sizes for logging
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0,
+            "paints": len(self.paints),
+            "filters": len(self.filters),
+        }